@@ -0,0 +1,707 @@
+from pathlib import Path
+from re import DOTALL, compile
+from typing import Callable, Iterable, Optional
+
+TOKEN_RE = compile(
+    r"(?P<space>(?:\s+|//[^\n]*|/\*.*?\*/)+)"
+    r"|(?P<define>`define(?:[^\n]*\\\n)*[^\n]*)"
+    r"|(?P<line>`(?:timescale|undef|default_nettype)[^\n]*)"
+    r"|`(?P<macro>\w+)",
+    DOTALL,
+)
+EXPR_RE = compile(
+    r"\s*(?:"
+    r"(?P<based>(?P<size>\d[\d_]*)?\s*'(?P<signed>[sS])?(?P<base>[bBoOdDhH])\s*(?P<digits>[\da-fA-F_xXzZ?]+))"
+    r"|(?P<cast>\d[\d_]*)\s*'(?=\()"
+    r"|(?P<decimal>\d[\d_]*)"
+    r"|`(?P<ref>ASM_REF_(?:SUB)?LABEL)\s*\(\s*(?P<name>\w+)\s*\)"
+    r"|(?P<op><<|>>|[-+*/%&|^~!(){},])"
+    r")"
+)
+STRING_ESCAPES = {
+    "n": "\n",
+    "t": "\t",
+    "v": "\v",
+    "f": "\f",
+    "a": "\a",
+    "\\": "\\",
+    '"': '"',
+}
+BASES = {"b": 2, "o": 8, "d": 10, "h": 16}
+SIMPLE_ARGS_RE = compile(r"[ \t]*(?:\((?P<args>[^()\[\]{}\"]*)\)|\()")
+SKIPPED_INCLUDES = {"preamble.sv", "assembler.sv"}
+
+type Thunk = Callable[[], int]
+
+
+class Location:
+    __slots__ = ("file", "source", "position")
+
+    def __init__(self, file: Optional[Path], source: str, position: int) -> None:
+        self.file = file
+        self.source = source
+        self.position = position
+
+    def __str__(self) -> str:
+        line = self.source.count("\n", 0, self.position) + 1
+        return f"{self.file or '<source>'}:{line}"
+
+
+class Instruction:
+    def __init__(self, code: int, *, memory: bool = False) -> None:
+        self.code = code
+        self.memory = memory
+
+
+def default_instructions():
+    instructions: dict[str, Instruction] = {}
+
+    for i, name in enumerate(["AND", "ADD", "LDA", "STA", "BUN", "BSA", "ISZ"]):
+        instructions[name] = Instruction(i << 12, memory=True)
+
+    for i, name in enumerate(
+        [
+            *["CLA", "CLE", "CMA", "CME", "CIR", "CIL", "INC"],
+            *["SPA", "SNA", "SZA", "SZE", "HLT"],
+        ]
+    ):
+        instructions[name] = Instruction(0x7000 | (1 << (11 - i)))
+
+    for i, name in enumerate(["INP", "OUT", "SKI", "SKO", "ION", "IOF"]):
+        instructions[name] = Instruction(0xF000 | (1 << (11 - i)))
+
+    return instructions
+
+
+class Program:
+    def __init__(self) -> None:
+        self.memory: dict[int, int] = {}
+        self.instructions: set[int] = set()
+        self.labels: dict[str, int] = {}
+
+    def image(self) -> Iterable[str]:
+        previous = None
+
+        for address, data in sorted(self.memory.items()):
+            if previous is None or address != previous + 1:
+                yield f"@{address:03x}"
+
+            yield f"{data:04x}"
+            previous = address
+
+    def symbols(self) -> Iterable[str]:
+        for name, address in sorted(self.labels.items(), key=lambda i: i[1]):
+            yield f"{address:03x} {name}"
+
+
+class Assembler:
+    def __init__(self) -> None:
+        self.program = Program()
+        self.table = default_instructions()
+        self.address = 0
+        self.last_label: Optional[str] = None
+        self.fixups: list[tuple[int, Thunk, Location]] = []
+        self.location = Location(None, "", 0)
+
+    def error(self, message: str):
+        return ValueError(f"{self.location}: {message}")
+
+    # Labels
+
+    def label_name(self, name: str, sublabel: bool = False):
+        if not sublabel:
+            return name
+
+        if self.last_label is None:
+            raise self.error(f"Sublabel '{name}' defined before any label")
+
+        return f"{self.last_label}.{name}"
+
+    def define_label(self, name: str):
+        if name in self.program.labels:
+            raise self.error(f"Redeclaration of label '{name}'")
+
+        self.program.labels[name] = self.address
+
+    def reference(self, name: str) -> Thunk:
+        location = self.location
+        labels = self.program.labels
+
+        def thunk():
+            if name not in labels:
+                raise ValueError(f"{location}: Undefined label '{name}'")
+
+            return labels[name]
+
+        return thunk
+
+    # Data
+
+    def emit(self, value: int | Thunk, instruction: bool = False):
+        if callable(value):
+            self.fixups.append((self.address, value, self.location))
+            value = 0
+
+        self.program.memory[self.address] = value & 0xFFFF
+
+        if instruction:
+            self.program.instructions.add(self.address)
+        else:
+            self.program.instructions.discard(self.address)
+
+        self.address = (self.address + 1) & 0xFFF
+
+    def emit_instruction(
+        self, name: str, operand: Optional[Thunk] = None, *, indirect: bool = False
+    ):
+        code = self.table[name].code | (0x8000 if indirect else 0)
+
+        if operand is None:
+            self.emit(code, True)
+        else:
+            self.emit(lambda: code | (operand() & 0xFFF), True)
+
+    def resolve(self):
+        for address, thunk, location in self.fixups:
+            self.location = location
+            self.program.memory[address] = thunk() & 0xFFFF
+
+        self.fixups.clear()
+        return self.program
+
+    # Expressions
+
+    def expression(self, source: str) -> Thunk:
+        location = self.location
+        labels = self.program.labels
+        tokens: list[tuple[str, object]] = []
+        position = 0
+
+        while position < len(source):
+            match = EXPR_RE.match(source, position)
+
+            if match is None or match.end() == position:
+                if source[position:].strip():
+                    raise self.error(f"Cannot parse expression {source!r}")
+                break
+
+            position = match.end()
+
+            if match["based"]:
+                digits = match["digits"].replace("_", "").lower()
+
+                if any(i in "xz?" for i in digits):
+                    raise self.error(f"Unknown bits in {match['based']!r}")
+
+                size = int(match["size"].replace("_", "")) if match["size"] else 32
+                value = int(digits, BASES[match["base"].lower()])
+                tokens.append(("num", (value & ((1 << size) - 1), size)))
+            elif match["cast"]:
+                tokens.append(("cast", int(match["cast"].replace("_", ""))))
+            elif match["decimal"]:
+                tokens.append(("num", (int(match["decimal"].replace("_", "")), 32)))
+            elif match["ref"]:
+                name = self.label_name(match["name"], "SUB" in match["ref"])
+                tokens.append(("ref", name))
+            else:
+                tokens.append(("op", match["op"]))
+
+        def thunk():
+            parser = ExpressionParser(tokens, labels, location)
+            value, _ = parser.parse()
+            return value
+
+        return thunk
+
+    def constant(self, source: str) -> int:
+        return self.expression(source)()
+
+    # Macros
+
+    def arity(self, name: str):
+        if name in MACROS:
+            return MACROS[name][0]
+
+        return 0 if name.removeprefix("ASM_") in self.table else 1
+
+    def invoke(self, name: str, args: list[str]):
+        if name in MACROS:
+            _, handler = MACROS[name]
+            handler(self, *args)
+            return
+
+        base = name.removeprefix("ASM_")
+
+        if base in self.table and not self.table[base].memory:
+            self.emit_instruction(base)
+            return
+
+        mnemonic, _, suffix = base.rpartition("_")
+        instruction = self.table.get(mnemonic)
+
+        if (
+            instruction is None
+            or not instruction.memory
+            or len(suffix) != 2
+            or suffix[0] not in "DI"
+            or suffix[1] not in "ALS"
+        ):
+            raise self.error(f"Unknown macro `{name}")
+
+        mode, kind = suffix
+        arg = args[0].strip() if args else ""
+
+        match kind:
+            case "A":
+                operand = self.expression(arg)
+            case "L":
+                if not arg:
+                    if self.last_label is None:
+                        raise self.error("No label is defined")
+                    arg = self.last_label
+                operand = self.reference(arg)
+            case _:
+                operand = self.reference(self.label_name(arg, True))
+
+        self.emit_instruction(mnemonic, operand, indirect=mode == "I")
+
+    def define_instruction(self, name: str, code: int, *, memory: bool = False):
+        self.table[name.strip()] = Instruction(code, memory=memory)
+
+    # Source
+
+    def assemble(self, source: str, file: Optional[Path] = None):
+        position = 0
+
+        while position < len(source):
+            match = TOKEN_RE.match(source, position)
+
+            if match is None:
+                self.location = Location(file, source, position)
+                raise self.error(f"Unexpected {source[position:].split()[0]!r}")
+
+            position = match.end()
+            name = match["macro"]
+
+            if name is None:
+                continue
+
+            self.location = Location(file, source, match.start())
+
+            if name == "include":
+                position, path = parse_include(source, position)
+                self.include(path, file)
+                continue
+
+            if name in {"ifdef", "ifndef", "elsif", "else", "endif"}:
+                raise self.error("Conditional compilation is not supported")
+
+            args: list[str] = []
+
+            if self.arity(name):
+                position, args = parse_args(source, position)
+
+            self.invoke(name, args)
+
+        return self
+
+    def include(self, path: str, file: Optional[Path]):
+        if Path(path).name in SKIPPED_INCLUDES:
+            return
+
+        directory = file.parent if file else Path(".")
+
+        for i in [Path(directory, path), Path("src", path)]:
+            if i.exists():
+                with open(i, "r") as f:
+                    location = self.location
+                    self.assemble(f.read(), i)
+                    self.location = location
+                return
+
+        raise self.error(f"Cannot find included file {path!r}")
+
+
+class ExpressionParser:
+    def __init__(
+        self,
+        tokens: list[tuple[str, object]],
+        labels: dict[str, int],
+        location: Location,
+    ) -> None:
+        self.tokens = tokens
+        self.labels = labels
+        self.location = location
+        self.index = 0
+
+    def error(self, message: str):
+        return ValueError(f"{self.location}: {message}")
+
+    def peek(self):
+        return self.tokens[self.index] if self.index < len(self.tokens) else None
+
+    def take(self, op: Optional[str] = None):
+        token = self.peek()
+
+        if token is None or (op is not None and token != ("op", op)):
+            raise self.error(f"Expected {op or 'operand'}")
+
+        self.index += 1
+        return token
+
+    def parse(self):
+        result = self.binary(0)
+
+        if self.peek() is not None:
+            raise self.error(f"Unexpected {self.peek()}")
+
+        return result
+
+    BINARY = [["|"], ["^"], ["&"], ["<<", ">>"], ["+", "-"], ["*", "/", "%"]]
+
+    def binary(self, level: int) -> tuple[int, int]:
+        if level == len(self.BINARY):
+            return self.unary()
+
+        left, width = self.binary(level + 1)
+
+        while (
+            (token := self.peek())
+            and token[0] == "op"
+            and token[1] in self.BINARY[level]
+        ):
+            self.index += 1
+            right, right_width = self.binary(level + 1)
+            width = max(width, right_width) if token[1] not in {"<<", ">>"} else width
+
+            match token[1]:
+                case "|":
+                    left |= right
+                case "^":
+                    left ^= right
+                case "&":
+                    left &= right
+                case "<<":
+                    left <<= right
+                case ">>":
+                    left >>= right
+                case "+":
+                    left += right
+                case "-":
+                    left -= right
+                case "*":
+                    left *= right
+                case "/":
+                    left //= right
+                case _:
+                    left %= right
+
+            left &= (1 << width) - 1
+
+        return left, width
+
+    def unary(self) -> tuple[int, int]:
+        token = self.take()
+
+        match token:
+            case ("op", "-"):
+                value, width = self.unary()
+                return -value & ((1 << width) - 1), width
+            case ("op", "+"):
+                return self.unary()
+            case ("op", "~"):
+                value, width = self.unary()
+                return ~value & ((1 << width) - 1), width
+            case ("op", "!"):
+                value, _ = self.unary()
+                return int(not value), 1
+            case ("op", "("):
+                result = self.binary(0)
+                self.take(")")
+                return result
+            case ("op", "{"):
+                value = 0
+                width = 0
+
+                while True:
+                    part, part_width = self.binary(0)
+                    value = (value << part_width) | part
+                    width += part_width
+
+                    if self.take()[1] == "}":
+                        return value, width
+            case ("num", number):
+                assert isinstance(number, tuple)
+                return number
+            case ("cast", int(size)):
+                self.take("(")
+                value, _ = self.binary(0)
+                self.take(")")
+                return value & ((1 << size) - 1), size
+            case ("ref", str(name)):
+                if name not in self.labels:
+                    raise self.error(f"Undefined label '{name}'")
+                return self.labels[name], 12
+            case _:
+                raise self.error(f"Unexpected {token}")
+
+
+def parse_args(source: str, position: int) -> tuple[int, list[str]]:
+    match = SIMPLE_ARGS_RE.match(source, position)
+
+    if match is None:
+        return position, []
+
+    if match["args"] is not None:
+        return match.end(), match["args"].split(",")
+
+    position = match.end() - 1
+
+    args: list[str] = []
+    depth = 0
+    start = position + 1
+    index = position
+
+    while index < len(source):
+        char = source[index]
+
+        if char == '"':
+            index = skip_string(source, index)
+            continue
+
+        if char in "([{":
+            depth += 1
+        elif char in ")]}":
+            depth -= 1
+
+            if depth == 0:
+                args.append(source[start:index])
+                return index + 1, args
+        elif char == "," and depth == 1:
+            args.append(source[start:index])
+            start = index + 1
+
+        index += 1
+
+    raise ValueError("Unterminated macro arguments")
+
+
+def parse_include(source: str, position: int) -> tuple[int, str]:
+    start = source.index('"', position)
+    end = skip_string(source, start)
+    return end, source[start + 1 : end - 1]
+
+
+def skip_string(source: str, index: int):
+    index += 1
+
+    while source[index] != '"':
+        index += 2 if source[index] == "\\" else 1
+
+    return index + 1
+
+
+def parse_string(source: str) -> bytes:
+    source = source.strip()
+
+    if len(source) < 2 or source[0] != '"' or source[-1] != '"':
+        raise ValueError(f"Expected a string literal, got {source!r}")
+
+    result = bytearray()
+    index = 1
+
+    while index < len(source) - 1:
+        char = source[index]
+
+        if char != "\\":
+            result += char.encode()
+            index += 1
+            continue
+
+        char = source[index + 1]
+
+        if char in STRING_ESCAPES:
+            result += STRING_ESCAPES[char].encode()
+            index += 2
+        elif char in "xX":
+            digits = source[index + 2 : index + 4]
+            result.append(int(digits, 16))
+            index += 2 + len(digits)
+        elif char in "01234567":
+            end = index + 1
+
+            while end < index + 4 and source[end] in "01234567":
+                end += 1
+
+            result.append(int(source[index + 1 : end], 8) & 0xFF)
+            index = end
+        else:
+            result += char.encode()
+            index += 2
+
+    return bytes(result)
+
+
+def default_label(asm: Assembler, name: str):
+    name = name.strip()
+
+    if name:
+        return name
+
+    if asm.last_label is None:
+        raise asm.error("No label is defined")
+
+    return asm.last_label
+
+
+def asm_addr(asm: Assembler, value: str):
+    asm.address = asm.constant(value) & 0xFFF
+
+
+def asm_addr_rel(asm: Assembler, value: str):
+    asm.address = (asm.address + asm.constant(value)) & 0xFFF
+
+
+def asm_data(asm: Assembler, value: str, instruction: str = "0"):
+    asm.emit(asm.expression(value), bool(asm.constant(instruction)))
+
+
+def asm_data_label(asm: Assembler, name: str):
+    asm.emit(asm.reference(name.strip()))
+
+
+def asm_data_sublabel(asm: Assembler, name: str):
+    asm.emit(asm.reference(asm.label_name(name.strip(), True)))
+
+
+def asm_data_fill(asm: Assembler, value: str, length: str):
+    data = asm.constant(value)
+
+    for _ in range(asm.constant(length)):
+        asm.emit(data)
+
+
+def asm_data_str(asm: Assembler, value: str):
+    for i in parse_string(value):
+        asm.emit(i)
+
+
+def asm_label(asm: Assembler, name: str):
+    asm.last_label = name.strip()
+    asm.define_label(asm.last_label)
+
+
+def asm_sublabel(asm: Assembler, name: str):
+    asm.define_label(asm.label_name(name.strip(), True))
+
+
+def asm_subroutine(asm: Assembler, name: str):
+    asm_label(asm, name)
+    asm.emit(0)
+
+
+def asm_call(asm: Assembler, name: str):
+    asm.emit_instruction("BSA", asm.reference(name.strip()))
+
+
+def asm_arg_skip(asm: Assembler, name: str = ""):
+    asm.emit_instruction("ISZ", asm.reference(default_label(asm, name)))
+
+
+def asm_arg_next(asm: Assembler, dst: str, name: str = ""):
+    target = asm.reference(default_label(asm, name))
+    asm.emit_instruction("LDA", target, indirect=True)
+    asm.emit_instruction("STA", asm.reference(asm.label_name(dst.strip(), True)))
+    asm.emit_instruction("ISZ", target)
+
+
+def asm_return(asm: Assembler, name: str = ""):
+    target = asm.reference(default_label(asm, name))
+    asm.emit_instruction("BUN", target, indirect=True)
+
+
+def asm_sequence(*names: str):
+    def handler(asm: Assembler):
+        for i in names:
+            asm.emit_instruction(i)
+
+    return handler
+
+
+def asm_reg_instr(asm: Assembler, name: str, index: str):
+    asm.define_instruction(name, 0x7000 | (1 << asm.constant(index)))
+
+
+def asm_io_instr(asm: Assembler, name: str, index: str):
+    asm.define_instruction(name, 0xF000 | (1 << asm.constant(index)))
+
+
+def asm_mem_instr(asm: Assembler, name: str, opcode: str):
+    asm.define_instruction(name, (asm.constant(opcode) & 7) << 12, memory=True)
+
+
+def asm_shift(kind: int):
+    def handler(asm: Assembler, amount: str):
+        value = asm.expression(amount)
+        asm.emit(lambda: 0xF000 | kind | (value() & 0xF), True)
+
+    return handler
+
+
+def asm_mul(reference: Callable[[Assembler, str], Thunk]):
+    def handler(asm: Assembler, operand: str = ""):
+        asm.emit(0xF030, True)
+        asm.emit(reference(asm, operand.strip()))
+
+    return handler
+
+
+def asm_reg_ext_instr(asm: Assembler, name: str, operand: str):
+    asm.define_instruction(name, 0x7000 | (asm.constant(operand) & 0xFFF))
+
+
+MACROS: dict[str, tuple[int, Callable[..., None]]] = {
+    "IMPORT": (1, lambda *_: None),
+    "ASM_PROBE_LABEL": (1, lambda *_: None),
+    "ASM_PROBE_SUBLABEL": (1, lambda *_: None),
+    "ASM_ADDR": (1, asm_addr),
+    "ASM_ADDR_REL": (1, asm_addr_rel),
+    "ASM_DATA": (1, asm_data),
+    "ASM_DATA_LABEL": (1, asm_data_label),
+    "ASM_DATA_SUBLABEL": (1, asm_data_sublabel),
+    "ASM_DATA_FILL": (1, asm_data_fill),
+    "ASM_DATA_STR": (1, asm_data_str),
+    "ASM_LABEL": (1, asm_label),
+    "ASM_SUBLABEL": (1, asm_sublabel),
+    "ASM_SUBROUTINE": (1, asm_subroutine),
+    "ASM_CALL": (1, asm_call),
+    "ASM_ARG_SKIP": (1, asm_arg_skip),
+    "ASM_ARG_NEXT": (1, asm_arg_next),
+    "ASM_RETURN": (1, asm_return),
+    "ASM_SHR": (0, asm_sequence("CLE", "CIR")),
+    "ASM_SHL": (0, asm_sequence("CLE", "CIL")),
+    "ASM_ASR": (0, asm_sequence("CLE", "SPA", "CME", "CIR")),
+    "ASM_SHL_BY": (1, asm_shift(0x00)),
+    "ASM_SHR_BY": (1, asm_shift(0x10)),
+    "ASM_ASR_BY": (1, asm_shift(0x20)),
+    "ASM_MUL_DA": (1, asm_mul(lambda asm, i: asm.expression(i))),
+    "ASM_MUL_DL": (1, asm_mul(lambda asm, i: asm.reference(default_label(asm, i)))),
+    "ASM_MUL_DS": (
+        1,
+        asm_mul(lambda asm, i: asm.reference(asm.label_name(i, True))),
+    ),
+    "ASM_REG_INSTR": (1, asm_reg_instr),
+    "ASM_IO_INSTR": (1, asm_io_instr),
+    "ASM_MEM_INSTR": (1, asm_mem_instr),
+    "ASM_REG_EXT_INSTR": (1, asm_reg_ext_instr),
+    "ASM_REG_EXT_INST": (1, asm_reg_ext_instr),
+}
+
+
+def assemble(source: str, file: Optional[Path] = None):
+    return Assembler().assemble(source, file).resolve()
+
+
+def assemble_file(file: Path):
+    with open(file, "r") as f:
+        return assemble(f.read(), file)
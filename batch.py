@@ -0,0 +1,277 @@
+from concurrent.futures import Future, ProcessPoolExecutor, as_completed
+from functools import lru_cache
+from io import BytesIO
+from json import dumps, loads
+from multiprocessing import get_context
+from pathlib import Path
+from re import MULTILINE, compile
+from subprocess import DEVNULL, run
+from time import perf_counter
+from typing import Any, Iterable, Optional, TextIO
+
+from assembler import assemble_file
+from build import mktemp
+from simulator import Keyboard, Machine, Printer, load_image
+
+STATS_RE = compile(r"^(?P<name>cycles|limit): (?P<value>\d+)$", MULTILINE)
+
+
+class Job:
+    def __init__(
+        self,
+        id: str,
+        program: Path,
+        *,
+        input: Optional[Path] = None,
+        expected: Optional[Path] = None,
+        limit: Optional[int] = None,
+    ) -> None:
+        self.id = id
+        self.program = program
+        self.input = input
+        self.expected = expected
+        self.limit = limit
+
+
+# Every line of the manifest is a JSON object with `program`, and optionally
+# `id`, `input`, `expected` (a file with the expected printer output) and
+# `limit` (in cycles). Paths are relative to the manifest.
+def read_manifest(file: Path, *, limit: Optional[int] = None):
+    jobs: list[Job] = []
+    ids: set[str] = set()
+
+    with open(file, "r") as f:
+        for number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+
+            entry: dict[str, Any] = loads(line)
+            program = Path(file.parent, entry["program"])
+            input = Path(file.parent, entry["input"]) if "input" in entry else None
+            id = entry.get("id") or f"{entry['program']}:{entry.get('input', '')}"
+
+            if id in ids:
+                raise ValueError(f"{file}:{number}: Duplicate job id: {id}")
+
+            ids.add(id)
+            jobs.append(
+                Job(
+                    id,
+                    program,
+                    input=input,
+                    expected=(
+                        Path(file.parent, entry["expected"])
+                        if "expected" in entry
+                        else None
+                    ),
+                    limit=entry.get("limit", limit),
+                )
+            )
+
+    return jobs
+
+
+def read_completed(file: Path):
+    completed: set[str] = set()
+
+    if not file.exists():
+        return completed
+
+    with open(file, "r") as f:
+        for line in f:
+            try:
+                completed.add(loads(line)["id"])
+            except (ValueError, KeyError):
+                # The last line is cut short if the batch was interrupted.
+                pass
+
+    return completed
+
+
+def compile_ckl(file: Path, output: Path):
+    run(["gcc", "-E", "-ffreestanding", "-o", output, "-x", "c", file], check=True)
+    run(["node", "ckl/index.js", output, output], check=True)
+
+
+@lru_cache(maxsize=64)
+def load_job_image(program: Path):
+    match program.suffix:
+        case ".hex":
+            return load_image(program)
+
+        case ".ckl":
+            temp = mktemp(program, ".asm.sv")
+
+            try:
+                compile_ckl(program, temp)
+                return assemble_file(temp).memory
+            finally:
+                temp.unlink()
+
+        case _:
+            return assemble_file(program).memory
+
+
+def run_machine(
+    job: Job, *, idle: bool = False, prefetch: bool = False, arithmetic: bool = False
+):
+    out = BytesIO()
+    printer = Printer(out)
+
+    with open(job.input, "rb") if job.input else BytesIO() as f:
+        machine = Machine(
+            load_job_image(job.program),
+            keyboard=Keyboard(f),
+            printer=printer,
+            prefetch=prefetch,
+            arithmetic=arithmetic,
+        )
+        halted = machine.run(job.limit, idle=idle)
+
+    output = out.getvalue().decode("latin-1")
+    return output, machine.cycles, halted
+
+
+# Run the job with the given simulation (either a `vvp` file or the Verilator
+# harness), which must accept `+program`, `+input`, `+limit` and `+cycles`.
+def run_simulation(job: Job, command: list[str], *, idle: bool = False):
+    temp_hex = mktemp(job.program, ".hex")
+
+    try:
+        with open(temp_hex, "w") as f:
+            for address, data in sorted(load_job_image(job.program).items()):
+                f.write(f"@{address:03x} {data:04x}\n")
+
+        args = [*command, f"+program={temp_hex}", "+cycles", "+buffered_printer"]
+
+        if job.input:
+            args.append(f"+input={job.input.absolute()}")
+
+        if job.limit:
+            args.append(f"+limit={job.limit}")
+
+        if idle:
+            args.append("+idle_skip")
+
+        proc = run(args, stdin=DEVNULL, capture_output=True, check=True)
+    finally:
+        temp_hex.unlink()
+
+    stderr = proc.stderr.decode("latin-1")
+    stats = {i["name"]: int(i["value"]) for i in STATS_RE.finditer(stderr)}
+    output = proc.stdout.decode("latin-1").removesuffix("\n")
+
+    if "cycles" in stats:
+        return output, stats["cycles"], True
+
+    return output, stats["limit"], False
+
+
+def run_job(
+    job: Job,
+    command: Optional[list[str]],
+    *,
+    idle: bool = False,
+    prefetch: bool = False,
+    arithmetic: bool = False,
+) -> dict[str, Any]:
+    result: dict[str, Any] = {
+        "id": job.id,
+        "program": job.program.as_posix(),
+        "input": job.input.as_posix() if job.input else None,
+    }
+    start = perf_counter()
+
+    try:
+        if command is None:
+            output, cycles, halted = run_machine(
+                job, idle=idle, prefetch=prefetch, arithmetic=arithmetic
+            )
+        else:
+            output, cycles, halted = run_simulation(job, command, idle=idle)
+    except Exception as e:
+        result.update(status="error", error=f"{type(e).__name__}: {e}")
+        return result
+
+    if not halted:
+        status = "timeout"
+    elif job.expected is None:
+        status = "done"
+    else:
+        with open(job.expected, "rb") as f:
+            expected = f.read().decode("latin-1")
+
+        status = "pass" if output == expected else "fail"
+
+    result.update(
+        status=status,
+        output=output,
+        cycles=cycles,
+        seconds=round(perf_counter() - start, 6),
+    )
+    return result
+
+
+# Run the jobs which are not already in the results file, appending to it as
+# they finish, so that an interrupted batch can be resumed.
+def run_jobs(
+    jobs: Iterable[Job],
+    results: Path,
+    *,
+    command: Optional[list[str]],
+    workers: int,
+    idle: bool = False,
+    prefetch: bool = False,
+    arithmetic: bool = False,
+    progress: Optional[TextIO] = None,
+):
+    jobs = list(jobs)
+    completed = read_completed(results) & {i.id for i in jobs}
+    pending = [i for i in jobs if i.id not in completed]
+    counts: dict[str, int] = {}
+    truncated = False
+
+    if results.exists() and results.stat().st_size:
+        with open(results, "rb") as f:
+            f.seek(-1, 2)
+            truncated = f.read() != b"\n"
+
+    # Forking keeps the worker from running `sv.py` again as its main module.
+    with (
+        open(results, "a") as f,
+        ProcessPoolExecutor(workers, mp_context=get_context("fork")) as executor,
+    ):
+        if truncated:
+            f.write("\n")
+
+        futures: list[Future[dict[str, Any]]] = [
+            executor.submit(
+                run_job,
+                i,
+                command,
+                idle=idle,
+                prefetch=prefetch,
+                arithmetic=arithmetic,
+            )
+            for i in pending
+        ]
+
+        try:
+            for i, future in enumerate(as_completed(futures), 1):
+                result = future.result()
+                f.write(dumps(result) + "\n")
+                f.flush()
+                counts[result["status"]] = counts.get(result["status"], 0) + 1
+
+                if progress:
+                    print(
+                        f"[{i}/{len(pending)}]",
+                        result["id"],
+                        result["status"],
+                        file=progress,
+                    )
+        except KeyboardInterrupt:
+            executor.shutdown(cancel_futures=True)
+            raise
+
+    return len(completed), counts
@@ -0,0 +1,517 @@
+#!/usr/bin/env python3.12
+from argparse import ArgumentParser
+from io import BytesIO
+from json import dump, load
+from pathlib import Path
+from platform import platform, python_version
+from random import Random
+from shutil import which
+from subprocess import DEVNULL, run
+from sys import executable
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from timeit import Timer
+from typing import Any, Callable, Iterable, Optional
+
+from assembler import assemble, assemble_file
+from extended_instructions import MICRO_OPS, generate
+from formatter import format
+from simulator import Keyboard, Machine, Printer
+
+ROOT = Path(__file__).parent
+SV_PATH = Path(ROOT, "sv.py")
+SUITES = ("compile", "simulate", "test", "format", "extended_instructions")
+ENGINES = ("py", "iverilog", "verilator")
+
+# Print `x` the given number of times, then halt.
+PRINTER_PROGRAM = """\
+`include "preamble.sv"
+`IMPORT(assembler)
+
+`ASM_LABEL(loop)
+  `ASM_SKO
+  `ASM_BUN_DL(loop)
+  `ASM_LDA_DL(chr)
+  `ASM_OUT
+  `ASM_ISZ_DL(count)
+  `ASM_BUN_DL(loop)
+  `ASM_HLT
+`ASM_LABEL(chr)
+  `ASM_DATA(8'h78)
+`ASM_LABEL(count)
+  `ASM_DATA(-{count})
+"""
+
+# Add, rotate and count in a loop, without any I/O.
+LOOP_PROGRAM = """\
+`include "preamble.sv"
+`IMPORT(assembler)
+
+`ASM_LABEL(loop)
+  `ASM_LDA_DL(total)
+  `ASM_ADD_DL(step)
+  `ASM_CIL
+  `ASM_STA_DL(total)
+  `ASM_ISZ_DL(count)
+  `ASM_BUN_DL(loop)
+  `ASM_HLT
+`ASM_LABEL(total)
+  `ASM_DATA(0)
+`ASM_LABEL(step)
+  `ASM_DATA(3)
+`ASM_LABEL(count)
+  `ASM_DATA(-{count})
+"""
+
+# Sum the squares of 1 to `count`, where `{multiply}` multiplies AC by `i`.
+SQUARES_PROGRAM = """\
+`include "preamble.sv"
+`IMPORT(assembler)
+
+`ASM_LABEL(loop)
+  `ASM_LDA_DL(i)
+  `ASM_INC
+  `ASM_STA_DL(i)
+  {multiply}
+  `ASM_ADD_DL(total)
+  `ASM_STA_DL(total)
+  `ASM_ISZ_DL(count)
+  `ASM_BUN_DL(loop)
+  `ASM_HLT
+`ASM_LABEL(total)
+  `ASM_DATA(0)
+`ASM_LABEL(i)
+  `ASM_DATA(0)
+`ASM_LABEL(count)
+  `ASM_DATA(-{count})
+{subroutine}"""
+
+# Multiply AC by the word at the address which follows the call, by shifting
+# and adding until the multiplier runs out of bits.
+SHIFT_ADD_MULTIPLY = """\
+`ASM_SUBROUTINE(multiply)
+  `ASM_STA_DS(a)
+  `ASM_ARG_NEXT(b)
+  `ASM_LDA_IS(b)
+  `ASM_STA_DS(b)
+  `ASM_CLA
+  `ASM_STA_DS(p)
+`ASM_SUBLABEL(next)
+  `ASM_LDA_DS(b)
+  `ASM_SZA
+  `ASM_BUN_DS(step)
+  `ASM_LDA_DS(p)
+  `ASM_RETURN
+`ASM_SUBLABEL(step)
+  `ASM_SHR
+  `ASM_STA_DS(b)
+  `ASM_SZE
+  `ASM_BUN_DS(add)
+  `ASM_BUN_DS(shift)
+`ASM_SUBLABEL(add)
+  `ASM_LDA_DS(p)
+  `ASM_ADD_DS(a)
+  `ASM_STA_DS(p)
+`ASM_SUBLABEL(shift)
+  `ASM_LDA_DS(a)
+  `ASM_SHL
+  `ASM_STA_DS(a)
+  `ASM_BUN_DS(next)
+`ASM_SUBLABEL(a)
+  `ASM_DATA(0)
+`ASM_SUBLABEL(b)
+  `ASM_DATA(0)
+`ASM_SUBLABEL(p)
+  `ASM_DATA(0)
+"""
+
+
+# The squares program with the multiply of the arithmetic extension, and with
+# the shift-add subroutine instead.
+def multiply_programs(count: int):
+    return {
+        "shift-add": SQUARES_PROGRAM.format(
+            count=count,
+            multiply="`ASM_CALL(multiply)\n  `ASM_DATA_LABEL(i)",
+            subroutine=SHIFT_ADD_MULTIPLY,
+        ),
+        "MUL": SQUARES_PROGRAM.format(
+            count=count, multiply="`ASM_MUL_DL(i)", subroutine=""
+        ),
+    }
+
+
+HALT_PROGRAM = """\
+`include "preamble.sv"
+`IMPORT(assembler)
+
+  `ASM_HLT
+"""
+
+
+# The programs which `simulate` runs, as a source (or a path to one) and the
+# keyboard input.
+def reference_programs() -> dict[str, tuple[str | Path, bytes]]:
+    return {
+        "loop": (LOOP_PROGRAM.format(count=20000), b""),
+        "printer": (PRINTER_PROGRAM.format(count=500), b""),
+        "reverse": (
+            Path(ROOT, "src/program.asm.sv"),
+            b"The quick brown fox jumps over the lazy dog\n",
+        ),
+    }
+
+
+# Generate backslash-continued macros which nest up to the given depth, with
+# lines of varying length and a blank line between each macro.
+def generate_macros(lines: int, depth: int, *, seed: int = 0):
+    random = Random(seed)
+    output: list[str] = []
+    level = 0
+
+    while len(output) < lines:
+        if level == 0:
+            output.append("")
+            output.append(f"`define MACRO_{len(output)}(__ARG__) \\")
+            level = 1
+            continue
+
+        text = "  " * level + "x" * random.randint(1, 60)
+        level = max(0, min(depth, level + random.choice((-1, 0, 1, 1))))
+        output.append(text + " \\" * level)
+
+    return "\n".join(output) + "\n"
+
+
+# The fastest of `repeat` samples, after `warmup` rounds which are not timed. A
+# sample is the mean of as many calls as take at least 0.2 seconds, which the
+# first warm-up round finds, so that a short call is not lost in the noise of
+# the timer and the scheduler.
+def measure(function: Callable[[], object], *, warmup: int = 1, repeat: int):
+    timer = Timer(function)
+    number = timer.autorange()[0] if warmup else 1
+
+    for _ in range(warmup - 1):
+        timer.timeit(number)
+
+    return min(timer.repeat(repeat, number)) / number
+
+
+def bench_formatter(*, lines: int, depth: int, repeat: int, warmup: int = 1):
+    source = generate_macros(lines, depth)
+    return measure(lambda: format(source), warmup=warmup, repeat=repeat)
+
+
+def time_printer(dir: str, mode: str, engine: str, count: int):
+    file = Path(dir, f"printer{count}.asm.sv")
+    file.write_text(PRINTER_PROGRAM.format(count=count))
+    args = [executable, SV_PATH, "run", "-e", engine, "--printer", mode, file]
+
+    start = perf_counter()
+    run(args, stdout=DEVNULL, check=True)
+    return perf_counter() - start
+
+
+# Characters per second through `VirtualPrinter` in the given mode. The time of
+# a run printing a single character is subtracted, so that compiling and
+# starting the simulation are not counted.
+def bench_printer(*, mode: str, engine: str, chars: int, repeat: int):
+    with TemporaryDirectory() as dir:
+        time_printer(dir, mode, engine, 1)
+        small = min(time_printer(dir, mode, engine, 1) for _ in range(repeat))
+        large = min(time_printer(dir, mode, engine, chars) for _ in range(repeat))
+
+    return (chars - 1) / max(large - small, 1e-9)
+
+
+def run_sv(*args: str | Path, input: Optional[Path] = None):
+    command = [executable, SV_PATH, *args]
+
+    if input:
+        command += ["--input", input]
+
+    run(command, stdin=DEVNULL, stdout=DEVNULL, check=True)
+
+
+def missing_tools(engine: str):
+    match engine:
+        case "py":
+            tools = []
+        case "iverilog":
+            tools = ["iverilog", "vvp"]
+        case "verilator":
+            tools = ["verilator", "make"]
+        case _:
+            raise ValueError(f"Unknown engine: {engine}")
+
+    return [i for i in tools if not which(i)]
+
+
+def run_machine(image: dict[int, int], input: bytes):
+    machine = Machine(image, keyboard=Keyboard(BytesIO(input)), printer=Printer(None))
+    machine.run()
+    return machine
+
+
+# Instructions and cycles per second of each reference program. The counts come
+# from the Python model, which agrees with the other engines cycle for cycle.
+# For the other engines, the time of a program which halts at once is
+# subtracted, so that starting the simulator is not counted.
+def bench_simulate(dir: str, engine: str, *, warmup: int, repeat: int):
+    halt = Path(dir, "halt.asm.sv")
+    halt.write_text(HALT_PROGRAM)
+    input = Path(dir, "input.txt")
+    results: dict[str, tuple[float, str]] = {}
+    base = 0.0
+
+    if engine != "py":
+        base = measure(lambda: run_sv("run", "-e", engine, halt), repeat=repeat)
+
+    for name, (source, keys) in reference_programs().items():
+        if isinstance(source, Path):
+            file = source
+            image = assemble_file(file).memory
+        else:
+            file = Path(dir, f"{name}.asm.sv")
+            file.write_text(source)
+            image = assemble(source, file).memory
+
+        machine = run_machine(image, keys)
+
+        if engine == "py":
+            seconds = measure(
+                lambda: run_machine(image, keys), warmup=warmup, repeat=repeat
+            )
+        else:
+            input.write_bytes(keys)
+            seconds = measure(
+                lambda: run_sv("run", "-e", engine, file, input=input),
+                warmup=warmup,
+                repeat=repeat,
+            )
+            seconds = max(seconds - base, 1e-9)
+
+        prefix = f"simulate.{engine}.{name}"
+        results[f"{prefix}.instructions"] = machine.instructions / seconds, "/s"
+        results[f"{prefix}.cycles"] = machine.cycles / seconds, "/s"
+
+    return results
+
+
+# Instructions and cycles of each multiply program, from the Python model with
+# the arithmetic extension. Both compute the same total, as the cycles are only
+# comparable if they do.
+def bench_multiply(*, count: int, prefetch: bool = False):
+    results: dict[str, tuple[int, int]] = {}
+    totals: set[int] = set()
+
+    for name, source in multiply_programs(count).items():
+        program = assemble(source)
+        machine = Machine(program.memory, prefetch=prefetch, arithmetic=True)
+        machine.run()
+        totals.add(machine.memory[program.labels["total"]])
+        results[name] = machine.instructions, machine.cycles
+
+    if len(totals) != 1:
+        raise ValueError(f"The multiply programs disagree: {sorted(totals)}")
+
+    return results
+
+
+def generate_extended_instructions():
+    return [str(i) for i in generate(MICRO_OPS)]
+
+
+# Run the given suites, or all of them. A metric is a value and its unit, where
+# `s` is lower-is-better, and `/s` is higher-is-better. The suites which need a
+# missing tool are skipped, with the reason.
+def run_suites(
+    suites: Iterable[str],
+    *,
+    warmup: int = 1,
+    repeat: int = 5,
+    progress: Optional[Callable[[str], object]] = None,
+):
+    metrics: dict[str, tuple[float, str]] = {}
+    skipped: dict[str, str] = {}
+
+    def record(results: dict[str, tuple[float, str]]):
+        metrics.update(results)
+
+        if progress:
+            for name, (value, unit) in results.items():
+                progress(format_metric(name, value, unit))
+
+    def skip(name: str, tools: list[str]):
+        skipped[name] = f"missing {', '.join(tools)}"
+
+        if progress:
+            progress(f"{name}: skipped ({skipped[name]})")
+
+    for suite in suites or SUITES:
+        match suite:
+            case "compile":
+                if missing := missing_tools("iverilog"):
+                    skip(suite, missing)
+                    continue
+
+                with TemporaryDirectory() as dir:
+                    output = Path(dir, "computer.vvp")
+                    seconds = measure(
+                        lambda: run_sv(
+                            "--no-cache",
+                            "compile",
+                            "src/VirtualComputer.sv",
+                            "-o",
+                            output,
+                        ),
+                        warmup=warmup,
+                        repeat=repeat,
+                    )
+
+                record({"compile.VirtualComputer": (seconds, "s")})
+
+            case "simulate":
+                for engine in ENGINES:
+                    if missing := missing_tools(engine):
+                        skip(f"{suite}.{engine}", missing)
+                        continue
+
+                    with TemporaryDirectory() as dir:
+                        record(
+                            bench_simulate(dir, engine, warmup=warmup, repeat=repeat)
+                        )
+
+            case "test":
+                if missing := missing_tools("iverilog"):
+                    skip(suite, missing)
+                    continue
+
+                seconds = measure(
+                    lambda: run_sv("--no-cache", "test"), warmup=warmup, repeat=repeat
+                )
+                record({"test": (seconds, "s")})
+
+            case "format":
+                lines = 10000
+                seconds = bench_formatter(
+                    lines=lines, depth=8, repeat=repeat, warmup=warmup
+                )
+                record({"format.lines": (lines / seconds, "/s")})
+
+            case "extended_instructions":
+                seconds = measure(
+                    generate_extended_instructions, warmup=warmup, repeat=repeat
+                )
+                record({"extended_instructions": (seconds, "s")})
+
+            case _:
+                raise ValueError(f"Unknown benchmark suite: {suite}")
+
+    return {
+        "python": python_version(),
+        "platform": platform(),
+        "warmup": warmup,
+        "repeat": repeat,
+        "metrics": {
+            name: {"value": value, "unit": unit}
+            for name, (value, unit) in metrics.items()
+        },
+        "skipped": skipped,
+    }
+
+
+def format_metric(name: str, value: float, unit: str):
+    return f"{name}: {value:.4f} s" if unit == "s" else f"{name}: {value:.0f}{unit}"
+
+
+def save_results(file: Path, results: dict[str, Any]):
+    with open(file, "w") as f:
+        dump(results, f, indent=2)
+        f.write("\n")
+
+
+def load_results(file: Path) -> dict[str, Any]:
+    with open(file, "r") as f:
+        return load(f)
+
+
+# Compare the metrics which both results have. The change is positive when the
+# metric got worse, as a fraction of the baseline, and is a regression once it
+# exceeds the threshold.
+def compare(results: dict[str, Any], baseline: dict[str, Any], *, threshold: float):
+    lines: list[str] = []
+    regressed: list[str] = []
+
+    for name, metric in results["metrics"].items():
+        if name not in baseline["metrics"]:
+            continue
+
+        value = metric["value"]
+        base = baseline["metrics"][name]["value"]
+        relative = (value - base) / base if base else 0
+        change = relative if metric["unit"] == "s" else -relative
+
+        status = "ok"
+
+        if change > threshold:
+            status = "REGRESSED"
+            regressed.append(name)
+        elif change < -threshold:
+            status = "improved"
+
+        lines.append(f"{name}: {relative:+.1%} {status}")
+
+    return lines, regressed
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    formatter = subparsers.add_parser("format")
+    formatter.add_argument("--lines", type=int, default=10000)
+    formatter.add_argument("--depth", type=int, default=8)
+    formatter.add_argument("--repeat", type=int, default=5)
+
+    printer = subparsers.add_parser("printer")
+    printer.add_argument("-e", "--engine", default="iverilog")
+    printer.add_argument("--chars", type=int, default=2000)
+    printer.add_argument("--repeat", type=int, default=3)
+
+    multiply = subparsers.add_parser("multiply")
+    multiply.add_argument("--count", type=int, default=1000)
+    multiply.add_argument("--prefetch", action="store_true")
+
+    args = parser.parse_args()
+
+    match args.benchmark:
+        case "format":
+            seconds = bench_formatter(
+                lines=args.lines, depth=args.depth, repeat=args.repeat
+            )
+            print(f"format: {args.lines} lines, depth {args.depth}")
+            print(f"seconds: {seconds:.4f}")
+            print(f"lines/s: {args.lines / seconds:.0f}")
+
+        case "printer":
+            for mode in ("flush", "buffered"):
+                rate = bench_printer(
+                    mode=mode, engine=args.engine, chars=args.chars, repeat=args.repeat
+                )
+                print(f"printer ({mode}): {rate:.0f} chars/s")
+
+        case "multiply":
+            results = bench_multiply(count=args.count, prefetch=args.prefetch)
+            _, base = results["shift-add"]
+
+            for name, (instructions, cycles) in results.items():
+                print(
+                    f"multiply ({name}): {instructions} instructions, {cycles} cycles"
+                )
+
+            _, cycles = results["MUL"]
+            print(f"cycles saved: {1 - cycles / base:.1%}")
+
+        case _:
+            raise ValueError(f"Unknown benchmark: {args.benchmark}")
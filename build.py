@@ -0,0 +1,199 @@
+from hashlib import sha256
+from json import dump, load
+from os import close, getpid
+from pathlib import Path
+from re import compile
+from shutil import copy, rmtree
+from tempfile import mkstemp
+from threading import Lock, get_ident
+from time import time
+from typing import Iterable, Optional
+
+DEPENDENCY_RE = compile(
+    r'`(?:include|ASM_DEFINE_PROGRAM_INCLUDE\s*\()\s*"(?P<path>[^"]+)"'
+    r"|`IMPORT\s*\(\s*(?P<module>\w+)\s*\)"
+)
+SOURCE_DIR = Path("src")
+
+
+def relative(file: Path):
+    return Path(file.resolve().relative_to(Path.cwd(), walk_up=True))
+
+
+def mktemp(file: Optional[Path], suffix: str):
+    temp = mkstemp(prefix=f"{file.stem}." if file else "", suffix=suffix)
+    close(temp[0])
+    return Path(temp[1])
+
+
+def read_dependencies(file: Path, root: Path) -> Iterable[Path]:
+    with open(file, "r") as f:
+        content = f.read()
+
+    for match in DEPENDENCY_RE.finditer(content):
+        if match["path"]:
+            candidates = [Path(root, match["path"]), Path(file.parent, match["path"])]
+        else:
+            name = f"{match['module']}.sv"
+            candidates = [
+                Path(file.parent, name),
+                Path(root, name),
+                Path(SOURCE_DIR, name),
+            ]
+
+        for i in candidates:
+            if i.is_file():
+                yield relative(i)
+                break
+
+
+class DependencyGraph:
+    def __init__(self) -> None:
+        self.edges: dict[tuple[Path, Path], list[Path]] = {}
+
+    # `include` paths are resolved against the directory of the file given to
+    # `iverilog`, so the edges of a file depend on that root.
+    def direct(self, file: Path, root: Path):
+        key = (file, root)
+
+        if key not in self.edges:
+            self.edges[key] = sorted(set(read_dependencies(file, root)) - {file})
+
+        return self.edges[key]
+
+    def closure(self, file: Path):
+        file = relative(file)
+        root = file.parent
+        seen = {file}
+        stack = [file]
+
+        while stack:
+            for i in self.direct(stack.pop(), root):
+                if i not in seen:
+                    seen.add(i)
+                    stack.append(i)
+
+        return sorted(seen)
+
+    def affected(self, files: Iterable[Path], changed: Iterable[Path]):
+        changed = {relative(i) for i in changed}
+        return [i for i in files if not changed.isdisjoint(self.closure(i))]
+
+
+def resolve_dependencies(file: Path):
+    return DependencyGraph().closure(file)
+
+
+class BuildCache:
+    def __init__(self, dir: Path, *, max_size: int) -> None:
+        self.dir = dir
+        self.max_size = max_size
+        self.lock = Lock()
+
+    def key(self, files: list[Path], args: list[str]):
+        digest = sha256()
+
+        for i in args:
+            digest.update(i.encode() + b"\0")
+
+        for file in files:
+            for i in resolve_dependencies(file):
+                digest.update(i.as_posix().encode() + b"\0")
+                digest.update(sha256(i.read_bytes()).digest())
+
+        return digest.hexdigest()
+
+    def get(self, key: str, output: Optional[Path]) -> Optional[tuple[str, str]]:
+        entry = Path(self.dir, key)
+        log = Path(entry, "log.json")
+
+        try:
+            with open(log, "r") as f:
+                stdout, stderr = load(f)
+
+            if output is not None:
+                copy(Path(entry, "output"), output)
+
+            log.touch()
+        except (FileNotFoundError, ValueError):
+            self.count("misses")
+            return None
+
+        self.count("hits")
+        return stdout, stderr
+
+    def put(self, key: str, output: Optional[Path], stdout: str, stderr: str):
+        entry = Path(self.dir, key)
+        temp = Path(self.dir, f"{key}.{getpid()}.{get_ident()}")
+        temp.mkdir(parents=True, exist_ok=True)
+
+        if output is not None:
+            copy(output, Path(temp, "output"))
+
+        with open(Path(temp, "log.json"), "w") as f:
+            dump([stdout, stderr], f)
+
+        try:
+            temp.rename(entry)
+        except OSError:
+            rmtree(temp)
+
+        self.evict()
+
+    def entries(self):
+        entries: list[tuple[float, int, Path]] = []
+
+        for i in self.dir.glob("*/log.json"):
+            try:
+                size = sum(j.stat().st_size for j in i.parent.iterdir())
+                entries.append((i.stat().st_mtime, size, i.parent))
+            except FileNotFoundError:
+                pass
+
+        return sorted(entries)
+
+    def evict(self):
+        entries = self.entries()
+        size = sum(i[1] for i in entries)
+
+        for _, entry_size, entry in entries:
+            if size <= self.max_size:
+                break
+
+            rmtree(entry, ignore_errors=True)
+            size -= entry_size
+
+    def count(self, name: str):
+        with self.lock:
+            stats = self.read_stats()
+            stats[name] = stats.get(name, 0) + 1
+            self.dir.mkdir(parents=True, exist_ok=True)
+
+            with open(Path(self.dir, "stats.json"), "w") as f:
+                dump(stats, f)
+
+    def read_stats(self) -> dict[str, int]:
+        try:
+            with open(Path(self.dir, "stats.json"), "r") as f:
+                return load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def stats(self):
+        entries = self.entries()
+        stats = self.read_stats()
+        hits = stats.get("hits", 0)
+        misses = stats.get("misses", 0)
+        size = sum(i[1] for i in entries)
+
+        return [
+            f"entries: {len(entries)}",
+            f"size: {size / 2**20:.1f} MiB / {self.max_size / 2**20:.1f} MiB",
+            f"hits: {hits}",
+            f"misses: {misses}",
+            f"hit rate: {hits / (hits + misses) if hits + misses else 0:.1%}",
+            f"oldest: {time() - entries[0][0]:.0f}s ago" if entries else "oldest: -",
+        ]
+
+    def clear(self):
+        rmtree(self.dir, ignore_errors=True)
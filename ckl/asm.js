@@ -23,6 +23,9 @@ export const sna = 'SNA';
 export const sza = 'SZA';
 export const sze = 'SZE';
 export const hlt = 'HLT';
+// Several register-reference micro-ops at once, defined by `ASM_REG_EXT_INST`.
+// The operand is named after the instruction, and holds its code.
+export const extended = 'EXT';
 
 // Input-output
 export const inp = 'INP';
@@ -123,6 +126,11 @@ export class Instruction {
 				)})`;
 			}
 
+			case extended: {
+				assert(this.operand);
+				return `  \`ASM_${this.operand.name}`;
+			}
+
 			case raw: {
 				assert(this.operand);
 				assert(Array.isArray(this.operand.extra));
@@ -2,6 +2,23 @@
 import assert from 'node:assert';
 import * as ast from './ast.js';
 import * as asm from './asm.js';
+import {cycles, isSkip, optimize} from './optimize.js';
+
+/**
+ * @typedef {import('./optimize.js').Savings} Savings
+ */
+
+/**
+ * Functions with at most this many instructions, which call no other function,
+ * are inlined at every call site.
+ */
+const inlineLeafSize = 8;
+
+/**
+ * Functions with at most this many instructions, which are called once, are
+ * inlined.
+ */
+const inlineSingleCallSize = 256;
 
 class VariableDeclaration {
 	operands;
@@ -19,6 +36,10 @@ class FunctionDeclaration {
 	parameters;
 	body;
 	context;
+	/** @type {asm.Instruction | undefined} */
+	firstInstruction;
+	/** @type {asm.Instruction | undefined} */
+	lastInstruction;
 
 	/**
 	 * @param {asm.Operand} reference
@@ -34,6 +55,32 @@ class FunctionDeclaration {
 	}
 }
 
+/**
+ * @typedef {object} ConstantArgument
+ * @property {asm.Operand} parameter
+ * @property {number | asm.Operand} value
+ * @property {asm.Instruction[]} instructions - the instructions which copy the
+ * value to the parameter.
+ */
+
+class CallSite {
+	callee;
+	call;
+	constants;
+
+	/**
+	 * @param {FunctionDeclaration} callee
+	 * @param {asm.Instruction} call - the `BSA` instruction.
+	 * @param {ConstantArgument[]} constants - the arguments which are constants
+	 * or labels.
+	 */
+	constructor(callee, call, constants) {
+		this.callee = callee;
+		this.call = call;
+		this.constants = constants;
+	}
+}
+
 class SharedContext {
 	/** @type {Set<FunctionDeclaration | VariableDeclaration>} */
 	deferredDeclarations = new Set();
@@ -43,6 +90,10 @@ class SharedContext {
 	isrOperand = new asm.Operand('isr');
 	isrStubOperand = new asm.Operand('isr_stub');
 	postOperand = new asm.Operand('post');
+	/** @type {Set<FunctionDeclaration>} */
+	functions = new Set();
+	/** @type {CallSite[]} */
+	callSites = [];
 	/** @type {asm.Instruction[]} */
 	instructions = [
 		new asm.Instruction(asm.label, this.isrStubOperand),
@@ -230,17 +281,25 @@ export class Context {
 					declaration.context,
 					'Deferred function declaration without a context',
 				);
+				this.shared.functions.add(declaration);
 				this.add(new asm.Instruction(asm.data, declaration.reference));
+				declaration.firstInstruction = this.shared.instructions.at(-1);
 				declaration.context.apply(declaration.body);
 				declaration.context.apply(new ast.Node(undefined, ast.statementReturn));
+				declaration.lastInstruction = this.shared.instructions.at(-1);
 			}
 		}
 	}
 
 	/**
 	 * @param {unknown} list
+	 * @param {object} [options]
+	 * @param {boolean} [options.optimize] - whether to inline functions and
+	 * optimize the instructions. Defaults to true.
+	 * @param {(savings: Map<string, Savings>) => void} [options.report] - called
+	 * with the savings of every function, if optimized.
 	 */
-	static applyList(list) {
+	static applyList(list, {optimize: shouldOptimize = true, report} = {}) {
 		const context = new Context();
 		assert(ast.Node.is(list, ast.list), 'Node is not a list');
 
@@ -270,6 +329,29 @@ export class Context {
 			new asm.Instruction(asm.label, context.shared.postOperand),
 		);
 
+		if (shouldOptimize) {
+			const inlined = context.inlineFunctions();
+
+			while (context.shared.deferredDeclarations.size > 0) {
+				context.applyDeferred();
+			}
+
+			const {instructions, savings} = optimize(
+				context.shared.instructions,
+				new Set([...context.shared.functions].map(i => i.reference)),
+			);
+			context.shared.instructions = instructions;
+
+			for (const [name, {instructions, cycles}] of inlined) {
+				const total = savings.get(name) ?? {instructions: 0, cycles: 0};
+				total.instructions += instructions;
+				total.cycles += cycles;
+				savings.set(name, total);
+			}
+
+			report?.(savings);
+		}
+
 		/**
 		 * @typedef {{next: number, map: Map<number, number>}} OperandInfo
 		 * @type {Map<string, OperandInfo>}
@@ -315,6 +397,311 @@ export class Context {
 		return context.toString();
 	}
 
+	/**
+	 * Replace the calls to small functions with their body, callees first, and
+	 * remove the functions which are no longer referenced. A function is
+	 * inlined at every call site if it calls no other function and has at most
+	 * `inlineLeafSize` instructions, or if it is called once and has at most
+	 * `inlineSingleCallSize` instructions. Recursive functions, `$start`,
+	 * `$isr`, and functions with inline assembly are never inlined.
+	 *
+	 * The arguments which are constants or labels are not copied to the
+	 * parameters, if the body only reads the parameter, or accesses memory
+	 * through it.
+	 *
+	 * @returns {Map<string, Savings>} the savings of every function.
+	 */
+	inlineFunctions() {
+		const {shared} = this;
+		/** @type {Map<asm.Operand, FunctionDeclaration>} */
+		const references = new Map(
+			[...shared.functions].map(i => [i.reference, i]),
+		);
+		/** @type {Map<string, Savings>} */
+		const savings = new Map();
+
+		/**
+		 * @param {string} name
+		 * @param {number} instructions
+		 * @param {number} cycles
+		 */
+		const save = (name, instructions, cycles) => {
+			const total = savings.get(name) ?? {instructions: 0, cycles: 0};
+			total.instructions += instructions;
+			total.cycles += cycles;
+			savings.set(name, total);
+		};
+
+		/**
+		 * @param {FunctionDeclaration} fn
+		 */
+		const range = fn => {
+			assert(fn.firstInstruction && fn.lastInstruction);
+			return [
+				shared.instructions.indexOf(fn.firstInstruction),
+				shared.instructions.indexOf(fn.lastInstruction) + 1,
+			];
+		};
+
+		/**
+		 * @param {FunctionDeclaration} fn
+		 */
+		const bodyOf = fn => {
+			const [start, end] = range(fn);
+			return shared.instructions.slice(start + 1, end);
+		};
+
+		/**
+		 * @param {number} index
+		 */
+		const ownerOf = index =>
+			[...shared.functions].find(fn => {
+				const [start, end] = range(fn);
+				return start <= index && index < end;
+			});
+
+		/** @type {Map<FunctionDeclaration, Set<FunctionDeclaration>>} */
+		const callees = new Map();
+
+		for (const fn of shared.functions) {
+			/** @type {Set<FunctionDeclaration>} */
+			const set = new Set();
+
+			for (const i of bodyOf(fn)) {
+				const callee = i.opcode === asm.bsa && i.operand;
+				const declaration = callee && references.get(callee);
+
+				if (declaration) {
+					set.add(declaration);
+				}
+			}
+
+			callees.set(fn, set);
+		}
+
+		/**
+		 * @param {FunctionDeclaration} fn
+		 */
+		const isRecursive = fn => {
+			const stack = [...(callees.get(fn) ?? [])];
+			const visited = new Set(stack);
+
+			for (let callee = stack.pop(); callee; callee = stack.pop()) {
+				if (callee === fn) {
+					return true;
+				}
+
+				for (const i of callees.get(callee) ?? []) {
+					if (!visited.has(i)) {
+						visited.add(i);
+						stack.push(i);
+					}
+				}
+			}
+
+			return false;
+		};
+
+		/** @type {FunctionDeclaration[]} */
+		const order = [];
+		/** @type {Set<FunctionDeclaration>} */
+		const visited = new Set();
+
+		/**
+		 * @param {FunctionDeclaration} fn
+		 */
+		const visit = fn => {
+			if (visited.has(fn)) {
+				return;
+			}
+
+			visited.add(fn);
+
+			for (const i of callees.get(fn) ?? []) {
+				visit(i);
+			}
+
+			order.push(fn);
+		};
+
+		for (const fn of shared.functions) {
+			visit(fn);
+		}
+
+		for (const fn of order) {
+			const {reference} = fn;
+			const body = bodyOf(fn);
+
+			if (
+				reference === shared.startOperand
+				|| reference === shared.isrOperand
+				|| isRecursive(fn)
+				|| body.some(
+					i =>
+						i.opcode === asm.raw
+						|| (i.operand === reference
+							&& !(i.opcode === asm.bun && i.mode)),
+				)
+			) {
+				continue;
+			}
+
+			const sites = shared.callSites.filter(
+				i => i.callee === fn && shared.instructions.includes(i.call),
+			);
+			const calls = new Set(sites.map(i => i.call));
+			const [start, end] = range(fn);
+			const isReferenced = shared.instructions.some(
+				(i, index) =>
+					(index < start || index >= end)
+					&& !calls.has(i)
+					&& (i.operand === reference || i.operand?.defaultValue === reference),
+			);
+			const size = body.filter(i => i.opcode !== asm.label).length;
+			const isLeaf = body.every(i => i.opcode !== asm.bsa);
+
+			if (
+				!(isLeaf && size <= inlineLeafSize)
+				&& !(
+					sites.length === 1
+					&& !isReferenced
+					&& size <= inlineSingleCallSize
+				)
+			) {
+				continue;
+			}
+
+			/** @type {Set<asm.Operand>} */
+			const substitutable = new Set(
+				fn.parameters.filter(parameter =>
+					body.every(
+						i =>
+							i.operand?.defaultValue !== parameter
+							&& (i.operand !== parameter
+								|| i.mode
+								|| i.opcode === asm.lda
+								|| i.opcode === asm.add
+								|| i.opcode === asm.and),
+					),
+				),
+			);
+
+			for (const site of sites) {
+				const index = shared.instructions.indexOf(site.call);
+
+				if (isSkip(shared.instructions[index - 1])) {
+					continue;
+				}
+
+				const owner = ownerOf(index)?.reference.name ?? '';
+				/** @type {Map<asm.Operand, number | asm.Operand>} */
+				const constants = new Map();
+				/** @type {Map<asm.Operand, asm.Operand>} */
+				const labels = new Map();
+				const end = new asm.Operand('end');
+				let words = 1;
+				let saved = cycles(site.call);
+
+				for (const i of body) {
+					if (i.opcode === asm.label && i.operand) {
+						labels.set(i.operand, new asm.Operand(i.operand.name));
+					}
+				}
+
+				for (const {parameter, value, instructions} of site.constants) {
+					const indices = instructions.map(i => shared.instructions.indexOf(i));
+
+					if (
+						!substitutable.has(parameter)
+						|| indices.includes(-1)
+						|| isSkip(shared.instructions[(indices[0] ?? 0) - 1])
+					) {
+						continue;
+					}
+
+					constants.set(parameter, value);
+
+					for (const i of instructions) {
+						words++;
+						saved += cycles(i);
+						shared.instructions.splice(shared.instructions.indexOf(i), 1);
+					}
+				}
+
+				const copy = body.map(i => {
+					const value = i.operand ? constants.get(i.operand) : undefined;
+
+					if (i.opcode === asm.bun && i.mode && i.operand === reference) {
+						return new asm.Instruction(asm.bun, end);
+					}
+
+					if (value === undefined) {
+						return new asm.Instruction(
+							i.opcode,
+							i.operand && (labels.get(i.operand) ?? i.operand),
+							i.mode,
+						);
+					}
+
+					if (i.mode) {
+						return value instanceof asm.Operand
+							? new asm.Instruction(i.opcode, value)
+							: new asm.Instruction(
+								i.opcode,
+								this.getScratchConstant(value),
+								true,
+							);
+					}
+
+					return i.opcode === asm.lda && value === 0
+						? new asm.Instruction(asm.cla)
+						: new asm.Instruction(i.opcode, this.getScratchConstant(value));
+				});
+
+				// The last instruction is the return.
+				if (copy.at(-1)?.operand === end) {
+					copy.pop();
+					saved += cycles(/** @type {asm.Instruction} */ (body.at(-1)));
+				}
+
+				if (copy.some(i => i.operand === end)) {
+					copy.push(new asm.Instruction(asm.label, end));
+				}
+
+				shared.instructions.splice(
+					shared.instructions.indexOf(site.call),
+					1,
+					...copy,
+				);
+				words -= copy.filter(i => i.opcode !== asm.label).length;
+				save(owner, words, saved);
+			}
+
+			const [first, last] = range(fn);
+
+			if (
+				!shared.instructions.some(
+					(i, index) =>
+						(index < first || index >= last)
+						&& (i.operand === reference
+							|| i.operand?.defaultValue === reference),
+				)
+			) {
+				save(
+					reference.name,
+					shared.instructions
+						.slice(first, last)
+						.filter(i => i.opcode !== asm.label).length,
+					0,
+				);
+				shared.instructions.splice(first, last - first);
+				shared.functions.delete(fn);
+			}
+		}
+
+		return savings;
+	}
+
 	/**
 	 * @param {unknown} node
 	 */
@@ -796,12 +1183,38 @@ export class Context {
 						'Mismatched number of arguments',
 					);
 
-					for (const i of fn.parameters.keys()) {
+					/** @type {CallSite['constants']} */
+					const constants = [];
+
+					for (const [i, parameter] of fn.parameters.entries()) {
+						const start = this.shared.instructions.length;
 						this.accumulate(args[i]);
-						this.add(new asm.Instruction(asm.sta, fn.parameters[i]));
+						this.add(new asm.Instruction(asm.sta, parameter));
+						const instructions = this.shared.instructions.slice(start);
+						const [load] = instructions;
+
+						if (instructions.length !== 2 || !load) {
+							continue;
+						}
+
+						if (load.opcode === asm.cla) {
+							constants.push({parameter, value: 0, instructions});
+						} else if (
+							load.opcode === asm.lda
+							&& !load.mode
+							&& load.operand?.extra === 'const'
+						) {
+							constants.push({
+								parameter,
+								value: load.operand.defaultValue,
+								instructions,
+							});
+						}
 					}
 
-					this.add(new asm.Instruction(asm.bsa, fn.reference));
+					const call = new asm.Instruction(asm.bsa, fn.reference);
+					this.add(call);
+					this.shared.callSites.push(new CallSite(fn, call, constants));
 				} else if (ast.Node.is(id, ast.specialIdentifier)) {
 					const [name] = id.args;
 					assert(
@@ -2107,8 +2520,22 @@ export class Context {
 	}
 
 	toString() {
-		return `\`include "preamble.sv"\n\`IMPORT(assembler)\n\n${this.shared.instructions.join(
-			'\n',
-		)}`;
+		/** @type {Map<string, number | asm.Operand>} */
+		const extended = new Map();
+
+		for (const i of this.shared.instructions) {
+			if (i.opcode === asm.extended && i.operand) {
+				extended.set(i.operand.name, i.operand.defaultValue);
+			}
+		}
+
+		const definitions = [...extended].map(([name, code]) => {
+			const bits = Number(code).toString(2).padStart(12, '0');
+			return `\`ASM_REG_EXT_INST(${name}, 12'b${bits})\n`;
+		});
+
+		return `\`include "preamble.sv"\n\`IMPORT(assembler)\n${definitions.join(
+			'',
+		)}\n${this.shared.instructions.join('\n')}`;
 	}
 }
@@ -0,0 +1,558 @@
+import assert from 'node:assert/strict';
+import {test} from 'node:test';
+import * as ast from './ast.js';
+import {Context} from './gen.js';
+
+/**
+ * @param {string} type
+ * @param {unknown[]} args
+ */
+const node = (type, ...args) => new ast.Node(undefined, type, ...args);
+/** @param {string} name */
+const id = name => node(ast.identifier, name);
+/** @param {number | string} value */
+const lit = value => node(ast.literal, value);
+/** @param {ast.Node[]} items */
+const list = (...items) => ast.Node.concat(...items);
+/** @param {ast.Node} expression */
+const expr = expression => node(ast.statementExpression, expression);
+/**
+ * @param {ast.Node} target
+ * @param {ast.Node} value
+ */
+const set = (target, value) => node(ast.set, target, value);
+/**
+ * @param {string} name
+ * @param {ast.Node[]} args
+ */
+const call = (name, ...args) => node(ast.functionCall, id(name), ...args);
+/**
+ * @param {string} name
+ * @param {ast.Node[]} args
+ */
+const special = (name, ...args) =>
+	node(ast.functionCall, node(ast.specialIdentifier, name), ...args);
+/** @param {ast.Node} pointer */
+const deref = pointer => node(ast.dereference, pointer);
+/** @param {ast.Node} value */
+const ref = value => node(ast.reference, value);
+const post = node(ast.specialIdentifier, '$post');
+/**
+ * @param {string} name
+ * @param {string[]} parameters
+ * @param {ast.Node[]} body
+ */
+const fn = (name, parameters, ...body) =>
+	node(
+		ast.declarationFunction,
+		name,
+		list(...parameters.map(id)),
+		list(...body),
+	);
+
+/**
+ * `src/program.ckl`, which reverses a line of input.
+ */
+const reverse = () =>
+	list(
+		node(ast.declarationVariable, id('str_msg'), lit('Enter your message: \0')),
+		node(ast.declarationVariable, id('str_rev'), lit('Its reverse is: \0')),
+		fn('set_ch', ['ch'], expr(special('$output', id('ch')))),
+		fn(
+			'set_st',
+			['ptr'],
+			node(
+				ast.statementFor,
+				id('ch'),
+				node(ast.notEquals, set(id('ch'), deref(id('ptr'))), lit(0)),
+				node(ast.preIncrement, id('ptr')),
+				list(expr(call('set_ch', id('ch')))),
+			),
+		),
+		fn(
+			'set_ln',
+			['ptr'],
+			expr(call('set_st', id('ptr'))),
+			expr(call('set_ch', lit('\n'))),
+		),
+		fn(
+			'get_ch',
+			[],
+			expr(set(id('ch'), special('$input'))),
+			expr(call('set_ch', id('ch'))),
+			expr(id('ch')),
+		),
+		fn(
+			'get_ln',
+			['ptr'],
+			node(
+				ast.statementFor,
+				id('ch'),
+				node(ast.notEquals, set(id('ch'), call('get_ch')), lit('\n')),
+				node(ast.preIncrement, id('ptr')),
+				list(expr(set(deref(id('ptr')), id('ch')))),
+			),
+			expr(set(deref(id('ptr')), lit(0))),
+		),
+		fn(
+			'rev_st',
+			['ptr'],
+			expr(set(id('bgn'), id('ptr'))),
+			node(
+				ast.statementWhile,
+				node(ast.notEquals, deref(id('ptr')), lit(0)),
+				expr(node(ast.preIncrement, id('ptr'))),
+			),
+			node(
+				ast.statementFor,
+				set(
+					id('mid'),
+					node(
+						ast.add,
+						node(
+							ast.shiftRight,
+							node(ast.subtract, id('ptr'), id('bgn')),
+							lit(1),
+						),
+						id('bgn'),
+					),
+				),
+				node(ast.lessThan, id('mid'), node(ast.preDecrement, id('ptr'))),
+				node(ast.preIncrement, id('bgn')),
+				list(
+					expr(set(id('tmp'), deref(id('bgn')))),
+					expr(set(deref(id('bgn')), deref(id('ptr')))),
+					expr(set(deref(id('ptr')), id('tmp'))),
+				),
+			),
+		),
+		fn(
+			'$start',
+			[],
+			expr(call('set_st', ref(id('str_msg')))),
+			expr(call('get_ln', post)),
+			expr(call('rev_st', post)),
+			expr(call('set_st', ref(id('str_rev')))),
+			expr(call('set_ln', post)),
+		),
+	);
+
+/**
+ * Arithmetic, shifts, comparisons and a function called from a loop.
+ */
+const math = () =>
+	list(
+		node(ast.declarationVariable, id('r')),
+		fn(
+			'fib',
+			['n'],
+			node(
+				ast.statementIf,
+				node(ast.lessThan, id('n'), lit(2)),
+				node(ast.statementReturn, id('n')),
+			),
+			expr(set(id('a'), lit(0))),
+			expr(set(id('b'), lit(1))),
+			node(
+				ast.statementWhile,
+				node(ast.greaterThan, id('n'), lit(1)),
+				list(
+					expr(set(id('t'), node(ast.add, id('a'), id('b')))),
+					expr(set(id('a'), id('b'))),
+					expr(set(id('b'), id('t'))),
+					expr(node(ast.setMinus, id('n'), lit(1))),
+				),
+			),
+			node(ast.statementReturn, id('b')),
+		),
+		fn(
+			'mix',
+			['x', 'y'],
+			expr(node(ast.setBitwiseXor, id('x'), id('y'))),
+			expr(node(ast.setBitwiseOr, id('x'), lit(0x30))),
+			expr(node(ast.setShiftLeft, id('y'), lit(3))),
+			expr(node(ast.setArithmeticShiftRight, id('x'), lit(2))),
+			expr(node(ast.setShiftRight, id('y'), lit(5))),
+			node(
+				ast.statementIf,
+				node(ast.equals, id('x'), id('y')),
+				expr(set(id('x'), lit(1))),
+				node(
+					ast.statementIf,
+					node(ast.greaterOrEquals, id('x'), id('y')),
+					expr(set(id('x'), lit(2))),
+					expr(set(id('x'), lit(3))),
+				),
+			),
+			node(
+				ast.statementReturn,
+				node(ast.add, node(ast.bitwiseAnd, id('x'), lit(0xF)), id('y')),
+			),
+		),
+		fn(
+			'out',
+			['v'],
+			expr(
+				special(
+					'$output',
+					node(ast.add, node(ast.bitwiseAnd, id('v'), lit(0x3F)), lit(0x40)),
+				),
+			),
+		),
+		fn(
+			'$start',
+			[],
+			expr(set(id('i'), lit(0))),
+			node(
+				ast.statementWhile,
+				node(ast.lessThan, id('i'), lit(12)),
+				list(
+					expr(set(id('r'), call('fib', id('i')))),
+					expr(call('out', id('r'))),
+					expr(call('out', call('mix', id('r'), id('i')))),
+					expr(node(ast.preIncrement, id('i'))),
+				),
+			),
+			node(ast.statementReturn),
+		),
+	);
+
+/**
+ * The cases which the inliner must leave alone: a recursive function, the
+ * interrupt handler, and a call right after inline assembly, which may skip.
+ */
+const guards = () =>
+	list(
+		node(ast.declarationVariable, id('str'), lit('Hi\0')),
+		node(ast.declarationVariable, id('p')),
+		fn('put', ['c'], expr(special('$output', id('c')))),
+		fn(
+			'first',
+			['ptr'],
+			expr(
+				call(
+					'put',
+					node(
+						ast.add,
+						node(ast.bitwiseAnd, deref(id('ptr')), lit(0x3F)),
+						lit(0x40),
+					),
+				),
+			),
+		),
+		fn(
+			'twice',
+			['a', 'b'],
+			expr(call('put', node(ast.add, id('a'), id('a')))),
+			expr(call('put', id('b'))),
+		),
+		fn(
+			'rec',
+			['n'],
+			node(ast.statementIf, id('n'), expr(call('rec', lit(0)))),
+			expr(call('put', node(ast.add, id('n'), lit(0x30)))),
+		),
+		fn('g', [], expr(call('put', lit(0x47)))),
+		fn('h', [], expr(call('put', lit(0x48)))),
+		fn('$isr', [], expr(call('put', lit(0x49)))),
+		fn(
+			'$start',
+			[],
+			expr(call('first', ref(id('str')))),
+			expr(call('first', post)),
+			expr(call('twice', lit(0x21), lit(0x42))),
+			expr(set(id('v'), lit(0x22))),
+			expr(call('twice', id('v'), id('v'))),
+			expr(call('rec', lit(1))),
+			expr(call('g')),
+			expr(set(id('p'), ref(id('g')))),
+			expr(node(ast.functionCall, deref(id('p')))),
+			expr(node(ast.assembly, lit('  `ASM_CLE'))),
+			expr(call('h')),
+			expr(call('h')),
+			expr(call('put', lit(0x0A))),
+		),
+	);
+
+const memoryReference = new Map([
+	['AND', 0x0],
+	['ADD', 0x10_00],
+	['LDA', 0x20_00],
+	['STA', 0x30_00],
+	['BUN', 0x40_00],
+	['BSA', 0x50_00],
+	['ISZ', 0x60_00],
+]);
+
+const registerReference = new Map([
+	['CLA', 0x78_00],
+	['CLE', 0x74_00],
+	['CMA', 0x72_00],
+	['CME', 0x71_00],
+	['CIR', 0x70_80],
+	['CIL', 0x70_40],
+	['INC', 0x70_20],
+	['SPA', 0x70_10],
+	['SNA', 0x70_08],
+	['SZA', 0x70_04],
+	['SZE', 0x70_02],
+	['HLT', 0x70_01],
+	['INP', 0xF8_00],
+	['OUT', 0xF4_00],
+	['SKI', 0xF2_00],
+	['SKO', 0xF1_00],
+	['ION', 0xF0_80],
+	['IOF', 0xF0_40],
+]);
+
+/**
+ * Assemble the output of the code generator into memory words.
+ *
+ * @param {string} source
+ */
+function assemble(source) {
+	/** @type {Array<number | string>} */
+	const words = [];
+	/** @type {Map<string, number>} */
+	const labels = new Map();
+	const instructions = new Map(registerReference);
+
+	for (const [, name = '', argument = ''] of source.matchAll(
+		/`ASM_(\w+)(?:\(([^)]*)\))?/g,
+	)) {
+		const [, opcode = '', mode] = /^(\w+?)(?:_([DI])L)?$/.exec(name) ?? [];
+
+		if (name === 'LABEL') {
+			labels.set(argument, words.length);
+		} else if (name === 'DATA') {
+			const [value = ''] = argument.split(',');
+			const hex = /^16'h(\w+)$/.exec(value.trim());
+			words.push(
+				(hex ? Number.parseInt(hex[1] ?? '', 16) : Number(value)) & 0xFF_FF,
+			);
+		} else if (name === 'REG_EXT_INST') {
+			const [instruction = '', code = ''] = argument.split(/,\s*/);
+			instructions.set(instruction, 0x70_00 | Number.parseInt(code.slice(4), 2));
+		} else if (name === 'DATA_LABEL') {
+			words.push(`0:${argument}`);
+		} else if (mode && memoryReference.has(opcode)) {
+			const word = memoryReference.get(opcode) ?? 0;
+			words.push(`${mode === 'I' ? word | 0x80_00 : word}:${argument}`);
+		} else {
+			const word = instructions.get(name);
+			assert(word !== undefined, `Unknown instruction ${name}`);
+			words.push(word);
+		}
+	}
+
+	return words.map(word => {
+		if (typeof word === 'number') {
+			return word;
+		}
+
+		const [instruction = '', label = ''] = word.split(':');
+		const address = labels.get(label);
+		assert(address !== undefined, `Unknown label ${label}`);
+		return Number(instruction) | address;
+	});
+}
+
+/**
+ * Run an assembled program until it halts, without interrupts.
+ *
+ * @param {number[]} memory
+ * @param {string} input
+ */
+function execute(memory, input = '') {
+	/** @type {number[]} */
+	const output = [];
+	let ac = 0;
+	let e = 0;
+	let pc = 0;
+	let steps = 0;
+
+	for (;;) {
+		steps++;
+		assert(steps < 1_000_000, 'Program did not halt');
+		const ir = memory[pc] ?? 0;
+		pc = (pc + 1) & 0xF_FF;
+		const opcode = (ir >> 12) & 7;
+		let address = ir & 0xF_FF;
+
+		if (opcode !== 7) {
+			if (ir & 0x80_00) {
+				address = (memory[address] ?? 0) & 0xF_FF;
+			}
+
+			const value = memory[address] ?? 0;
+
+			switch (opcode) {
+				case 0: {
+					ac &= value;
+					break;
+				}
+
+				case 1: {
+					const sum = ac + value;
+					ac = sum & 0xFF_FF;
+					e = sum >> 16;
+					break;
+				}
+
+				case 2: {
+					ac = value;
+					break;
+				}
+
+				case 3: {
+					memory[address] = ac;
+					break;
+				}
+
+				case 4: {
+					pc = address;
+					break;
+				}
+
+				case 5: {
+					memory[address] = pc;
+					pc = (address + 1) & 0xF_FF;
+					break;
+				}
+
+				default: {
+					memory[address] = (value + 1) & 0xFF_FF;
+
+					if (memory[address] === 0) {
+						pc++;
+					}
+				}
+			}
+		} else if (ir & 0x80_00) {
+			if (ir & 0x8_00) {
+				assert(input.length > 0, 'Program read past the end of input');
+				ac = input.codePointAt(0) ?? 0;
+				input = input.slice(1);
+			}
+
+			if (ir & 0x4_00) {
+				output.push(ac & 0xFF);
+			}
+
+			if (ir & 0x3_00) {
+				pc++;
+			}
+		} else {
+			const skip =
+				(ir & 0x10 && !(ac & 0x80_00))
+				|| (ir & 0x8 && ac & 0x80_00)
+				|| (ir & 0x4 && ac === 0)
+				|| (ir & 0x2 && e === 0);
+
+			if (ir & 0x8_00) {
+				ac = 0;
+			}
+
+			if (ir & 0x4_00) {
+				e = 0;
+			}
+
+			if (ir & 0x2_00) {
+				ac ^= 0xFF_FF;
+			}
+
+			if (ir & 0x1_00) {
+				e ^= 1;
+			}
+
+			if (ir & 0x80) {
+				[ac, e] = [(ac >> 1) | (e << 15), ac & 1];
+			}
+
+			if (ir & 0x40) {
+				[ac, e] = [((ac << 1) & 0xFF_FF) | e, ac >> 15];
+			}
+
+			if (ir & 0x20) {
+				ac = (ac + 1) & 0xFF_FF;
+			}
+
+			if (skip) {
+				pc++;
+			}
+
+			if (ir & 0x1) {
+				return {output: String.fromCodePoint(...output), steps};
+			}
+		}
+	}
+}
+
+/**
+ * @param {ast.Node} program
+ * @param {boolean} optimize
+ */
+function compile(program, optimize) {
+	return Context.applyList(program, {optimize});
+}
+
+/**
+ * @param {string} source
+ * @param {string} name
+ */
+function bodyOf(source, name) {
+	const start = source.indexOf(`\`ASM_LABEL(${name})\n`);
+	assert(start >= 0, `Function ${name} was removed`);
+	const end = source.indexOf('`ASM_BUN_IL', start);
+	return end >= 0 ? source.slice(start, end) : source.slice(start);
+}
+
+for (const [name, program, input, expected] of /** @type {const} */ ([
+	[
+		'reverse',
+		reverse,
+		'hello world\n',
+		'Enter your message: hello world\nIts reverse is: dlrow olleh\n',
+	],
+	['math', math, '', '@BABABBBCCECHCMCUDbDwDYD'],
+	['guards', guards, '', 'H@BBD"1GGHH\n'],
+])) {
+	test(`${name} prints the same output when optimized`, () => {
+		const plain = assemble(compile(program(), false));
+		const optimized = assemble(compile(program(), true));
+		const before = execute(plain, input);
+		const after = execute(optimized, input);
+
+		assert.equal(before.output, expected);
+		assert.equal(after.output, before.output);
+		assert.ok(after.steps < before.steps);
+	});
+}
+
+test('does not inline a recursive function', () => {
+	const source = compile(guards(), true);
+	assert.match(bodyOf(source, 'rec_'), /`ASM_BSA_DL\(rec_\)/);
+	assert.match(bodyOf(source, 'start_'), /`ASM_BSA_DL\(rec_\)/);
+});
+
+test('does not inline the interrupt handler', () => {
+	const source = compile(guards(), true);
+	assert.match(source, /`ASM_BSA_DL\(isr_\)/);
+	assert.match(source, /`ASM_LABEL\(isr_\)/);
+});
+
+test('does not inline a call which may be skipped', () => {
+	const body = bodyOf(compile(guards(), true), 'start_');
+	assert.match(body, /`ASM_CLE\n {2}`ASM_BSA_DL\(h_\)\n {2}`ASM_LDA_DL\(_72_\)/);
+});
+
+test('substitutes constant arguments', () => {
+	const source = compile(guards(), true);
+	const body = bodyOf(source, 'g_');
+	assert.match(body, /`ASM_LDA_DL\(_71_\)/);
+	assert.doesNotMatch(body, /`ASM_STA_DL\(c_\)/);
+});
+
+test('optimizes by default', () => {
+	assert.equal(Context.applyList(guards()), compile(guards(), true));
+});
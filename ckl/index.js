@@ -15,4 +15,14 @@ const content = await fs.readFile(input, 'utf8');
 const parser = new nearley.Parser(grammar);
 parser.feed(content);
 
-await fs.writeFile(output, `${Context.applyList(parser.results[0])}\n`, 'utf8');
+const result = Context.applyList(parser.results[0], {
+	report(savings) {
+		for (const [name, {instructions, cycles}] of savings) {
+			console.error(
+				`${name || '(global)'}: saved ${instructions} instructions and ${cycles} cycles`,
+			);
+		}
+	},
+});
+
+await fs.writeFile(output, `${result}\n`, 'utf8');
@@ -0,0 +1,769 @@
+/* eslint-disable no-bitwise */
+import * as asm from './asm.js';
+
+/**
+ * @typedef {{instructions: number, cycles: number}} Savings
+ */
+
+// Cycles of the memory-reference instructions, which are the same whether
+// direct or indirect, as `MEMORY_CYCLES` in `simulator.py`.
+const memoryCycles = new Map([
+	[asm.and, 6],
+	[asm.add, 6],
+	[asm.lda, 6],
+	[asm.sta, 5],
+	[asm.bun, 5],
+	[asm.bsa, 6],
+	[asm.isz, 7],
+]);
+
+const skips = new Set([
+	asm.spa,
+	asm.sna,
+	asm.sza,
+	asm.sze,
+	asm.isz,
+	asm.ski,
+	asm.sko,
+]);
+
+/**
+ * The register-reference micro-ops which can be folded, with their bit of the
+ * operand, and the registers they read and write.
+ *
+ * @type {Map<string, {code: number, reads: string[], writes: string[]}>}
+ */
+const microOps = new Map([
+	[asm.cla, {code: 1 << 11, reads: [], writes: ['AC']}],
+	[asm.cle, {code: 1 << 10, reads: [], writes: ['E']}],
+	[asm.cma, {code: 1 << 9, reads: ['AC'], writes: ['AC']}],
+	[asm.cme, {code: 1 << 8, reads: ['E'], writes: ['E']}],
+	[asm.cir, {code: 1 << 7, reads: ['AC', 'E'], writes: ['AC', 'E']}],
+	[asm.cil, {code: 1 << 6, reads: ['AC', 'E'], writes: ['AC', 'E']}],
+	[asm.inc, {code: 1 << 5, reads: ['AC'], writes: ['AC']}],
+	[asm.spa, {code: 1 << 4, reads: ['AC'], writes: []}],
+	[asm.sna, {code: 1 << 3, reads: ['AC'], writes: []}],
+	[asm.sza, {code: 1 << 2, reads: ['AC'], writes: []}],
+	[asm.sze, {code: 1 << 1, reads: ['E'], writes: []}],
+]);
+
+/**
+ * The bits of the micro-ops which skip.
+ */
+const skipCodes = [...microOps]
+	.filter(([name]) => skips.has(name))
+	.reduce((codes, [, {code}]) => codes | code, 0);
+
+/**
+ * Pairs of micro-ops which `extended_instructions.py` names as one.
+ *
+ * @type {Array<[string, string, string]>}
+ */
+const simplifications = [
+	['SKP', 'SPA', 'SNA'],
+	['SAE', 'SZA', 'SZE'],
+	['SNE', 'SNA', 'SZE'],
+	['SPE', 'SPA', 'SZE'],
+	['SQA', 'SNA', 'SZA'],
+	['SQE', 'SNA', 'SAE'],
+	['CLR', 'CLA', 'CLE'],
+	['CER', 'CLA', 'CIR'],
+	['CEL', 'CLA', 'CIL'],
+	['CCA', 'CLE', 'CMA'],
+	['CCE', 'CLA', 'CME'],
+	['CMP', 'CMA', 'CME'],
+	['CLI', 'INC', 'CLE'],
+	['CMI', 'INC', 'CME'],
+];
+
+/**
+ * The name of an extended instruction, as `extended_instructions.py` gives it
+ * to a skip and an action. Other combinations are named after all of their
+ * micro-ops, so that different instructions never share a name.
+ *
+ * @param {string[]} micro - the micro-ops, in the order of `microOps`.
+ */
+function extendedName(micro) {
+	let names = micro;
+
+	for (const [result, ...source] of simplifications) {
+		if (source.every(i => names.includes(i))) {
+			names = [...names.filter(i => !source.includes(i)), result];
+		}
+	}
+
+	const [skip, ...otherSkips] = names.filter(i => i.startsWith('S'));
+	const [action, ...otherActions] = names.filter(
+		i => i.startsWith('C') || i === asm.inc,
+	);
+
+	if (
+		skip
+		&& action
+		&& otherSkips.length === 0
+		&& otherActions.length === 0
+		&& names.length === 2
+	) {
+		return skip.slice(1) + (action === asm.inc ? 'IN' : action.slice(1));
+	}
+
+	return `X${names.join('')}`;
+}
+
+/**
+ * Instructions which end with `E` unrelated to its previous value.
+ */
+const eWriters = new Set([asm.add, asm.cle]);
+
+/**
+ * Instructions which neither read `E` nor change the flow of the program.
+ */
+const eIgnorers = new Set([
+	asm.and,
+	asm.lda,
+	asm.sta,
+	asm.cla,
+	asm.cma,
+	asm.inc,
+	asm.inp,
+	asm.out,
+	asm.ion,
+	asm.iof,
+]);
+
+/**
+ * Instructions which only load `AC`, without reading it.
+ */
+const acLoaders = new Set([asm.lda, asm.cla]);
+
+/**
+ * Instructions which leave `AC` untouched.
+ */
+const acPreservers = new Set([
+	asm.sta,
+	asm.bun,
+	asm.isz,
+	asm.cle,
+	asm.cme,
+	asm.spa,
+	asm.sna,
+	asm.sza,
+	asm.sze,
+	asm.hlt,
+	asm.out,
+	asm.ski,
+	asm.sko,
+	asm.ion,
+	asm.iof,
+]);
+
+/**
+ * Estimated cycles of an instruction, or zero for the ones which are not
+ * executed.
+ *
+ * @param {asm.Instruction} instruction
+ */
+export function cycles(instruction) {
+	switch (instruction.opcode) {
+		case asm.label:
+		case asm.data:
+		case asm.blank: {
+			return 0;
+		}
+
+		default: {
+			const base = memoryCycles.get(instruction.opcode);
+			return base ?? 4;
+		}
+	}
+}
+
+/**
+ * Whether the instruction may skip the next one. Raw assembly is assumed to.
+ *
+ * @param {asm.Instruction | undefined} instruction
+ */
+export function isSkip(instruction) {
+	return (
+		instruction !== undefined
+		&& (skips.has(instruction.opcode)
+			|| instruction.opcode === asm.raw
+			|| (instruction.opcode === asm.extended
+				&& (Number(instruction.operand?.defaultValue) & skipCodes) !== 0))
+	);
+}
+
+/**
+ * Whether control may enter the program at the instruction other than from the
+ * previous one. Raw assembly may define labels.
+ *
+ * @param {asm.Instruction} instruction
+ */
+function isBarrier(instruction) {
+	return (
+		instruction.opcode === asm.label
+		|| instruction.opcode === asm.data
+		|| instruction.opcode === asm.raw
+	);
+}
+
+class Optimizer {
+	/** @type {asm.Instruction[]} */
+	instructions;
+	/** @type {string[]} */
+	owners;
+	/** @type {Map<string, Savings>} */
+	savings = new Map();
+	changed = false;
+
+	/**
+	 * @param {asm.Instruction[]} instructions
+	 * @param {Set<asm.Operand>} functions
+	 */
+	constructor(instructions, functions) {
+		this.instructions = [...instructions];
+		this.owners = [];
+		let owner = '';
+
+		for (const i of instructions) {
+			if (i.opcode === asm.data && i.operand && functions.has(i.operand)) {
+				owner = i.operand.name;
+				this.savings.set(owner, {instructions: 0, cycles: 0});
+			}
+
+			this.owners.push(owner);
+		}
+	}
+
+	/**
+	 * @param {number} index
+	 * @param {number} instructions
+	 * @param {number} cycles
+	 */
+	save(index, instructions, cycles) {
+		const owner = this.owners[index];
+		const savings = this.savings.get(owner ?? '') ?? {
+			instructions: 0,
+			cycles: 0,
+		};
+
+		savings.instructions += instructions;
+		savings.cycles += cycles;
+		this.savings.set(owner ?? '', savings);
+		this.changed = true;
+	}
+
+	/**
+	 * @param {number} index
+	 */
+	remove(index) {
+		const instruction = this.instructions[index];
+
+		if (instruction) {
+			this.save(index, 1, cycles(instruction));
+		}
+
+		this.instructions.splice(index, 1);
+		this.owners.splice(index, 1);
+	}
+
+	/**
+	 * @param {number} index
+	 * @param {asm.Instruction} instruction
+	 */
+	replace(index, instruction) {
+		const old = this.instructions[index];
+
+		if (old) {
+			this.save(index, 0, cycles(old) - cycles(instruction));
+		}
+
+		this.instructions[index] = instruction;
+	}
+
+	/**
+	 * Whether the instruction at the index may be skipped.
+	 *
+	 * @param {number} index
+	 */
+	isSkipped(index) {
+		return isSkip(this.instructions[index - 1]);
+	}
+
+	/**
+	 * Drop the instructions after an unconditional jump, up to the next label,
+	 * such as the implicit return after an explicit one.
+	 */
+	removeUnreachable() {
+		for (let i = 0; i < this.instructions.length; i++) {
+			const instruction = this.instructions[i];
+
+			if (instruction?.opcode !== asm.bun || this.isSkipped(i)) {
+				continue;
+			}
+
+			while (
+				i + 1 < this.instructions.length
+				&& !isBarrier(/** @type {asm.Instruction} */ (this.instructions[i + 1]))
+			) {
+				this.remove(i + 1);
+			}
+		}
+	}
+
+	/**
+	 * Index of the first instruction at the label, skipping other labels.
+	 *
+	 * @param {asm.Operand} operand
+	 */
+	findTarget(operand) {
+		let index = this.instructions.findIndex(
+			i => i.opcode === asm.label && i.operand === operand,
+		);
+
+		if (index < 0) {
+			return -1;
+		}
+
+		while (this.instructions[index]?.opcode === asm.label) {
+			index++;
+		}
+
+		return index;
+	}
+
+	/**
+	 * Jump straight to the end of a chain of jumps, and drop the jumps to the
+	 * next instruction.
+	 */
+	threadJumps() {
+		for (let i = 0; i < this.instructions.length; i++) {
+			const instruction = this.instructions[i];
+
+			if (
+				instruction?.opcode !== asm.bun
+				|| instruction.mode
+				|| !instruction.operand
+			) {
+				continue;
+			}
+
+			let {operand, mode} = instruction;
+			const visited = new Set([operand]);
+			let index = this.findTarget(operand);
+
+			while (!mode && index >= 0) {
+				const target = this.instructions[index];
+
+				if (target?.opcode !== asm.bun || !target.operand) {
+					break;
+				}
+
+				if (visited.has(target.operand)) {
+					break;
+				}
+
+				operand = target.operand;
+				mode = target.mode;
+				visited.add(operand);
+				index = mode ? -1 : this.findTarget(operand);
+			}
+
+			if (operand !== instruction.operand) {
+				// Every jump skipped is direct, except maybe the last, which
+				// replaces this one.
+				this.instructions[i] = new asm.Instruction(asm.bun, operand, mode);
+				this.save(i, 0, cycles(instruction) * (visited.size - 1));
+			}
+
+			if (
+				!mode
+				&& index > i
+				&& this.instructions
+					.slice(i + 1, index)
+					.every(j => j.opcode === asm.label)
+				&& !this.isSkipped(i)
+			) {
+				this.remove(i--);
+			}
+		}
+	}
+
+	/**
+	 * Whether `E` is overwritten after the instruction at the index before
+	 * anything reads it or the program branches.
+	 *
+	 * @param {number} index
+	 */
+	isEDead(index) {
+		for (const i of this.instructions.slice(index + 1)) {
+			if (eWriters.has(i.opcode)) {
+				return true;
+			}
+
+			if (!eIgnorers.has(i.opcode)) {
+				return false;
+			}
+		}
+
+		return false;
+	}
+
+	/**
+	 * Access the labels directly instead of through the scratch variables which
+	 * were just loaded with their address, as in an assignment.
+	 */
+	resolvePointers() {
+		/** @type {Map<asm.Operand, asm.Operand>} */
+		const pointers = new Map();
+		/** @type {asm.Operand | undefined} */
+		let pointer;
+
+		for (let i = 0; i < this.instructions.length; i++) {
+			const instruction = /** @type {asm.Instruction} */ (
+				this.instructions[i]
+			);
+			const {opcode, operand, mode} = instruction;
+
+			if (isBarrier(instruction)) {
+				pointers.clear();
+				pointer = undefined;
+				continue;
+			}
+
+			const target = operand && mode && pointers.get(operand);
+
+			if (target) {
+				this.replace(i, new asm.Instruction(opcode, target));
+			}
+
+			if (
+				opcode === asm.lda
+				&& !mode
+				&& operand?.extra === 'const'
+				&& operand.defaultValue instanceof asm.Operand
+			) {
+				pointer = operand.defaultValue;
+			} else if (!acPreservers.has(opcode)) {
+				pointer = undefined;
+			}
+
+			if ((opcode === asm.sta || opcode === asm.isz) && operand && !mode) {
+				if (opcode === asm.sta && operand.extra === 'scratch' && pointer) {
+					pointers.set(operand, pointer);
+				} else {
+					pointers.delete(operand);
+				}
+			}
+
+			// The callee may use the same scratch variables, and the state after a
+			// skipped instruction depends on the skip.
+			if (opcode === asm.bsa || this.isSkipped(i)) {
+				pointers.clear();
+				pointer = undefined;
+			}
+		}
+	}
+
+	/**
+	 * Drop an `LDA` from the label which was just stored to, a load of `AC`
+	 * which is overwritten right away, and turn a `CLA` followed by an `ADD`
+	 * into an `LDA` where the carry is not needed.
+	 */
+	removeRedundant() {
+		for (let i = 0; i + 1 < this.instructions.length; i++) {
+			const first = /** @type {asm.Instruction} */ (this.instructions[i]);
+			const second = /** @type {asm.Instruction} */ (this.instructions[i + 1]);
+
+			if (this.isSkipped(i)) {
+				continue;
+			}
+
+			if (
+				first.opcode === asm.sta
+				&& second.opcode === asm.lda
+				&& !first.mode
+				&& !second.mode
+				&& first.operand === second.operand
+			) {
+				this.remove(i + 1);
+			} else if (acLoaders.has(first.opcode) && acLoaders.has(second.opcode)) {
+				this.remove(i--);
+			} else if (
+				first.opcode === asm.cla
+				&& second.opcode === asm.add
+				&& this.isEDead(i + 1)
+			) {
+				this.remove(i);
+				this.replace(
+					i,
+					new asm.Instruction(asm.lda, second.operand, second.mode),
+				);
+			}
+		}
+	}
+
+	/**
+	 * The scratch variables which may be read after each instruction, found by
+	 * a backward data-flow analysis. Calls and returns are assumed to read every
+	 * scratch variable which is read anywhere, as a recursive call shares them.
+	 */
+	liveScratchVariables() {
+		const {instructions} = this;
+		const all = new Set(
+			instructions
+				.filter(
+					i =>
+						i.operand?.extra === 'scratch'
+						&& i.opcode !== asm.data
+						&& (i.opcode !== asm.sta || i.mode),
+				)
+				.map(i => /** @type {asm.Operand} */ (i.operand)),
+		);
+
+		/** @type {Map<asm.Operand, number>} */
+		const labels = new Map();
+
+		for (const [index, i] of instructions.entries()) {
+			if (i.opcode === asm.label && i.operand) {
+				labels.set(i.operand, index);
+			}
+		}
+
+		/** @type {Array<Set<asm.Operand>>} */
+		const liveIn = instructions.map(() => new Set());
+		/** @type {Array<Set<asm.Operand>>} */
+		const liveOut = instructions.map(() => new Set());
+
+		/**
+		 * @param {number} index
+		 * @returns {Iterable<asm.Operand>}
+		 */
+		const successors = index => {
+			const {opcode, operand, mode} = /** @type {asm.Instruction} */ (
+				instructions[index]
+			);
+
+			if (opcode === asm.hlt) {
+				return [];
+			}
+
+			if (opcode === asm.bun) {
+				const target = mode || !operand ? undefined : labels.get(operand);
+				return target === undefined ? all : liveIn[target] ?? [];
+			}
+
+			const next = liveIn[index + 1] ?? [];
+			return isSkip(instructions[index])
+				? [...next, ...(liveIn[index + 2] ?? [])]
+				: next;
+		};
+
+		for (let changed = true; changed; ) {
+			changed = false;
+
+			for (let index = instructions.length - 1; index >= 0; index--) {
+				const instruction = /** @type {asm.Instruction} */ (
+					instructions[index]
+				);
+				const {opcode, operand, mode} = instruction;
+				const out = new Set(successors(index));
+				const live = new Set(out);
+
+				if (opcode === asm.sta && !mode && operand) {
+					live.delete(operand);
+				} else if (
+					operand?.extra === 'scratch'
+					&& opcode !== asm.data
+					&& opcode !== asm.label
+				) {
+					live.add(operand);
+				}
+
+				if (
+					opcode === asm.bsa
+					|| opcode === asm.raw
+					|| opcode === asm.data
+				) {
+					for (const i of all) {
+						live.add(i);
+					}
+				}
+
+				if (
+					live.size !== liveIn[index]?.size
+					|| out.size !== liveOut[index]?.size
+				) {
+					liveIn[index] = live;
+					liveOut[index] = out;
+					changed = true;
+				}
+			}
+		}
+
+		return liveOut;
+	}
+
+	/**
+	 * Drop the direct stores to scratch variables which are never read, or
+	 * stored to again before they are read, and then the scratch variables and
+	 * constants which are no longer used.
+	 */
+	removeDeadStores() {
+		/** @type {Set<asm.Operand>} */
+		const read = new Set();
+		/** @type {Set<asm.Operand>} */
+		const stored = new Set();
+
+		for (const i of this.instructions) {
+			if (i.opcode === asm.data) {
+				if (i.operand?.defaultValue instanceof asm.Operand) {
+					read.add(i.operand.defaultValue);
+				}
+			} else if (i.opcode === asm.raw && Array.isArray(i.operand?.extra)) {
+				for (const j of i.operand.extra) {
+					if (j instanceof asm.Operand) {
+						read.add(j);
+					}
+				}
+			} else if (i.operand && (i.opcode !== asm.sta || i.mode)) {
+				read.add(i.operand);
+			}
+		}
+
+		/** @type {Map<asm.Operand, string>} */
+		const dead = new Map();
+		const live = this.liveScratchVariables();
+		let offset = 0;
+
+		for (let i = 0; i < this.instructions.length; i++) {
+			const {opcode, operand, mode} = /** @type {asm.Instruction} */ (
+				this.instructions[i]
+			);
+
+			if (opcode !== asm.sta || mode || !operand) {
+				continue;
+			}
+
+			if (
+				operand.extra !== 'scratch'
+				|| this.isSkipped(i)
+				|| live[i + offset]?.has(operand)
+			) {
+				stored.add(operand);
+				continue;
+			}
+
+			dead.set(operand, this.owners[i] ?? '');
+			this.remove(i--);
+			offset++;
+		}
+
+		for (let i = 0; i < this.instructions.length; i++) {
+			const {opcode, operand} = /** @type {asm.Instruction} */ (
+				this.instructions[i]
+			);
+
+			if (
+				opcode === asm.data
+				&& operand
+				&& (operand.extra === 'scratch' || operand.extra === 'const')
+				&& !read.has(operand)
+				&& !stored.has(operand)
+			) {
+				// Constants are shared by every function.
+				this.owners[i] = dead.get(operand) ?? '';
+				this.remove(i--);
+			}
+		}
+	}
+
+	/**
+	 * Fold adjacent register-reference instructions into one, where executing
+	 * them at once does the same as one after another. That is, when no
+	 * instruction reads or writes a register which an earlier one writes, and
+	 * only the last one may skip.
+	 */
+	foldRegisterReferences() {
+		for (let i = 0; i < this.instructions.length; i++) {
+			const first = this.instructions[i];
+			const firstOp = first && microOps.get(first.opcode);
+
+			if (!firstOp || this.isSkipped(i) || skips.has(first.opcode)) {
+				continue;
+			}
+
+			const names = [first.opcode];
+			let {code} = firstOp;
+			const writes = new Set(firstOp.writes);
+
+			for (;;) {
+				const next = this.instructions[i + 1];
+				const op = next && microOps.get(next.opcode);
+
+				if (
+					!next
+					|| !op
+					|| [...op.reads, ...op.writes].some(j => writes.has(j))
+				) {
+					break;
+				}
+
+				names.push(next.opcode);
+				code |= op.code;
+
+				for (const j of op.writes) {
+					writes.add(j);
+				}
+
+				this.remove(i + 1);
+
+				if (skips.has(next.opcode)) {
+					break;
+				}
+			}
+
+			if (names.length > 1) {
+				names.sort(
+					(a, b) =>
+						(microOps.get(b)?.code ?? 0) - (microOps.get(a)?.code ?? 0),
+				);
+				this.replace(
+					i,
+					new asm.Instruction(
+						asm.extended,
+						new asm.Operand(extendedName(names), code),
+					),
+				);
+			}
+		}
+	}
+}
+
+/**
+ * Optimize the instructions of a program, and return them with the number of
+ * instructions and the estimated cycles saved by each function. Cycles are
+ * counted as if every instruction ran once.
+ *
+ * @param {asm.Instruction[]} instructions
+ * @param {Set<asm.Operand>} functions - the labels of the functions.
+ */
+export function optimize(instructions, functions) {
+	const optimizer = new Optimizer(instructions, functions);
+
+	do {
+		optimizer.changed = false;
+		optimizer.removeUnreachable();
+		optimizer.threadJumps();
+		optimizer.resolvePointers();
+		optimizer.removeRedundant();
+		optimizer.removeDeadStores();
+	} while (optimizer.changed);
+
+	optimizer.foldRegisterReferences();
+
+	return {
+		instructions: optimizer.instructions,
+		savings: optimizer.savings,
+	};
+}
@@ -0,0 +1,179 @@
+import assert from 'node:assert/strict';
+import {readFileSync} from 'node:fs';
+import {test} from 'node:test';
+import * as asm from './asm.js';
+import {cycles, optimize} from './optimize.js';
+
+/**
+ * @param {asm.Instruction[]} instructions
+ */
+function run(instructions) {
+	return optimize(instructions, new Set()).instructions.map(String);
+}
+
+/**
+ * @param {string} name
+ */
+function scratch(name) {
+	return new asm.Operand(name, 0, 'scratch');
+}
+
+test('removes a load which is overwritten', () => {
+	const x = new asm.Operand('x');
+	const y = new asm.Operand('y');
+
+	assert.deepEqual(
+		run([
+			new asm.Instruction(asm.lda, x),
+			new asm.Instruction(asm.lda, y),
+			new asm.Instruction(asm.hlt),
+		]),
+		run([new asm.Instruction(asm.lda, y), new asm.Instruction(asm.hlt)]),
+	);
+});
+
+test('keeps an instruction which may be skipped', () => {
+	const x = new asm.Operand('x');
+	const y = new asm.Operand('y');
+	const instructions = [
+		new asm.Instruction(asm.sza),
+		new asm.Instruction(asm.lda, x),
+		new asm.Instruction(asm.lda, y),
+		new asm.Instruction(asm.hlt),
+	];
+
+	assert.deepEqual(run(instructions), instructions.map(String));
+});
+
+test('keeps a jump which may be skipped', () => {
+	const end = new asm.Operand('end');
+	const instructions = [
+		new asm.Instruction(asm.sza),
+		new asm.Instruction(asm.bun, end),
+		new asm.Instruction(asm.label, end),
+		new asm.Instruction(asm.hlt),
+	];
+
+	assert.deepEqual(run(instructions), instructions.map(String));
+});
+
+test('removes a store to a scratch variable which is not read', () => {
+	const s = scratch('s');
+	const x = new asm.Operand('x');
+
+	assert.deepEqual(
+		run([
+			new asm.Instruction(asm.sta, s),
+			new asm.Instruction(asm.sta, x),
+			new asm.Instruction(asm.hlt),
+			new asm.Instruction(asm.data, s),
+			new asm.Instruction(asm.data, x),
+		]),
+		run([
+			new asm.Instruction(asm.sta, x),
+			new asm.Instruction(asm.hlt),
+			new asm.Instruction(asm.data, x),
+		]),
+	);
+});
+
+test('keeps a store to a scratch variable which is read later', () => {
+	const s = scratch('s');
+	const loop = new asm.Operand('loop');
+	const instructions = [
+		new asm.Instruction(asm.sta, s),
+		new asm.Instruction(asm.label, loop),
+		new asm.Instruction(asm.add, s),
+		new asm.Instruction(asm.sza),
+		new asm.Instruction(asm.bun, loop),
+		new asm.Instruction(asm.hlt),
+		new asm.Instruction(asm.data, s),
+	];
+
+	assert.deepEqual(run(instructions), instructions.map(String));
+});
+
+test('folds independent register-reference instructions', () => {
+	assert.deepEqual(
+		run([
+			new asm.Instruction(asm.cle),
+			new asm.Instruction(asm.sza),
+			new asm.Instruction(asm.hlt),
+		]),
+		['  `ASM_ZALE', '  `ASM_HLT'],
+	);
+});
+
+test('stops folding at a read after a write', () => {
+	assert.deepEqual(
+		run([
+			new asm.Instruction(asm.cle),
+			new asm.Instruction(asm.cma),
+			new asm.Instruction(asm.sza),
+		]),
+		['  `ASM_XCCA', '  `ASM_SZA'],
+	);
+});
+
+test('does not fold a read after a write', () => {
+	const instructions = [
+		new asm.Instruction(asm.cma),
+		new asm.Instruction(asm.sza),
+		new asm.Instruction(asm.hlt),
+	];
+
+	assert.deepEqual(run(instructions), instructions.map(String));
+});
+
+test('does not fold past a skip', () => {
+	const instructions = [
+		new asm.Instruction(asm.sze),
+		new asm.Instruction(asm.cle),
+		new asm.Instruction(asm.cma),
+		new asm.Instruction(asm.hlt),
+	];
+
+	assert.deepEqual(run(instructions), instructions.map(String));
+});
+
+test('counts cycles as the simulator does', () => {
+	const simulator = readFileSync(
+		new URL('../simulator.py', import.meta.url),
+		'utf8',
+	);
+	const memory = /^MEMORY_CYCLES = \(([\d, ]+)\)$/m.exec(simulator)?.[1];
+	const register = /^REGISTER_CYCLES = (\d+)$/m.exec(simulator)?.[1];
+	assert.ok(memory);
+	assert.ok(register);
+	const operand = new asm.Operand('x');
+
+	for (const [index, opcode] of [
+		asm.and,
+		asm.add,
+		asm.lda,
+		asm.sta,
+		asm.bun,
+		asm.bsa,
+		asm.isz,
+	].entries()) {
+		const expected = Number(memory.split(',')[index]);
+		assert.equal(cycles(new asm.Instruction(opcode, operand)), expected);
+		assert.equal(cycles(new asm.Instruction(opcode, operand, true)), expected);
+	}
+
+	for (const opcode of [asm.cla, asm.sza, asm.hlt, asm.out, asm.ski]) {
+		assert.equal(cycles(new asm.Instruction(opcode)), Number(register));
+	}
+});
+
+test('does not fold an instruction skipped by a folded one', () => {
+	assert.deepEqual(
+		run([
+			new asm.Instruction(asm.cle),
+			new asm.Instruction(asm.sza),
+			new asm.Instruction(asm.cma),
+			new asm.Instruction(asm.cme),
+		]),
+		['  `ASM_ZALE', '  `ASM_CMA', '  `ASM_CME'],
+	);
+});
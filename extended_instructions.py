@@ -1,6 +1,6 @@
 #!/usr/bin/env python3.12
 from textwrap import dedent
-from typing import Iterable, Optional
+from typing import Optional
 
 
 class Instruction:
@@ -17,6 +17,7 @@ class Instruction:
         pc: int = 0,
         s: int = 0,
         z: int = 0,
+        excludes: frozenset[str] = frozenset(),
     ) -> None:
         self.names = names
         self.code = code
@@ -28,11 +29,13 @@ class Instruction:
         self.pc = pc
         self.s = s
         self.z = z
+        self.excludes = excludes
 
-    def __add__(self, other: "Instruction") -> "Optional[Instruction]":
+    # Whether `other` cannot be added to this instruction.
+    def conflicts(self, other: "Instruction") -> bool:
         has_side_effects = other.j + other.k
 
-        if (
+        return bool(
             self.j + other.j > 1
             or self.k + other.k > 1
             or self.ld + other.ld > 1
@@ -47,15 +50,16 @@ class Instruction:
             or (other.inc and self.ld and not has_side_effects)
             or (other.clr and self.inc and not has_side_effects)
             or (other.ld and self.inc and not has_side_effects)
-            or ("CLA" in self.names and "CMA" in other.names)
-            or ("CMA" in self.names and "CLA" in other.names)
-            or ("CIL" in self.names and "INC" in other.names)
-            or ("INC" in self.names and "CIL" in other.names)
-            or ("CIR" in self.names and "INC" in other.names)
-            or ("INC" in self.names and "CIR" in other.names)
-        ):
-            return
+            or self.excludes & other.names
+            or other.excludes & self.names
+        )
+
+    # Whether the totals of a combination are valid. Unlike the other checks,
+    # these depend on more than two micro-ops, so they cannot be precomputed.
+    def is_valid(self) -> bool:
+        return self.s <= 2 and (self.s < 2 or self.pc <= 2)
 
+    def merge(self, other: "Instruction") -> "Instruction":
         comb = Instruction(
             names=self.names.union(other.names),
             code=self.code | other.code,
@@ -67,6 +71,7 @@ class Instruction:
             pc=self.pc + other.pc,
             s=self.s + other.s,
             z=self.z + other.z,
+            excludes=self.excludes | other.excludes,
         )
 
         if comb.clr or comb.ld:
@@ -77,13 +82,8 @@ class Instruction:
 
         return comb
 
-    @staticmethod
-    def product(
-        a: "Iterable[Instruction]", b: "Iterable[Instruction]"
-    ) -> "list[Instruction]":
-        instructions = [i + j for i in a for j in b]
-        code = {i.code: i for i in instructions if i}
-        return list(code.values())
+    def __add__(self, other: "Instruction") -> "Optional[Instruction]":
+        return None if self.conflicts(other) else self.merge(other)
 
     @staticmethod
     def simplify(names: set[str], result: str, *source: str) -> None:
@@ -121,47 +121,91 @@ class Instruction:
 
         name = skip + action if skip and action else "X" + "".join(names)
 
-        return f"`ASM_REG_EXT_INST({name}, 12'b{self.code:012b})"
+        return f"`ASM_REG_EXT_INST({name}, {WIDTH}'b{self.code:0{WIDTH}b})"
 
 
-instructions = {
-    Instruction({"CLA"}, 1 << 11, clr=1),
+# The register-reference micro-ops, with one bit of the operand each. Add rows
+# (and raise `WIDTH`) to explore wider instruction words. `excludes` lists the
+# micro-ops which cannot share an instruction with the row, for reasons which
+# the other fields do not capture.
+WIDTH = 12
+MICRO_OPS = (
+    Instruction({"CLA"}, 1 << 11, clr=1, excludes=frozenset({"CMA"})),
     Instruction({"CLE"}, 1 << 10, k=1),
-    Instruction({"CMA"}, 1 << 9, ld=1),
+    Instruction({"CMA"}, 1 << 9, ld=1, excludes=frozenset({"CLA"})),
     Instruction({"CME"}, 1 << 8, j=1, k=1),
-    Instruction({"CIR"}, 1 << 7, ld=1, j=1, k=1),
-    Instruction({"CIL"}, 1 << 6, ld=1, j=1, k=1),
-    Instruction({"INC"}, 1 << 5, inc=1),
+    Instruction({"CIR"}, 1 << 7, ld=1, j=1, k=1, excludes=frozenset({"INC"})),
+    Instruction({"CIL"}, 1 << 6, ld=1, j=1, k=1, excludes=frozenset({"INC"})),
+    Instruction({"INC"}, 1 << 5, inc=1, excludes=frozenset({"CIR", "CIL"})),
     Instruction({"SPA"}, 1 << 4, pc=1, s=1, z=1),
     Instruction({"SNA"}, 1 << 3, pc=1, s=1),
     Instruction({"SZA"}, 1 << 2, pc=1, z=1),
     Instruction({"SZE"}, 1 << 1, pc=1),
-}
-
-print(
-    dedent(
-        """\
-        /**
-        * Define a extended register instruction with given name and operand. The
-        * resulting expression would have an opcode of 7, an addressing mode of 0, and
-        * the given operand. The macro `ASM_<name>` would insert this instruction at
-        * the current address.
-        *
-        * @param __ASM_NAME__ - name of instruction. It should be a valid identifier.
-        * @param __ASM_OPR__ - operand. It should be a 12 bit integer expression.
-        */
-        `define ASM_REG_EXT_INSTR(__ASM_NAME__, __ASM_OPR__) \\
-        `define ASM_``__ASM_NAME__                       \\ \\
-            `ASM_DATA({4'o07, 12'(__ASM_OPR__)}, 1)
-
-        // Register-reference Extension
-        """
-    )
 )
 
-combinations = instructions
 
-for i in range(2, len(instructions)):
-    combinations = Instruction.product(combinations, instructions)
-    if combinations:
+# For every micro-op, the codes of the ones which cannot be combined with it in
+# either order.
+def conflict_matrix(micro_ops: "tuple[Instruction, ...]") -> list[int]:
+    return [
+        sum(
+            j.code
+            for j in micro_ops
+            if j is not i and (i + j) is None and (j + i) is None
+        )
+        for i in micro_ops
+    ]
+
+
+# Every valid combination of at least two micro-ops, by size, then by code. The
+# micro-ops are only added in the order of the table, so each combination is
+# visited once, and a micro-op is skipped as soon as it conflicts with one which
+# is already in the combination.
+def generate(micro_ops: "tuple[Instruction, ...]") -> list[Instruction]:
+    matrix = conflict_matrix(micro_ops)
+    combinations: list[Instruction] = []
+
+    def search(total: Instruction, start: int, allowed: int):
+        for i in range(start, len(micro_ops)):
+            if not micro_ops[i].code & allowed:
+                continue
+
+            comb = total.merge(micro_ops[i])
+
+            if not comb.is_valid():
+                continue
+
+            if len(comb.names) > 1:
+                combinations.append(comb)
+
+            search(comb, i + 1, allowed & ~matrix[i])
+
+    search(Instruction(set(), 0), 0, sum(i.code for i in micro_ops))
+    combinations.sort(key=lambda i: (len(i.names), -i.code))
+    return [i for i in combinations if len(i.names) < len(micro_ops)]
+
+
+if __name__ == "__main__":
+    print(
+        dedent(
+            f"""\
+            /**
+            * Define a extended register instruction with given name and operand. The
+            * resulting expression would have an opcode of 7, an addressing mode of 0, and
+            * the given operand. The macro `ASM_<name>` would insert this instruction at
+            * the current address.
+            *
+            * @param __ASM_NAME__ - name of instruction. It should be a valid identifier.
+            * @param __ASM_OPR__ - operand. It should be a {WIDTH} bit integer expression.
+            */
+            `define ASM_REG_EXT_INSTR(__ASM_NAME__, __ASM_OPR__) \\
+            `define ASM_``__ASM_NAME__                       \\ \\
+                `ASM_DATA({{4'o07, {WIDTH}'(__ASM_OPR__)}}, 1)
+
+            // Register-reference Extension
+            """
+        )
+    )
+
+    if combinations := generate(MICRO_OPS):
         print(*combinations, sep="\n")
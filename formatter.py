@@ -0,0 +1,95 @@
+from re import compile
+
+LINE_RE = compile(r"^(.*?)((?:\s+\\)*)$")
+BACKSLASH_RE = compile(r"\\")
+BACKSLASH_STR = " \\"
+DOUBLE_NEWLINE_RE = compile(r"\n(?:\s*?\n)+")
+DOUBLE_NEWLINE_STR = "\n\n"
+
+
+class FormatterNode:
+    def __init__(self, depth: int) -> None:
+        self.depth = depth
+        self.width = 0
+        self.max_depth = depth
+
+    # Width of the widest line of this node, had it been formatted on its own.
+    def natural_width(self):
+        return self.width + len(BACKSLASH_STR) * max(1, self.max_depth - self.depth)
+
+
+# Every line is stored with its nesting depth, which is the number of trailing
+# backslashes. A top-level node is a run of lines with a nonzero depth. Its
+# direct lines are padded to its width, and the nested ones are padded to one
+# backslash less, so that all of their first backslashes line up. The widths are
+# measured bottom-up while the lines are inserted, and the output is written
+# top-down in a single pass.
+class FormatterTree:
+    def __init__(self) -> None:
+        self.lines: list[tuple[int, str]] = []
+        self.widths: list[int] = []
+        self.stack: list[FormatterNode] = []
+
+    def descend(self):
+        self.stack.append(FormatterNode(len(self.stack) + 1))
+
+    def ascend(self):
+        node = self.stack.pop()
+
+        if self.stack:
+            parent = self.stack[-1]
+            parent.width = max(parent.width, node.natural_width())
+            parent.max_depth = max(parent.max_depth, node.max_depth)
+        else:
+            self.widths.append(node.width)
+
+    def to(self, depth: int):
+        assert depth >= 0
+
+        while len(self.stack) < depth:
+            self.descend()
+
+        while len(self.stack) > depth:
+            self.ascend()
+
+    def insert(self, value: str):
+        self.lines.append((len(self.stack), value))
+
+        if self.stack:
+            node = self.stack[-1]
+            node.width = max(node.width, len(value))
+
+    def format(self):
+        self.to(0)
+        widths = iter(self.widths)
+        width = 0
+        previous = 0
+        output: list[str] = []
+
+        for depth, value in self.lines:
+            if not depth:
+                output.append(value)
+            else:
+                if not previous:
+                    width = next(widths)
+
+                padding = width if depth == 1 else width - len(BACKSLASH_STR)
+                output.append(value.ljust(padding) + BACKSLASH_STR * depth)
+
+            output.append("\n")
+            previous = depth
+
+        return "".join(output)
+
+
+def format(source: str):
+    tree = FormatterTree()
+
+    for i in source.splitlines():
+        match = LINE_RE.match(i)
+        assert match is not None
+
+        tree.to(len(BACKSLASH_RE.findall(match.group(2))))
+        tree.insert(match.group(1))
+
+    return DOUBLE_NEWLINE_RE.sub(DOUBLE_NEWLINE_STR, tree.format())
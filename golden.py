@@ -0,0 +1,187 @@
+from typing import TYPE_CHECKING, Any, Callable, Mapping
+
+if TYPE_CHECKING:
+    import numpy.typing as npt
+
+# Golden models of the combinational modules, used by `./sv.py verify`. A model
+# takes the parameters of the module and the value of each input port, and
+# returns the value of each output port. The values are either integers, or
+# NumPy arrays which hold one vector per element, so the models only use
+# operators which work on both.
+type Value = int | npt.NDArray[Any]
+Ports = Mapping[str, Value]
+Model = Callable[[dict[str, int], Ports], dict[str, Value]]
+
+
+def bit(value: Value, index: int) -> Value:
+    return (value >> index) & 1
+
+
+def all_bits(value: Value, width: int) -> Value:
+    result: Value = 1
+
+    for i in range(width):
+        result = result & bit(value, i)
+
+    return result
+
+
+# The carries, and the group propagate and generate, of `LookAheadCarry`.
+def look_ahead(p: Value, g: Value, c: Value, width: int):
+    carries: Value = 0
+    gg: Value = 0
+
+    for i in range(width):
+        carries = carries | (c << i)
+        c = bit(g, i) | (bit(p, i) & c)
+        gg = gg | (bit(g, i) & all_bits(p >> (i + 1), width - i - 1))
+
+    return all_bits(p, width), gg, carries
+
+
+def half_adder(parameters: dict[str, int], ports: Ports) -> dict[str, Value]:
+    a, b = ports["a_in"], ports["b_in"]
+    return {"c_out": a & b, "sum_out": a ^ b}
+
+
+def full_adder(parameters: dict[str, int], ports: Ports) -> dict[str, Value]:
+    total = ports["a_in"] + ports["b_in"] + ports["c_in"]
+    return {"c_out": total >> 1, "sum_out": total & 1}
+
+
+def partial_full_adder(parameters: dict[str, int], ports: Ports) -> dict[str, Value]:
+    a, b, c = ports["a_in"], ports["b_in"], ports["c_in"]
+    return {"p_out": a | b, "g_out": a & b, "sum_out": a ^ b ^ c}
+
+
+def carry_group(parameters: dict[str, int], ports: Ports) -> dict[str, Value]:
+    return {"c_out": ports["g_in"] | (ports["p_in"] & ports["c_in"])}
+
+
+def look_ahead_carry(parameters: dict[str, int], ports: Ports) -> dict[str, Value]:
+    pg, gg, c = look_ahead(
+        ports["p_in"], ports["g_in"], ports["c_in"], parameters.get("BITS", 4)
+    )
+    return {"pg_out": pg, "gg_out": gg, "c_out": c}
+
+
+def fast_adder(parameters: dict[str, int], ports: Ports) -> dict[str, Value]:
+    bits = parameters.get("BITS", 16)
+    a, b, c = ports["a_in"], ports["b_in"], ports["c_in"]
+    pg, gg, _ = look_ahead(a | b, a & b, c, bits)
+    return {"pg_out": pg, "gg_out": gg, "sum_out": (a + b + c) & ((1 << bits) - 1)}
+
+
+def fast_adder2(parameters: dict[str, int], ports: Ports) -> dict[str, Value]:
+    width = parameters.get("WIDTH", 4)
+    height = parameters.get("HEIGHT", 4)
+    mask = (1 << width) - 1
+    a, b, c = ports["a_in"], ports["b_in"], ports["c_in"]
+    p = 0
+    g = 0
+
+    for i in range(height):
+        a_group = (a >> (i * width)) & mask
+        b_group = (b >> (i * width)) & mask
+        pg, gg, _ = look_ahead(a_group | b_group, a_group & b_group, 0, width)
+        p = p | (pg << i)
+        g = g | (gg << i)
+
+    pg, gg, _ = look_ahead(p, g, c, height)
+    sum = (a + b + c) & ((1 << (width * height)) - 1)
+    return {"pg_out": pg, "gg_out": gg, "sum_out": sum}
+
+
+def ripple_carry_adder(parameters: dict[str, int], ports: Ports) -> dict[str, Value]:
+    bits = parameters.get("BITS", 16)
+    total = ports["a_in"] + ports["b_in"] + ports["c_in"]
+    return {"c_out": total >> bits, "sum_out": total & ((1 << bits) - 1)}
+
+
+def ripple_carry_incrementer(
+    parameters: dict[str, int], ports: Ports
+) -> dict[str, Value]:
+    bits = parameters.get("BITS", 16)
+    total = ports["data_in"] + 1
+    return {"c_out": total >> bits, "data_out": total & ((1 << bits) - 1)}
+
+
+def encoder(width: int) -> Model:
+    def model(parameters: dict[str, int], ports: Ports) -> dict[str, Value]:
+        data = ports["data_in"]
+        result = 0
+
+        for i in range(1 << width):
+            for j in range(width):
+                if i & (1 << j):
+                    result = result | (bit(data, i) << j)
+
+        return {"data_out": result}
+
+    return model
+
+
+# Every selected operator is ORed into the outputs, like the `wor` nets of `ALU`.
+def alu(parameters: dict[str, int], ports: Ports) -> dict[str, Value]:
+    ac_in, dr_in, c_in = ports["ac_in"], ports["dr_in"], ports["c_in"]
+    total = ac_in + dr_in
+    operators = [
+        (ports["op_and_in"], ac_in & dr_in, 0),
+        (ports["op_add_in"], total & 0xFFFF, total >> 16),
+        (ports["op_dr_in"], dr_in, 0),
+        (ports["op_inpr_in"], ports["inpr_in"], 0),
+        (ports["op_complement_in"], ~ac_in & 0xFFFF, 0),
+        (ports["op_cil_in"], ((ac_in << 1) & 0xFFFF) | c_in, bit(ac_in, 15)),
+        (ports["op_cir_in"], (c_in << 15) | (ac_in >> 1), bit(ac_in, 0)),
+    ]
+    ac = 0
+    c = 0
+
+    for enable, value, carry in operators:
+        ac = ac | ((enable * 0xFFFF) & value)
+        c = c | (enable & carry)
+
+    return {"c_out": c, "ac_out": ac}
+
+
+# Like `alu`, with the shifts of 17 bits wide values, which hold the carry.
+def arithmetic_unit(parameters: dict[str, int], ports: Ports) -> dict[str, Value]:
+    ac_in, dr_in, amount = ports["ac_in"], ports["dr_in"], ports["amount_in"]
+    shl = (ac_in << amount) & 0x1FFFF
+    shr = (ac_in << 1) >> amount
+    asr = (((ac_in << 1) | (bit(ac_in, 15) * 0xFFFE0000)) >> amount) & 0x1FFFF
+    product = ac_in * dr_in
+    high = product >> 16
+    operators = [
+        (ports["op_shl_in"], shl & 0xFFFF, shl >> 16),
+        (ports["op_shr_in"], shr >> 1, shr & 1),
+        (ports["op_asr_in"], asr >> 1, asr & 1),
+        (ports["op_mul_in"], product & 0xFFFF, high != 0),
+    ]
+    ac = 0
+    c = 0
+
+    for enable, value, carry in operators:
+        ac = ac | ((enable * 0xFFFF) & value)
+        c = c | (enable & carry)
+
+    return {"c_out": c, "ac_out": ac, "dr_out": (ports["op_mul_in"] * 0xFFFF) & high}
+
+
+MODELS: dict[str, Model] = {
+    "ALU": alu,
+    "ArithmeticUnit": arithmetic_unit,
+    "CarryGroup": carry_group,
+    "Encoder1": encoder(1),
+    "Encoder2": encoder(2),
+    "Encoder3": encoder(3),
+    "Encoder4": encoder(4),
+    "FastAdder": fast_adder,
+    "FastAdder2": fast_adder2,
+    "FullAdder": full_adder,
+    "HalfAdder": half_adder,
+    "LookAheadCarry": look_ahead_carry,
+    "PartialFullAdder": partial_full_adder,
+    "RippleCarryAdder": ripple_carry_adder,
+    "RippleCarryIncrementer": ripple_carry_incrementer,
+}
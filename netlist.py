@@ -0,0 +1,334 @@
+from json import load
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Iterable, Optional
+
+from golden import Model
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+if TYPE_CHECKING:
+    import numpy
+    import numpy.typing as npt
+
+# The words of a net, each of which holds one vector per bit.
+type Words = npt.NDArray[numpy.uint64]
+type Gate = (
+    Callable[[Words], Words]
+    | Callable[[Words, Words], Words]
+    | Callable[[Words, Words, Words], Words]
+    | Callable[[Words, Words, Words, Words], Words]
+)
+
+# The cells of the internal gate library of Yosys, as the number of inputs and
+# a function of them. Every value is a word which holds one vector per bit.
+GATES: dict[str, tuple[tuple[str, ...], Gate]] = {
+    "$_BUF_": (("A",), lambda a: a),
+    "$_NOT_": (("A",), lambda a: ~a),
+    "$_AND_": (("A", "B"), lambda a, b: a & b),
+    "$_NAND_": (("A", "B"), lambda a, b: ~(a & b)),
+    "$_OR_": (("A", "B"), lambda a, b: a | b),
+    "$_NOR_": (("A", "B"), lambda a, b: ~(a | b)),
+    "$_XOR_": (("A", "B"), lambda a, b: a ^ b),
+    "$_XNOR_": (("A", "B"), lambda a, b: ~(a ^ b)),
+    "$_ANDNOT_": (("A", "B"), lambda a, b: a & ~b),
+    "$_ORNOT_": (("A", "B"), lambda a, b: a | ~b),
+    "$_MUX_": (("A", "B", "S"), lambda a, b, s: (a & ~s) | (b & s)),
+    "$_NMUX_": (("A", "B", "S"), lambda a, b, s: ~((a & ~s) | (b & s))),
+    "$_AOI3_": (("A", "B", "C"), lambda a, b, c: ~((a & b) | c)),
+    "$_OAI3_": (("A", "B", "C"), lambda a, b, c: ~((a | b) & c)),
+    "$_AOI4_": (("A", "B", "C", "D"), lambda a, b, c, d: ~((a & b) | (c & d))),
+    "$_OAI4_": (("A", "B", "C", "D"), lambda a, b, c, d: ~((a | b) & (c | d))),
+}
+
+# Rows 0 and 1 of the values are the constants. Undefined bits are taken as 0,
+# and the other nets follow them.
+CONSTANTS: dict[int | str, int] = {"0": 0, "1": 1, "x": 0, "z": 0}
+
+# Vectors are simulated this many words at a time.
+CHUNK_WORDS = 1 << 12
+
+# Inputs up to this many bits wide are checked exhaustively by default, and
+# wider ones on this many random vectors.
+EXHAUSTIVE_BITS = 24
+RANDOM_VECTORS = 1 << 20
+
+
+def require_numpy():
+    assert np is not None, "numpy is required to simulate netlists"
+    return np
+
+
+# A flattened combinational module from the JSON netlist of Yosys. Every net is
+# a row of the values, and the gates are grouped into levels by their depth, so
+# that a level applies each type of gate to all of its nets at once.
+class Netlist:
+    def __init__(self, module: dict[str, Any], name: str) -> None:
+        self.name = name
+        self.inputs: dict[str, list[int]] = {}
+        self.outputs: dict[str, list[int]] = {}
+        rows: dict[int | str, int] = dict(CONSTANTS)
+
+        def row(bit: int | str):
+            return rows.setdefault(bit, len(rows) - 2)
+
+        for port, data in module["ports"].items():
+            ports = self.inputs if data["direction"] == "input" else self.outputs
+            ports[port] = [row(i) for i in data["bits"]]
+
+        gates: list[tuple[str, list[int], int]] = []
+
+        for cell, data in module["cells"].items():
+            if data["type"] not in GATES:
+                raise ValueError(
+                    f"Unsupported cell '{cell}' of type {data['type']}, "
+                    "the module should be combinational"
+                )
+
+            names, _ = GATES[data["type"]]
+            connections = data["connections"]
+            sources = [row(connections[i][0]) for i in names]
+            gates.append((data["type"], sources, row(connections["Y"][0])))
+
+        self.size = len(rows) - 2
+        self.levels = levelize(gates, set(j for i in self.inputs.values() for j in i))
+
+    @property
+    def input_bits(self):
+        return sum(len(i) for i in self.inputs.values())
+
+    # Evaluate the words of every input bit, in the order of the ports, and
+    # return the words of every output bit.
+    def simulate(self, inputs: list[Words]) -> dict[str, list[Words]]:
+        np = require_numpy()
+        words = len(inputs[0]) if inputs else 1
+        values = np.zeros((self.size, words), dtype=np.uint64)
+        values[1] = ~np.uint64(0)
+        index = 0
+
+        for bits in self.inputs.values():
+            for i in bits:
+                values[i] = inputs[index]
+                index += 1
+
+        for type, sources, targets in self.levels:
+            _, function = GATES[type]
+            values[targets] = function(*(values[i] for i in sources))
+
+        return {port: [values[i] for i in bits] for port, bits in self.outputs.items()}
+
+
+# Order the gates by their depth, and group those of the same depth and type.
+def levelize(gates: list[tuple[str, list[int], int]], inputs: set[int]):
+    np = require_numpy()
+    drivers = {target: (type, sources) for type, sources, target in gates}
+    depth: dict[int, int] = {0: 0, 1: 0, **{i: 0 for i in inputs}}
+    levels: list[dict[str, tuple[list[list[int]], list[int]]]] = []
+
+    for target in drivers:
+        stack = [target]
+
+        while stack:
+            net = stack[-1]
+
+            if net in depth:
+                stack.pop()
+                continue
+
+            if net not in drivers:
+                raise ValueError(f"Net {net} has no driver")
+
+            _, sources = drivers[net]
+            pending = [i for i in sources if i not in depth]
+
+            if any(i in stack for i in pending):
+                raise ValueError("The netlist has a combinational loop")
+
+            if pending:
+                stack += pending
+                continue
+
+            stack.pop()
+            depth[net] = 1 + max(depth[i] for i in sources)
+
+    for target, (type, sources) in drivers.items():
+        level = depth[target] - 1
+
+        while len(levels) <= level:
+            levels.append({})
+
+        group = levels[level].setdefault(type, ([[] for _ in sources], []))
+
+        for i, source in enumerate(sources):
+            group[0][i].append(source)
+
+        group[1].append(target)
+
+    return [
+        (
+            type,
+            [np.array(i, dtype=np.intp) for i in sources],
+            np.array(targets, dtype=np.intp),
+        )
+        for level in levels
+        for type, (sources, targets) in level.items()
+    ]
+
+
+# Load the top module of the netlist, which Yosys marks with an attribute.
+def load_netlist(file: Path):
+    with open(file, "r") as f:
+        modules: dict[str, dict[str, Any]] = load(f)["modules"]
+
+    tops = [
+        name
+        for name, module in modules.items()
+        if int(module.get("attributes", {}).get("top", "0"), 2)
+    ]
+
+    if not tops and len(modules) == 1:
+        tops = list(modules)
+
+    if len(tops) != 1:
+        raise ValueError(f"Cannot find the top module of {file}")
+
+    return Netlist(modules[tops[0]], tops[0])
+
+
+# Generate the words of every input bit. Exhaustive vectors count up from
+# `start`, so that the input bit `i` of vector `n` is bit `i` of `start + n`.
+def exhaustive_words(bits: int, start: int, words: int):
+    np = require_numpy()
+    vectors = np.arange(start, start + 64 * words, dtype=np.uint64)
+    return [
+        np.packbits(
+            ((vectors >> np.uint64(i)) & 1).astype(np.uint8), bitorder="little"
+        ).view(np.uint64)
+        for i in range(bits)
+    ]
+
+
+def random_words(bits: int, words: int, random: "numpy.random.Generator"):
+    np = require_numpy()
+    return [
+        np.frombuffer(random.bytes(8 * words), dtype=np.uint64) for _ in range(bits)
+    ]
+
+
+# The value of a port for every vector, from the words of its bits.
+def unpack(words: list[Words]) -> Words:
+    np = require_numpy()
+    value = np.zeros(64 * len(words[0]), dtype=np.uint64)
+
+    for i, word in enumerate(words):
+        lanes = np.unpackbits(word.view(np.uint8), bitorder="little")
+        value |= lanes.astype(np.uint64) << np.uint64(i)
+
+    return value
+
+
+class Failure:
+    def __init__(
+        self,
+        inputs: dict[str, int],
+        expected: dict[str, int],
+        actual: dict[str, int],
+    ) -> None:
+        self.inputs = inputs
+        self.expected = expected
+        self.actual = actual
+
+
+class Result:
+    def __init__(self, vectors: int, exhaustive: bool) -> None:
+        self.vectors = vectors
+        self.exhaustive = exhaustive
+        self.failures = 0
+        self.first: Optional[Failure] = None
+
+
+# Check the netlist against the golden model, on the given number of random
+# vectors, or by default, on every vector if the inputs are narrow enough.
+def check(
+    netlist: Netlist,
+    model: Model,
+    parameters: dict[str, int],
+    *,
+    vectors: Optional[int] = None,
+    seed: int = 0,
+):
+    np = require_numpy()
+    bits = netlist.input_bits
+    exhaustive = vectors is None and bits <= EXHAUSTIVE_BITS
+
+    if vectors is None:
+        vectors = 1 << bits if exhaustive else RANDOM_VECTORS
+    random = np.random.default_rng(seed)
+    result = Result(vectors, exhaustive)
+    total_words = -(-vectors // 64)
+
+    for start in range(0, total_words, CHUNK_WORDS):
+        words = min(CHUNK_WORDS, total_words - start)
+        inputs = (
+            exhaustive_words(bits, 64 * start, words)
+            if exhaustive
+            else random_words(bits, words, random)
+        )
+        outputs = netlist.simulate(inputs)
+
+        # Drop the vectors past the end of the last word.
+        count = min(64 * words, vectors - 64 * start)
+        index = 0
+        ports: dict[str, Words] = {}
+
+        for port, port_bits in netlist.inputs.items():
+            ports[port] = unpack(inputs[index : index + len(port_bits)])[:count]
+            index += len(port_bits)
+
+        values = model(parameters, ports)
+        mismatch = np.zeros(count, dtype=bool)
+        expected: dict[str, Words] = {}
+        actual: dict[str, Words] = {}
+
+        for port, port_bits in netlist.outputs.items():
+            mask = np.uint64((1 << len(port_bits)) - 1)
+            value = np.asarray(values[port], dtype=np.uint64) & mask
+            expected[port] = np.broadcast_to(value, (count,))
+            actual[port] = unpack(outputs[port])[:count]
+            mismatch |= actual[port] != expected[port]
+
+        failures = np.flatnonzero(mismatch)
+        result.failures += len(failures)
+
+        if len(failures) and result.first is None:
+            i = failures[0]
+            result.first = Failure(
+                {k: int(v[i]) for k, v in ports.items()},
+                {k: int(expected[k][i]) for k in actual},
+                {k: int(v[i]) for k, v in actual.items()},
+            )
+
+    return result
+
+
+def format_ports(values: dict[str, int], widths: dict[str, list[int]]):
+    return ", ".join(
+        f"{k}={v:#0{(len(widths[k]) + 3) // 4 + 2}x}" for k, v in values.items()
+    )
+
+
+def format_result(netlist: Netlist, result: Result) -> Iterable[str]:
+    kind = "exhaustive" if result.exhaustive else "random"
+    yield f"{netlist.name}: {result.vectors} {kind} vectors"
+
+    if not result.first:
+        yield "ok"
+        return
+
+    first = result.first
+    yield f"FAIL: {result.failures} vectors differ"
+    yield f"  inputs:   {format_ports(first.inputs, netlist.inputs)}"
+    yield f"  expected: {format_ports(first.expected, netlist.outputs)}"
+    yield f"  actual:   {format_ports(first.actual, netlist.outputs)}"
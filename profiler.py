@@ -0,0 +1,196 @@
+from bisect import bisect_right
+from pathlib import Path
+from typing import Iterable, Optional
+
+from simulator import REGISTER_CYCLES, Profile
+
+MEMORY_NAMES = ("AND", "ADD", "LDA", "STA", "BUN", "BSA", "ISZ")
+REGISTER_NAMES = (
+    *("CLA", "CLE", "CMA", "CME", "CIR", "CIL", "INC"),
+    *("SPA", "SNA", "SZA", "SZE", "HLT"),
+)
+IO_NAMES = ("INP", "OUT", "SKI", "SKO", "ION", "IOF")
+# The arithmetic extension, by bits 5 and 4 of an input-output instruction
+# without any I/O bit.
+SHIFT_NAMES = ("SHL", "SHR", "ASR")
+SKI = 0xF200
+SKO = 0xF100
+BUN = 0x4000
+
+
+def parse_profile(content: str):
+    profile = Profile()
+
+    for line in content.splitlines():
+        name, instructions, cycles = line.split()
+
+        if name == "interrupt":
+            profile.interrupts = int(instructions)
+            profile.interrupt_cycles = int(cycles)
+        else:
+            address = int(name, 16) & 0xFFF
+            profile.instructions[address] = int(instructions)
+            profile.cycles[address] = int(cycles)
+
+    return profile
+
+
+def load_profile(file: Path):
+    with open(file, "r") as f:
+        return parse_profile(f.read())
+
+
+def format_profile(profile: Profile) -> Iterable[str]:
+    for address in range(4096):
+        if profile.instructions[address] or profile.cycles[address]:
+            instructions = profile.instructions[address]
+            yield f"{address:03x} {instructions} {profile.cycles[address]}"
+
+    yield f"interrupt {profile.interrupts} {profile.interrupt_cycles}"
+
+
+def parse_symbols(content: str):
+    labels: dict[str, int] = {}
+
+    for line in content.splitlines():
+        if line.strip():
+            address, name = line.split()
+            labels[name] = int(address, 16)
+
+    return labels
+
+
+def disassemble(word: int):
+    opcode = (word >> 12) & 7
+
+    if opcode != 7:
+        return MEMORY_NAMES[opcode] + (" I" if word & 0x8000 else "")
+
+    if word & 0x8000 and not word & 0xFC0 and word & 0x3F:
+        kind = (word >> 4) & 3
+
+        if kind < 3:
+            return f"{SHIFT_NAMES[kind]} {word & 0xF}"
+
+        return "NOP" if word & 0xF else "MUL"
+
+    names = IO_NAMES if word & 0x8000 else REGISTER_NAMES
+    bits = [name for i, name in enumerate(names) if word & (1 << (11 - i))]
+    return " ".join(bits) or "NOP"
+
+
+class Symbols:
+    def __init__(self, labels: dict[str, int]) -> None:
+        pairs = sorted((address, name) for name, address in labels.items())
+        self.addresses = [i[0] for i in pairs]
+        self.names = [i[1] for i in pairs]
+
+    def lookup(self, address: int):
+        index = bisect_right(self.addresses, address) - 1
+
+        if index < 0:
+            return f"{address:03x}"
+
+        offset = address - self.addresses[index]
+        return self.names[index] + (f"+{offset}" if offset else "")
+
+
+def percent(part: int, total: int):
+    return f"{100 * part / total:5.1f}%" if total else "    -"
+
+
+# Build the flat, per-opcode and per-subroutine profiles. Subroutines are the
+# targets of the `BSA` instructions in the memory image, and each of them is
+# assumed to extend up to the next one. The busy-wait loops are `SKI` or `SKO`
+# followed by a `BUN` back to it. Only the failed polls are counted, one for
+# every `BUN` executed there, as a poll which succeeds at once does not wait.
+def report(
+    profile: Profile,
+    memory: dict[int, int],
+    labels: dict[str, int],
+    *,
+    top: Optional[int] = 20,
+) -> Iterable[str]:
+    symbols = Symbols(labels)
+    total_cycles = sum(profile.cycles) + profile.interrupt_cycles
+    total_instructions = sum(profile.instructions)
+    executed = [i for i in range(4096) if profile.cycles[i]]
+
+    busy = 0
+    for address in executed:
+        word = memory.get(address, 0)
+        following = memory.get((address + 1) & 0xFFF, 0)
+
+        if word in {SKI, SKO} and following == BUN | address:
+            bun = (address + 1) & 0xFFF
+            busy += profile.cycles[bun] + profile.instructions[bun] * REGISTER_CYCLES
+
+    yield f"instructions: {total_instructions}"
+    yield f"cycles: {total_cycles}"
+    yield (
+        f"interrupts: {profile.interrupts}"
+        f" ({profile.interrupt_cycles} cycles,"
+        f" {percent(profile.interrupt_cycles, total_cycles).strip()})"
+    )
+    yield f"busy-wait cycles: {busy} ({percent(busy, total_cycles).strip()})"
+    yield ""
+
+    yield "Flat profile:"
+    yield "   cycles      %  instructions  address  symbol"
+    by_cycles = sorted(executed, key=lambda i: (-profile.cycles[i], i))
+
+    for address in by_cycles[:top]:
+        cycles = profile.cycles[address]
+        yield (
+            f"{cycles:>9} {percent(cycles, total_cycles)}"
+            f" {profile.instructions[address]:>13}"
+            f"  {address:03x}      {symbols.lookup(address)}"
+            f" ({disassemble(memory.get(address, 0))})"
+        )
+
+    yield ""
+    yield "By opcode:"
+    yield "   cycles      %  instructions  opcode"
+    opcodes: dict[str, list[int]] = {}
+
+    for address in executed:
+        name = disassemble(memory.get(address, 0))
+        entry = opcodes.setdefault(name, [0, 0])
+        entry[0] += profile.cycles[address]
+        entry[1] += profile.instructions[address]
+
+    for name, (cycles, instructions) in sorted(
+        opcodes.items(), key=lambda i: (-i[1][0], i[0])
+    ):
+        yield f"{cycles:>9} {percent(cycles, total_cycles)} {instructions:>13}  {name}"
+
+    yield ""
+    yield "By subroutine (self):"
+    yield "   cycles      %  instructions    calls  subroutine"
+    calls: dict[int, int] = {}
+
+    for address in executed:
+        word = memory.get(address, 0)
+
+        if (word >> 12) == 5:
+            target = word & 0xFFF
+            calls[target] = calls.get(target, 0) + profile.instructions[address]
+
+    entries = sorted(calls)
+    regions: dict[int, list[int]] = {}
+
+    for address in executed:
+        index = bisect_right(entries, address) - 1
+        entry = entries[index] if index >= 0 else -1
+        region = regions.setdefault(entry, [0, 0])
+        region[0] += profile.cycles[address]
+        region[1] += profile.instructions[address]
+
+    for entry, (cycles, instructions) in sorted(
+        regions.items(), key=lambda i: (-i[1][0], i[0])
+    ):
+        name = "(main)" if entry < 0 else symbols.lookup(entry)
+        yield (
+            f"{cycles:>9} {percent(cycles, total_cycles)} {instructions:>13}"
+            f" {calls.get(entry, 0):>8}  {name}"
+        )
@@ -0,0 +1,608 @@
+from contextlib import contextmanager
+from os import read
+from pathlib import Path
+from select import select
+from typing import BinaryIO, Optional
+
+from tracer import INTERRUPT as TRACE_INTERRUPT, WRITE as TRACE_WRITE, TraceWriter
+
+# Number of T-states taken by each memory-reference opcode, including the
+# fetch and decode states (T0 to T3). Register-reference and input-output
+# instructions always take 4.
+MEMORY_CYCLES = (6, 6, 6, 5, 5, 6, 7)
+REGISTER_CYCLES = 4
+INTERRUPT_CYCLES = 3
+SKI = 0xF200
+BUN = 0x4000
+# Cycles of `SKI` followed by a `BUN` back to it.
+SKI_ROUND = REGISTER_CYCLES + MEMORY_CYCLES[4]
+# T-states which `PrefetchControlUnit` saves when it overlaps a fetch.
+FETCH_CYCLES = 2
+# T-states of `MUL` in the arithmetic extension, which reads its address word
+# and then the multiplier.
+MUL_CYCLES = 7
+NEVER = 1 << 62
+
+
+def parse_image(content: str):
+    address = 0
+    image: dict[int, int] = {}
+
+    for line in content.splitlines():
+        for token in line.split("//", 1)[0].split():
+            if token.startswith("@"):
+                address = int(token[1:], 16) & 0xFFF
+            else:
+                image[address] = int(token, 16) & 0xFFFF
+                address = (address + 1) & 0xFFF
+
+    return image
+
+
+def load_image(file: Path):
+    with open(file, "r") as f:
+        return parse_image(f.read())
+
+
+# Number of instructions and cycles spent at each address. The interrupt cycles
+# are counted separately.
+class Profile:
+    def __init__(self) -> None:
+        self.instructions = [0] * 4096
+        self.cycles = [0] * 4096
+        self.interrupts = 0
+        self.interrupt_cycles = 0
+
+
+# State of the computer at the start of an instruction, in the format written
+# by `save_state` in `VirtualComputer`: a `<name> <hex>` line for every register
+# and flip-flop, and a `mem <address> <data>` line for every memory word.
+class Snapshot:
+    def __init__(self) -> None:
+        self.fields: dict[str, int] = {}
+        self.memory: dict[int, int] = {}
+
+
+SNAPSHOT_FIELDS = (
+    *("cycle", "sc", "ar", "pc", "dr", "ac", "inpr", "ir", "tr", "outr"),
+    *("e", "r", "ien", "fgi", "fgo", "s"),
+)
+
+
+def parse_snapshot(content: str):
+    snapshot = Snapshot()
+
+    for line in content.splitlines():
+        match line.split():
+            case ["mem", address, data]:
+                snapshot.memory[int(address, 16) & 0xFFF] = int(data, 16) & 0xFFFF
+
+            case [name, value] if name in SNAPSHOT_FIELDS:
+                snapshot.fields[name] = int(value, 16)
+
+            case []:
+                pass
+
+            case _:
+                raise ValueError(f"Invalid snapshot line: {line}")
+
+    return snapshot
+
+
+def load_snapshot(file: Path):
+    with open(file, "r") as f:
+        return parse_snapshot(f.read())
+
+
+def format_snapshot(snapshot: Snapshot):
+    for name in SNAPSHOT_FIELDS:
+        if name in snapshot.fields:
+            yield f"{name} {snapshot.fields[name]:x}"
+
+    for address, data in sorted(snapshot.memory.items()):
+        yield f"mem {address:03x} {data:04x}"
+
+
+def save_snapshot(file: Path, snapshot: Snapshot):
+    with open(file, "w") as f:
+        f.writelines(f"{i}\n" for i in format_snapshot(snapshot))
+
+
+class Keyboard:
+    def __init__(self, stream: Optional[BinaryIO], *, interactive: bool = False):
+        self.stream = stream
+        self.interactive = interactive
+        self.eof = stream is None
+
+    def read(self) -> int:
+        if self.eof:
+            return -1
+
+        assert self.stream
+
+        if self.interactive:
+            fd = self.stream.fileno()
+            if not select([fd], [], [], 0)[0]:
+                return -1
+            char = read(fd, 1)
+        else:
+            char = self.stream.read(1)
+
+        if not char:
+            self.eof = not self.interactive
+            return -1
+
+        return char[0]
+
+    # Block until the terminal has input.
+    def wait(self):
+        if self.interactive and self.stream:
+            select([self.stream.fileno()], [], [], None)
+
+
+class Printer:
+    def __init__(self, stream: Optional[BinaryIO], *, interactive: bool = False):
+        self.stream = stream
+        self.interactive = interactive
+
+    def write(self, char: int):
+        if self.stream is None:
+            return
+
+        self.stream.write(bytes((char,)))
+
+        if self.interactive:
+            self.stream.flush()
+
+    def flush(self):
+        if self.stream is not None:
+            self.stream.flush()
+
+
+# Instruction-level model of `SOC`. Every instruction is executed at once, but
+# the cycle counter advances by the number of T-states the `ControlUnit` would
+# have spent on it. The `VirtualKeyboard` and `VirtualPrinter` handshakes are
+# modelled at cycle granularity: a device notices a cleared flag at the end of
+# the cycle, and the flag is set again two cycles later. Cycle 0 is the first
+# T0 after the boot pulse. With `prefetch`, the cycles are those of `SOC` with
+# `PrefetchControlUnit`. With `fifo`, those of `SOC` with FIFOs between the
+# devices and `INPR` and `OUTR`, which the devices keep from running empty or
+# full, so `FGI` and `FGO` are set again a cycle sooner. With `arithmetic`, the
+# input-output instructions without any I/O bit are the shifts and the multiply
+# of the arithmetic extension, see `ControlUnit`.
+class Machine:
+    def __init__(
+        self,
+        image: dict[int, int],
+        *,
+        keyboard: Optional[Keyboard] = None,
+        printer: Optional[Printer] = None,
+        prefetch: bool = False,
+        fifo: bool = False,
+        arithmetic: bool = False,
+    ) -> None:
+        self.memory = [0] * 4096
+        self.prefetch = prefetch
+        self.fifo = fifo
+        self.arithmetic = arithmetic
+        self.keyboard = keyboard or Keyboard(None)
+        self.printer = printer or Printer(None)
+
+        for address, data in image.items():
+            self.memory[address & 0xFFF] = data & 0xFFFF
+
+        self.ac = 0
+        self.dr = 0
+        self.ar = 0
+        self.pc = 0
+        self.ir = 0
+        self.tr = 0
+        self.inpr = 0
+        self.outr = 0
+        self.e = 0
+        self.ien = 0
+        self.fgi = 0
+        self.fgo = 1
+        self.r = 0
+        self.s = 1
+
+        self.cycles = 0
+        self.instructions = 0
+        self.interrupts = 0
+        # Whether the next instruction has been fetched by the last one.
+        self.overlapped = False
+
+        # Cycle at which the keyboard (or printer) sets FGI (or FGO).
+        self.fgi_at = NEVER
+        self.fgo_at = NEVER
+        self.inpr_next = 0
+        self._poll_keyboard(0)
+
+    def _poll_keyboard(self, cycle: int):
+        char = self.keyboard.read()
+
+        if char != -1:
+            self.inpr_next = char & 0xFF
+            self.fgi_at = cycle + 2
+
+    # Apply the device events which happen at or before the given cycle.
+    def _sync(self, cycle: int):
+        if self.fgi_at <= cycle:
+            self.fgi = 1
+            self.inpr = self.inpr_next
+            self.fgi_at = NEVER
+        elif not self.fgi and self.fgi_at == NEVER and self.keyboard.interactive:
+            self._poll_keyboard(cycle - 2)
+            self._sync(cycle)
+
+        if self.fgo_at <= cycle:
+            self.fgo = 1
+            self.outr = 0
+            self.fgo_at = NEVER
+
+    # Execute an input-output instruction whose T3 is at the given cycle.
+    def _input_output(self, operand: int, cycle: int):
+        self._sync(cycle)
+        fgi = self.fgi
+        fgo = self.fgo
+
+        if operand & 0x200 and fgi:
+            self.pc = (self.pc + 1) & 0xFFF
+
+        if operand & 0x100 and fgo:
+            self.pc = (self.pc + 1) & 0xFFF
+
+        if operand & 0x80 and operand & 0x40:
+            self.ien ^= 1
+        elif operand & 0x80:
+            self.ien = 1
+        elif operand & 0x40:
+            self.ien = 0
+
+        if operand & 0x800:
+            self.ac = self.inpr
+            self.fgi = 0
+
+            if self.fgi_at == NEVER:
+                self._poll_keyboard(cycle if self.fifo else cycle + 1)
+
+        if operand & 0x400:
+            if fgo:
+                self.outr = self.ac & 0xFF
+                self.fgo = 0
+                self.printer.write(self.outr)
+                self.fgo_at = cycle + (2 if self.fifo else 3)
+            else:
+                # The printer is still clearing `OUTR`, which has priority.
+                self.outr = 0
+
+    def snapshot(self):
+        snapshot = Snapshot()
+        snapshot.fields = {
+            "cycle": self.cycles,
+            "sc": 0,
+            **{i: getattr(self, i) for i in SNAPSHOT_FIELDS[2:]},
+        }
+        snapshot.memory = dict(enumerate(self.memory))
+        return snapshot
+
+    # Continue from a snapshot. The devices are not part of it, so a busy
+    # printer is assumed to finish three cycles later, as after an `OUT`.
+    def restore(self, snapshot: Snapshot):
+        fields = snapshot.fields
+
+        if fields.get("sc", 0) or fields.get("r", 0):
+            raise ValueError("The snapshot is not at the start of an instruction")
+
+        self.memory = [snapshot.memory.get(i, 0) for i in range(4096)]
+        self.cycles = fields.get("cycle", 0)
+
+        for name in SNAPSHOT_FIELDS[2:]:
+            setattr(self, name, fields.get(name, getattr(self, name)))
+
+        self.fgo_at = NEVER if self.fgo else self.cycles + 3
+
+        if self.fgi_at != NEVER:
+            self.fgi_at = max(self.fgi_at, self.cycles + 2)
+
+    # Whether the `SKI` before the given address is in a loop with a `BUN`
+    # back to it, which only the keyboard can end.
+    def _polling_keyboard(self, pc: int):
+        return (
+            not self.fgi
+            and self.fgo
+            and not self.ien
+            and self.fgi_at == NEVER
+            and self.memory[pc] == BUN | ((pc - 1) & 0xFFF)
+        )
+
+    # Run until the halt, the given number of cycles, or the first instruction
+    # at the `stop` address. With `idle`, a loop polling the keyboard sleeps
+    # until the terminal has input, or once the input has ended, skips whole
+    # rounds up to the limit, so that it ends at the same cycle.
+    def run(
+        self,
+        limit: Optional[int] = None,
+        *,
+        stop: Optional[int] = None,
+        idle: bool = False,
+        profile: Optional[Profile] = None,
+        trace: Optional[TraceWriter] = None,
+    ):
+        memory = self.memory
+        ac = self.ac
+        dr = self.dr
+        ar = self.ar
+        pc = self.pc
+        ir = self.ir
+        e = self.e
+        cycles = self.cycles
+        instructions = self.instructions
+        limit = NEVER if limit is None else limit
+        start_pc = pc
+        start_cycles = cycles
+        prefetch = self.prefetch
+        arithmetic = self.arithmetic
+        overlapped = self.overlapped
+        ski_round = SKI_ROUND - FETCH_CYCLES if prefetch else SKI_ROUND
+
+        while self.s and cycles < limit and pc != stop:
+            if profile or trace:
+                start_pc = pc
+                start_cycles = cycles
+
+            # `PrefetchControlUnit` fetches the next instruction during the last
+            # state of one which leaves `PC` alone, unless it writes the word
+            # just fetched, or uses the bus in that state without having
+            # prefetched it in an earlier one. Then the next one starts at T2.
+            saved = FETCH_CYCLES if overlapped else 0
+            ir = memory[pc]
+            pc = (pc + 1) & 0xFFF
+            opcode = (ir >> 12) & 7
+            ar = ir & 0xFFF
+            ien = self.ien
+            skip = io_fetch = fetch = False
+
+            if opcode != 7:
+                if ir & 0x8000:
+                    ar = memory[ar] & 0xFFF
+
+                if opcode == 0:
+                    dr = memory[ar]
+                    ac &= dr
+                elif opcode == 1:
+                    dr = memory[ar]
+                    ac += dr
+                    e = ac >> 16
+                    ac &= 0xFFFF
+                elif opcode == 2:
+                    dr = memory[ar]
+                    ac = dr
+                elif opcode == 3:
+                    memory[ar] = ac
+                elif opcode == 4:
+                    pc = ar
+                elif opcode == 5:
+                    memory[ar] = pc
+                    ar = (ar + 1) & 0xFFF
+                    pc = ar
+                else:
+                    dr = (memory[ar] + 1) & 0xFFFF
+                    memory[ar] = dr
+                    if not dr:
+                        pc = (pc + 1) & 0xFFF
+
+                cycles += MEMORY_CYCLES[opcode] - saved
+            elif not ir & 0x8000:
+                operand = ir & 0xFFF
+                skip = (
+                    (operand & 0x10 and not ac & 0x8000)
+                    or (operand & 0x8 and ac & 0x8000)
+                    or (operand & 0x4 and not ac)
+                    or (operand & 0x2 and not e)
+                )
+
+                if operand & 0x3E0:
+                    # The ALU outputs are wired-OR, as are the E flipflop pins.
+                    value = 0
+                    carry = 0
+
+                    if operand & 0x200:
+                        value |= ~ac & 0xFFFF
+                    if operand & 0x80:
+                        value |= (e << 15) | (ac >> 1)
+                        carry |= ac & 1
+                    if operand & 0x40:
+                        value |= ((ac << 1) & 0xFFFF) | e
+                        carry |= ac >> 15
+
+                    j = operand & 0xC0 and carry
+                    k = (operand & 0xC0 and not carry) or operand & 0x400
+                    if operand & 0x100:
+                        j = k = 1
+                    if j or k:
+                        e = 1 if j and not (k and e) else 0
+
+                    if operand & 0x800:
+                        ac = 0
+                    elif operand & 0x2C0:
+                        ac = value
+                    elif operand & 0x20:
+                        ac = (ac + 1) & 0xFFFF
+                else:
+                    if operand & 0x800:
+                        ac = 0
+                    if operand & 0x400:
+                        e = 0
+
+                if skip:
+                    pc = (pc + 1) & 0xFFF
+
+                if operand & 0x1:
+                    self.s = 0
+
+                cycles += REGISTER_CYCLES - saved
+            elif arithmetic and not ir & 0xFC0:
+                kind = ir & 0x30
+                amount = ir & 0xF
+
+                if kind == 0x30:
+                    if not amount:
+                        ar = memory[pc] & 0xFFF
+                        pc = (pc + 1) & 0xFFF
+                        product = ac * memory[ar]
+                        ac = product & 0xFFFF
+                        dr = product >> 16
+                        e = 1 if dr else 0
+                        cycles += MUL_CYCLES - REGISTER_CYCLES
+                elif amount:
+                    if kind == 0:
+                        value = ac << amount
+                        e = (value >> 16) & 1
+                    else:
+                        # Python shifts negative integers arithmetically.
+                        value = ac - 0x10000 if kind == 0x20 and ac & 0x8000 else ac
+                        e = (value >> (amount - 1)) & 1
+                        value >>= amount
+
+                    ac = value & 0xFFFF
+
+                io_fetch = True
+                cycles += REGISTER_CYCLES - saved
+            else:
+                self.ac = ac
+                self.pc = pc
+                self._input_output(ir & 0xFFF, cycles + 3 - saved)
+                ac = self.ac
+                io_fetch = not ir & 0x400 and pc == self.pc
+                pc = self.pc
+                cycles += REGISTER_CYCLES - saved
+
+                if idle and ir == SKI and self._polling_keyboard(pc):
+                    if self.keyboard.interactive:
+                        self.keyboard.wait()
+                    elif self.keyboard.eof and limit != NEVER and not trace:
+                        start = cycles - REGISTER_CYCLES + saved
+                        rounds = max((limit - start - 1) // ski_round, 0)
+                        cycles += rounds * ski_round
+                        instructions += rounds * 2
+
+                        if profile:
+                            bun = (start_pc + 1) & 0xFFF
+                            bun_cycles = ski_round - REGISTER_CYCLES
+                            start_cycles += rounds * ski_round
+                            profile.instructions[start_pc] += rounds
+                            profile.cycles[start_pc] += rounds * REGISTER_CYCLES
+                            profile.instructions[bun] += rounds
+                            profile.cycles[bun] += rounds * bun_cycles
+
+            instructions += 1
+
+            if prefetch:
+                if opcode < 3:
+                    fetch = True
+                elif opcode == 3:
+                    fetch = not ir & 0x8000 and ar != pc
+                elif opcode == 6:
+                    fetch = dr != 0 and ar != pc
+                elif opcode != 7:
+                    fetch = False
+                elif not ir & 0x8000:
+                    fetch = not skip and not ir & 0x1
+                else:
+                    fetch = io_fetch
+
+            if profile:
+                profile.instructions[start_pc] += 1
+                profile.cycles[start_pc] += cycles - start_cycles
+
+            if trace:
+                flags = e
+
+                if opcode in {3, 5, 6}:
+                    # `BSA` has already incremented `AR`.
+                    address = (ar - 1) & 0xFFF if opcode == 5 else ar
+                    data = memory[address]
+                    flags |= TRACE_WRITE
+                else:
+                    address = data = 0
+
+                trace.write(start_cycles, start_pc, ir, ac, address, data, flags)
+
+            if ien and self.s:
+                self._sync(cycles - 1)
+
+                if self.fgi or self.fgo:
+                    fetch = False
+                    self.tr = pc
+                    memory[0] = pc
+                    ar = 0
+                    pc = 1
+                    self.ien = 0
+                    self.interrupts += 1
+                    cycles += INTERRUPT_CYCLES
+
+                    if profile:
+                        profile.interrupts += 1
+                        profile.interrupt_cycles += INTERRUPT_CYCLES
+
+                    if trace:
+                        flags = e | TRACE_WRITE | TRACE_INTERRUPT
+                        trace.write(
+                            cycles - INTERRUPT_CYCLES, self.tr, 0, ac, 0, self.tr, flags
+                        )
+
+            overlapped = prefetch and fetch
+
+        self._sync(cycles)
+        self.ac = ac
+        self.dr = dr
+        self.ar = ar
+        self.pc = pc
+        self.ir = ir
+        self.e = e
+        self.cycles = cycles
+        self.instructions = instructions
+        self.overlapped = overlapped
+        self.printer.flush()
+
+        if trace:
+            trace.flush()
+
+        return not self.s
+
+
+def format_stats(machine: Machine, *, seconds: Optional[float] = None):
+    lines = [
+        f"instructions: {machine.instructions}",
+        f"cycles: {machine.cycles}",
+        f"interrupts: {machine.interrupts}",
+    ]
+
+    if machine.instructions:
+        lines.append(f"cycles/instruction: {machine.cycles / machine.instructions:.3f}")
+
+    if seconds:
+        lines.append(f"instructions/s: {machine.instructions / seconds:.0f}")
+
+    return lines
+
+
+@contextmanager
+def raw_terminal(stream: BinaryIO):
+    try:
+        from termios import ECHO, ICANON, TCSANOW, tcgetattr, tcsetattr
+    except ImportError:
+        yield
+        return
+
+    fd = stream.fileno()
+    old = tcgetattr(fd)
+    new = tcgetattr(fd)
+    new[3] &= ~(ICANON | ECHO)
+    tcsetattr(fd, TCSANOW, new)
+
+    try:
+        yield
+    finally:
+        tcsetattr(fd, TCSANOW, old)
@@ -7,11 +7,23 @@
  *
  * @param __ALU_IF__ - condition. Should be a 1 bit integer expression.
  * @param __ALU_AC__ - value of AC. Should be a 16 bit integer expression.
+ */
+`define ALU_OPERATOR(__ALU_IF__, __ALU_AC__) \
+  assign ac = {16{__ALU_IF__}} & 16'(__ALU_AC__);
+
+/**
+ * Defines each ALU operator with carry.
+ *
+ * The operators without carry do not drive `c` at all, as some simulators
+ * ignore the other drivers of a `wor` which has a constant zero driver.
+ *
+ * @param __ALU_IF__ - condition. Should be a 1 bit integer expression.
+ * @param __ALU_AC__ - value of AC. Should be a 16 bit integer expression.
  * @param __ALU_C__ - value of carry. Should be a 1 bit integer expression.
  */
-`define ALU_OPERATOR(__ALU_IF__, __ALU_AC__, __ALU_C__) \
-  assign ac = {16{__ALU_IF__}} & 16'(__ALU_AC__);       \
-  assign c  = __ALU_IF__ & __ALU_C__;
+`define ALU_OPERATOR_CARRY(__ALU_IF__, __ALU_AC__, __ALU_C__) \
+  `ALU_OPERATOR(__ALU_IF__, __ALU_AC__)                       \
+  assign c = __ALU_IF__ & __ALU_C__;
 
 /**
  * Calculates an operation depending on the selected operator.
@@ -72,11 +84,11 @@ module ALU (
   assign cir_carry = ac_in[0];
   assign cir = {c_in, ac_in[15:1]};
 
-  `ALU_OPERATOR(op_and_in, ac_in & dr_in, '0)
-  `ALU_OPERATOR(op_add_in, add, add_c_out)
-  `ALU_OPERATOR(op_dr_in, dr_in, '0)
-  `ALU_OPERATOR(op_inpr_in, inpr_in, '0)
-  `ALU_OPERATOR(op_complement_in, ~ac_in, '0)
-  `ALU_OPERATOR(op_cil_in, cil, cil_carry)
-  `ALU_OPERATOR(op_cir_in, cir, cir_carry)
+  `ALU_OPERATOR(op_and_in, ac_in & dr_in)
+  `ALU_OPERATOR_CARRY(op_add_in, add, add_c_out)
+  `ALU_OPERATOR(op_dr_in, dr_in)
+  `ALU_OPERATOR(op_inpr_in, inpr_in)
+  `ALU_OPERATOR(op_complement_in, ~ac_in)
+  `ALU_OPERATOR_CARRY(op_cil_in, cil, cil_carry)
+  `ALU_OPERATOR_CARRY(op_cir_in, cir, cir_carry)
 endmodule
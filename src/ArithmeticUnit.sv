@@ -0,0 +1,58 @@
+`include "preamble.sv"
+
+/**
+ * Defines each operator of `ArithmeticUnit`, like `ALU_OPERATOR_CARRY`.
+ *
+ * @param __AU_IF__ - condition. Should be a 1 bit integer expression.
+ * @param __AU_AC__ - value of AC. Should be a 16 bit integer expression.
+ * @param __AU_C__ - value of carry. Should be a 1 bit integer expression.
+ */
+`define AU_OPERATOR(__AU_IF__, __AU_AC__, __AU_C__) \
+  assign ac = {16{__AU_IF__}} & 16'(__AU_AC__);     \
+  assign c  = __AU_IF__ & __AU_C__;
+
+/**
+ * The barrel shifter and the multiplier of the arithmetic extension. Like
+ * `ALU`, the outputs are zero unless an operator is selected, and the selected
+ * operators are ORed.
+ *
+ * The shifts move `AC` by `amount_in` bits, and carry the last bit shifted out,
+ * or 0 if the amount is 0. The multiplication takes `AC` and `DR` as unsigned
+ * words. It outputs the low word of the product on `ac_out` and the high word
+ * on `dr_out`, and carries if the high word is not zero.
+ */
+module ArithmeticUnit (
+    output var logic c_out,
+    output var logic [15:0] ac_out,
+    output var logic [15:0] dr_out,
+    input var logic [15:0] ac_in,
+    input var logic [15:0] dr_in,
+    input var logic [3:0] amount_in,
+    input var logic op_shl_in,
+    input var logic op_shr_in,
+    input var logic op_asr_in,
+    input var logic op_mul_in
+);
+  wor c;
+  assign c_out = c;
+  wor [15:0] ac;
+  assign ac_out = ac;
+
+  var logic [16:0] shl;
+  assign shl = {1'b0, ac_in} << amount_in;
+
+  var logic [16:0] shr;
+  assign shr = {ac_in, 1'b0} >> amount_in;
+
+  var logic [16:0] asr;
+  assign asr = $signed({ac_in, 1'b0}) >>> amount_in;
+
+  var logic [31:0] product;
+  assign product = 32'(ac_in) * 32'(dr_in);
+  assign dr_out = {16{op_mul_in}} & product[31:16];
+
+  `AU_OPERATOR(op_shl_in, shl[15:0], shl[16])
+  `AU_OPERATOR(op_shr_in, shr[16:1], shr[0])
+  `AU_OPERATOR(op_asr_in, asr[16:1], asr[0])
+  `AU_OPERATOR(op_mul_in, product[15:0], product[31:16] != 0)
+endmodule
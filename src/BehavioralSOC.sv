@@ -0,0 +1,434 @@
+`include "preamble.sv"
+`IMPORT(instruction)
+
+/**
+ * Define a register along with its pins. The storage is named like the one of
+ * `Register`, so the hierarchical names of `SOC` also work here.
+ *
+ * @param __BSOC_NAME__ - name of register. Should be a valid identifier.
+ * @param __BSOC_BITS__ - width of register. Should be an integer literal.
+ */
+`define BSOC_REGISTER(__BSOC_NAME__, __BSOC_BITS__)                       \
+  var logic [__BSOC_BITS__-1:0] __BSOC_NAME__``_data_out;                 \
+  var logic [__BSOC_BITS__-1:0] __BSOC_NAME__``_data_in;                  \
+  var logic __BSOC_NAME__``_load;                                         \
+  var logic __BSOC_NAME__``_increment;                                    \
+  var logic __BSOC_NAME__``_clear;                                        \
+  if (1 == 1) begin : __BSOC_NAME__                                       \
+    var logic [__BSOC_BITS__-1:0] data_out = 'x;                          \
+    always_ff @(posedge clock)                                            \
+      if (__BSOC_NAME__``_clear) data_out <= '0;                          \
+      else if (__BSOC_NAME__``_load) data_out <= __BSOC_NAME__``_data_in; \
+      else if (__BSOC_NAME__``_increment) data_out <= data_out + 1'b1;    \
+  end                                                                     \
+  assign __BSOC_NAME__``_data_out = __BSOC_NAME__.data_out;
+
+/**
+ * Define a JK flipflop along with its pins. The storage is named like the one
+ * of `JKFlipFlop`.
+ *
+ * @param __BSOC_NAME__ - name of flipflop. Should be a valid identifier.
+ */
+`define BSOC_FLAG(__BSOC_NAME__)                                     \
+  var logic __BSOC_NAME__``_data;                                    \
+  var logic __BSOC_NAME__``_j;                                       \
+  var logic __BSOC_NAME__``_k;                                       \
+  if (1 == 1) begin : __BSOC_NAME__                                  \
+    var logic q_out = 'x;                                            \
+    always_ff @(posedge clock)                                       \
+      if (__BSOC_NAME__``_j || __BSOC_NAME__``_k)                    \
+        q_out <= __BSOC_NAME__``_j && !(__BSOC_NAME__``_k && q_out); \
+  end                                                                \
+  assign __BSOC_NAME__``_data = __BSOC_NAME__.q_out;
+
+/**
+ * The computer minus the I/O, like `SOC`, with the same ports and timing, but
+ * described as a few processes instead of a netlist of components, which is
+ * much faster to simulate. `SOC` remains the reference design. Define
+ * `BEHAVIORAL_SOC` to use it in `VirtualComputer` and `VirtualHarness`, and see
+ * `VirtualLockstep` to check it against `SOC`.
+ *
+ * `ARITHMETIC` enables the arithmetic extension, as in `SOC`.
+ */
+module BehavioralSOC #(
+    parameter bit ARITHMETIC = 0
+) (
+    output var logic [7:0] data_out,
+    output var logic fgi_out,
+    output var logic fgo_out,
+    output var logic s_out,
+    input var logic [7:0] data_in,
+    input var logic load_in,
+    input var logic clear_in,
+    input var logic boot_in,
+    input var logic clock
+);
+  localparam int ar_index = 1;  // verilog_lint: waive parameter-name-style
+  localparam int pc_index = 2;  // verilog_lint: waive parameter-name-style
+  localparam int dr_index = 3;  // verilog_lint: waive parameter-name-style
+  localparam int ac_index = 4;  // verilog_lint: waive parameter-name-style
+  localparam int ir_index = 5;  // verilog_lint: waive parameter-name-style
+  localparam int tr_index = 6;  // verilog_lint: waive parameter-name-style
+  localparam int mem_index = 7;  // verilog_lint: waive parameter-name-style
+
+  var logic [15:0] bus_out;
+  var logic [7:0] bus_selector;
+  var logic [2:0] bus_index;
+
+  var logic [15:0] mem_data_out = 'x;
+  var logic mem_read_enable;
+  var logic mem_write_enable;
+
+  `BSOC_REGISTER(ar, 12)
+  assign ar_data_in = bus_out[11:0];
+
+  `BSOC_REGISTER(pc, 12)
+  assign pc_data_in = bus_out[11:0];
+
+  `BSOC_REGISTER(dr, 16)
+
+  `BSOC_REGISTER(ac, 16)
+
+  `BSOC_REGISTER(inpr, 8)
+  assign inpr_data_in = data_in;
+
+  `BSOC_REGISTER(ir, 16)
+  assign ir_data_in = bus_out;
+
+  `BSOC_REGISTER(tr, 16)
+  assign tr_data_in = bus_out;
+
+  `BSOC_REGISTER(outr, 8)
+  assign outr_data_in = bus_out[7:0];
+  assign data_out = outr_data_out;
+
+  `BSOC_FLAG(fgi)
+  assign fgi_out = fgi_data;
+
+  `BSOC_FLAG(fgo)
+  assign fgo_out = fgo_data;
+
+  `BSOC_FLAG(s)
+  assign s_out = s_data;
+
+  `BSOC_FLAG(e)
+  `BSOC_FLAG(r)
+  `BSOC_FLAG(ien)
+
+  /* verilator lint_off NOLATCH */
+  if (1 == 1) begin : mem
+    var logic [15:0] content[4096];  // = 'x
+
+    always_latch if (mem_read_enable) mem_data_out = content[ar_data_out];
+    always_ff @(posedge clock)
+      if (mem_write_enable) content[ar_data_out] <= bus_out;
+  end
+  /* verilator lint_on NOLATCH */
+
+  var logic [3:0] sc_data;
+  var logic [15:0] timer;
+  var logic sc_clear;
+
+  if (1 == 1) begin : sc
+    if (1 == 1) begin : sc
+      var logic [3:0] data_out = 'x;
+      always_ff @(posedge clock)
+        if (sc_clear) data_out <= '0;
+        else data_out <= data_out + 1'b1;
+    end
+  end
+
+  assign sc_data = sc.sc.data_out;
+  assign timer   = 16'(1) << sc_data;
+
+  /**
+   * Like `Encoder3`, several selected components OR their indices.
+   */
+  always_comb begin
+    bus_index = '0;
+    for (int i = 1; i < 8; i++) if (bus_selector[i]) bus_index |= 3'(i);
+  end
+
+  always_comb
+    case (bus_index)
+      ar_index: bus_out = 16'(ar_data_out);
+      pc_index: bus_out = 16'(pc_data_out);
+      dr_index: bus_out = dr_data_out;
+      ac_index: bus_out = ac_data_out;
+      ir_index: bus_out = ir_data_out;
+      tr_index: bus_out = tr_data_out;
+      mem_index: bus_out = mem_data_out;
+      default: bus_out = '0;
+    endcase
+
+  var instruction_t instruction;
+  assign instruction = ir_data_out;
+
+  var logic op_and;
+  var logic op_add;
+  var logic op_dr;
+  var logic op_inpr;
+  var logic op_complement;
+  var logic op_cir;
+  var logic op_cil;
+  var logic op_shl;
+  var logic op_shr;
+  var logic op_asr;
+  var logic op_mul;
+  var logic carry;
+  var logic [16:0] alu;
+  var logic [16:0] shr;
+  var logic [16:0] asr;
+  var logic [31:0] product;
+
+  /**
+   * The instructions of the arithmetic extension.
+   */
+  var logic extension;
+  var logic mul;
+  assign extension = ARITHMETIC && instruction.opcode == 7 && instruction.mode &&
+      instruction.operand[11:6] == 0;
+  assign mul = extension && instruction.operand[5:0] == 6'o60;
+
+  assign dr_data_in = op_mul ? product[31:16] : bus_out;
+
+  /**
+   * The control unit and the ALU. Every control signal is 0 unless the
+   * current step of the instruction sets it, and the operations which are
+   * selected together are ORed, as the `wor` nets of `ControlUnit` and `ALU`
+   * do.
+   */
+  always_comb begin
+    bus_selector = '0;
+    mem_read_enable = '0;
+    mem_write_enable = '0;
+    {ar_clear, ar_load, ar_increment} = '0;
+    {pc_clear, pc_load, pc_increment} = '0;
+    {dr_clear, dr_load, dr_increment} = '0;
+    {ac_clear, ac_increment} = '0;
+    {inpr_clear, inpr_increment} = '0;
+    {ir_clear, ir_load, ir_increment} = '0;
+    {tr_clear, tr_load, tr_increment} = '0;
+    {outr_load, outr_increment} = '0;
+    {op_and, op_add, op_dr, op_inpr, op_complement, op_cir, op_cil} = '0;
+    {op_shl, op_shr, op_asr, op_mul} = '0;
+    {e_j, e_k, fgi_k, fgo_k, s_j, s_k, ien_j, ien_k, r_k} = '0;
+    sc_clear = !s_data;
+
+    // Devices
+    inpr_load = load_in;
+    fgi_j = load_in;
+    outr_clear = clear_in;
+    fgo_j = clear_in;
+
+    // Interrupt
+    r_j = sc_data > 2 && ien_data && (fgi_data || fgo_data);
+
+    case (sc_data)
+      0:
+      if (r_data) begin
+        ar_clear = '1;
+        tr_load = '1;
+        bus_selector[pc_index] = '1;
+      end else begin
+        ar_load = '1;
+        bus_selector[pc_index] = '1;
+      end
+
+      1:
+      if (r_data) begin
+        mem_write_enable = '1;
+        bus_selector[tr_index] = '1;
+        pc_clear = '1;
+      end else begin
+        ir_load = '1;
+        mem_read_enable = '1;
+        pc_increment = '1;
+      end
+
+      2:
+      if (r_data) begin
+        pc_increment = '1;
+        ien_k = '1;
+        r_k = '1;
+        sc_clear = '1;
+      end else begin
+        ar_load = '1;
+        bus_selector[ir_index] = '1;
+      end
+
+      3:
+      if (instruction.opcode != 7) begin
+        // Indirect
+        if (instruction.mode) begin
+          ar_load = '1;
+          mem_read_enable = '1;
+        end
+      end else if (!instruction.mode) begin
+        // Register-reference
+        sc_clear = '1;
+        ac_clear = instruction.operand[11];
+        e_k = instruction.operand[10] || instruction.operand[8];
+        op_complement = instruction.operand[9];
+        e_j = instruction.operand[8];
+        op_cir = instruction.operand[7];
+        op_cil = instruction.operand[6];
+        ac_increment = instruction.operand[5];
+        pc_increment = instruction.operand[4] && !ac_data_out[15] ||
+            instruction.operand[3] && ac_data_out[15] ||
+            instruction.operand[2] && ac_data_out == 0 ||
+            instruction.operand[1] && !e_data;
+        s_k = instruction.operand[0];
+      end else begin
+        // Input-output
+        sc_clear = '1;
+        op_inpr = instruction.operand[11];
+        fgi_k = instruction.operand[11];
+        outr_load = instruction.operand[10];
+        bus_selector[ac_index] = instruction.operand[10];
+        fgo_k = instruction.operand[10];
+        pc_increment = instruction.operand[9] && fgi_data ||
+            instruction.operand[8] && fgo_data;
+        ien_j = instruction.operand[7];
+        ien_k = instruction.operand[6];
+
+        // Arithmetic extension
+        if (extension && instruction.operand[3:0] != 0)
+          case (instruction.operand[5:4])
+            0: op_shl = '1;
+            1: op_shr = '1;
+            2: op_asr = '1;
+            default: ;
+          endcase
+
+        if (mul) begin
+          sc_clear = '0;
+          ar_load = '1;
+          bus_selector[pc_index] = '1;
+          pc_increment = '1;
+        end
+      end
+
+      4:
+      case (instruction.opcode)
+        0, 1, 2, 6: begin
+          dr_load = '1;
+          mem_read_enable = '1;
+        end
+
+        3: begin
+          mem_write_enable = '1;
+          bus_selector[ac_index] = '1;
+          sc_clear = '1;
+        end
+
+        4: begin
+          pc_load = '1;
+          bus_selector[ar_index] = '1;
+          sc_clear = '1;
+        end
+
+        5: begin
+          mem_write_enable = '1;
+          bus_selector[pc_index] = '1;
+          ar_increment = '1;
+        end
+
+        7:
+        if (mul) begin
+          ar_load = '1;
+          mem_read_enable = '1;
+        end
+
+        default: ;
+      endcase
+
+      5:
+      case (instruction.opcode)
+        0: begin
+          op_and = '1;
+          sc_clear = '1;
+        end
+
+        1: begin
+          op_add = '1;
+          sc_clear = '1;
+        end
+
+        2: begin
+          op_dr = '1;
+          sc_clear = '1;
+        end
+
+        5: begin
+          pc_load = '1;
+          bus_selector[ar_index] = '1;
+          sc_clear = '1;
+        end
+
+        6: dr_increment = '1;
+
+        7:
+        if (mul) begin
+          dr_load = '1;
+          mem_read_enable = '1;
+        end
+
+        default: ;
+      endcase
+
+      6:
+      if (instruction.opcode == 6) begin
+        mem_write_enable = '1;
+        bus_selector[dr_index] = '1;
+        pc_increment = dr_data_out == 0;
+        sc_clear = '1;
+      end else if (mul) begin
+        op_mul = '1;
+        dr_load = '1;
+        sc_clear = '1;
+      end
+
+      default: ;
+    endcase
+
+    bus_selector[mem_index] = mem_read_enable;
+
+    // ALU
+    alu = '0;
+    if (op_and) alu |= 17'(ac_data_out & dr_data_out);
+    if (op_add) alu |= 17'(ac_data_out) + 17'(dr_data_out);
+    if (op_dr) alu |= 17'(dr_data_out);
+    if (op_inpr) alu |= 17'(inpr_data_out);
+    if (op_complement) alu |= 17'(~ac_data_out);
+    if (op_cil) alu |= {ac_data_out, e_data};
+    if (op_cir) alu |= {ac_data_out[0], e_data, ac_data_out[15:1]};
+
+    // Arithmetic extension, like `ArithmeticUnit`
+    shr = {ac_data_out, 1'b0} >> instruction.operand[3:0];
+    asr = $signed({ac_data_out, 1'b0}) >>> instruction.operand[3:0];
+    product = 32'(ac_data_out) * 32'(dr_data_out);
+    if (op_shl) alu |= {1'b0, ac_data_out} << instruction.operand[3:0];
+    if (op_shr) alu |= {shr[0], shr[16:1]};
+    if (op_asr) alu |= {asr[0], asr[16:1]};
+    if (op_mul) alu |= {product[31:16] != 0, product[15:0]};
+    {carry, ac_data_in} = alu;
+
+    ac_load = op_and || op_add || op_dr || op_inpr || op_complement || op_cir ||
+        op_cil || op_shl || op_shr || op_asr || op_mul;
+
+    if (op_add || op_cir || op_cil || op_shl || op_shr || op_asr || op_mul) begin
+      e_j |= carry;
+      e_k |= !carry;
+    end
+
+    if (boot_in) begin
+      {ar_clear, pc_clear, dr_clear, ac_clear, inpr_clear} = '1;
+      {ir_clear, tr_clear, outr_clear, sc_clear} = '1;
+      {e_j, fgi_j, ien_j, r_j} = '0;
+      {e_k, fgi_k, ien_k, r_k} = '1;
+      {fgo_j, s_j} = '1;
+      {fgo_k, s_k} = '0;
+    end
+  end
+endmodule
@@ -114,7 +114,7 @@
  * @param __CU_SRC__ - name of component. Should be a valid identifier.
  */
 `define CU_SL(__CU_IF__, __CU_SRC__) \
-  assign bus_selector[__CU_SRC__``_index] = __CU_IF__;
+  assign bus_selector = 8'(__CU_IF__) << __CU_SRC__``_index;
 
 /**
  * Move data between two registers at condition.
@@ -189,8 +189,23 @@
 
 /**
  * Manages the flow of data between registers and memory.
+ *
+ * If `ARITHMETIC` is set, the input-output instructions without any I/O bit
+ * (`F000` to `F03F`), which are otherwise no-ops, are decoded by bits 5 and 4:
+ *
+ * - `SHL n`, `SHR n`, and `ASR n` (0, 1, and 2) shift `AC` left, right, or
+ *   right arithmetically by the amount in bits 3 to 0, and put the last bit
+ *   shifted out in `E`. They take as long as a register-reference instruction.
+ * - `MUL` (3 with an amount of 0) is followed by the address of the
+ *   multiplier. It multiplies `AC` by the multiplier as unsigned words, puts the
+ *   low word in `AC` and the high word in `DR`, and sets `E` if the high word is
+ *   not zero. It ends at T6.
+ *
+ * The other codes remain no-ops.
  */
-module ControlUnit (
+module ControlUnit #(
+    parameter bit ARITHMETIC = 0
+) (
     output var logic [7 : 0] bus_selector_out,
     output var logic e_j_out,
     output var logic e_k_out,
@@ -228,6 +243,10 @@ module ControlUnit (
     output var logic op_inpr_out,
     output var logic op_cil_out,
     output var logic op_cir_out,
+    output var logic op_shl_out,
+    output var logic op_shr_out,
+    output var logic op_asr_out,
+    output var logic op_mul_out,
     output var logic outr_clear_out,
     output var logic outr_increment_out,
     output var logic outr_load_out,
@@ -279,6 +298,10 @@ module ControlUnit (
   `CU_DEF_ALIAS(op_inpr)
   `CU_DEF_ALIAS(op_cil)
   `CU_DEF_ALIAS(op_cir)
+  `CU_DEF_ALIAS(op_shl)
+  `CU_DEF_ALIAS(op_shr)
+  `CU_DEF_ALIAS(op_asr)
+  `CU_DEF_ALIAS(op_mul)
   `CU_DEF_ALIAS(outr_clear)
   `CU_DEF_ALIAS(outr_increment)
   `CU_DEF_ALIAS(outr_load)
@@ -320,7 +343,6 @@ module ControlUnit (
   `CU_INC(0, outr)
   `CU_INC(0, ir)
 
-  localparam int null_index = 0;  // verilog_lint: waive parameter-name-style
   localparam int ar_index = 1;  // verilog_lint: waive parameter-name-style
   localparam int pc_index = 2;  // verilog_lint: waive parameter-name-style
   localparam int dr_index = 3;  // verilog_lint: waive parameter-name-style
@@ -332,8 +354,9 @@ module ControlUnit (
   wor [7:0] bus_selector;
   assign bus_selector_out = bus_selector;
 
-  assign bus_selector[null_index] = '0;
-  assign bus_selector[mem_index] = mem_read_enable_out;
+  // Each selection drives the whole bus selector, as some simulators do not
+  // resolve a `wor` driven by its bits.
+  assign bus_selector = 8'(mem_read_enable_out) << mem_index;
 
   /* verilator lint_off GENUNNAMED */
 
@@ -426,11 +449,45 @@ module ControlUnit (
   `CU_INC(r && operand[1] && !e_in, pc)  // SZE
   `CU_FF_K(r && operand[0], s)  // HLT
 
+  // Arithmetic extension
+  var logic mul;
+
+  if (ARITHMETIC) begin : arithmetic
+    var logic x;
+    assign x = data[7] && mode && operand[11:6] == 0;
+
+    var logic [3:0] amount;
+    assign amount = operand[3:0];
+
+    `CU_ALU_CARRY(x && timer_in[3] && operand[5:4] == 0 && amount != 0, shl)  // SHL n
+    `CU_ALU_CARRY(x && timer_in[3] && operand[5:4] == 1 && amount != 0, shr)  // SHR n
+    `CU_ALU_CARRY(x && timer_in[3] && operand[5:4] == 2 && amount != 0, asr)  // ASR n
+
+    //   MUL
+    assign mul = x && operand[5:0] == 6'o60;
+
+    `CU_MOV(mul && timer_in[3], ar, pc)
+    `CU_INC(mul && timer_in[3], pc)
+    `CU_LOAD(mul && timer_in[4], ar)
+    `CU_LOAD(mul && timer_in[5], dr)
+    `CU_ALU_CARRY(mul && timer_in[6], mul)
+    `CU_LD(mul && timer_in[6], dr)
+    `CU_CLR(mul && timer_in[6], sc)
+  end else begin : no_arithmetic
+    // Only the operations which nothing else drives are driven here, as some
+    // simulators ignore the other drivers of a `wor` with a constant driver.
+    assign mul = 0;
+    assign op_shl = 0;
+    assign op_shr = 0;
+    assign op_asr = 0;
+    assign op_mul = 0;
+  end
+
   // Input-output
   var logic p;
   assign p = data[7] && mode && timer_in[3];
 
-  `CU_CLR(p, sc)
+  `CU_CLR(p && !mul, sc)
 
   //   INP
   `CU_ALU(p && operand[11], inpr)
@@ -0,0 +1,48 @@
+`include "preamble.sv"
+
+/**
+ * First-in, first-out data storage. The oldest word is always at `data_out`.
+ * Pushing while full, or popping while empty, does nothing.
+ *
+ * @param D_WIDTH data width, or word size, in bits.
+ * @param A_WIDTH address width. The FIFO holds `2**A_WIDTH` words.
+ */
+module FIFO #(
+    parameter int D_WIDTH = 8,
+    parameter int A_WIDTH = 4
+) (
+    output var logic [D_WIDTH-1 : 0] data_out,
+    output var logic empty_out,
+    output var logic full_out,
+    input var logic [D_WIDTH-1 : 0] data_in,
+    input var logic push_in,
+    input var logic pop_in,
+    input var logic clear_in,
+    input var logic clock
+);
+  var logic [D_WIDTH-1 : 0] content[2**A_WIDTH];  // = 'x
+
+  /*
+   * The extra bit tells a full FIFO from an empty one, as both have the same
+   * addresses otherwise.
+   */
+  var logic [A_WIDTH : 0] head = 'x;
+  var logic [A_WIDTH : 0] tail = 'x;
+
+  assign data_out = content[head[A_WIDTH-1 : 0]];
+  assign empty_out = head == tail;
+  assign full_out = head == {!tail[A_WIDTH], tail[A_WIDTH-1 : 0]};
+
+  always_ff @(posedge clock)
+    if (clear_in) begin
+      head <= '0;
+      tail <= '0;
+    end else begin
+      if (push_in && !full_out) begin
+        content[tail[A_WIDTH-1 : 0]] <= data_in;
+        tail <= tail + 1'b1;
+      end
+
+      if (pop_in && !empty_out) head <= head + 1'b1;
+    end
+endmodule
@@ -0,0 +1,224 @@
+`include "preamble.sv"
+`IMPORT(instruction)
+`IMPORT(ControlUnit)
+
+/**
+ * `ControlUnit` which overlaps the fetch of the next instruction with the
+ * execution of the current one, so that instructions which end with the
+ * program counter untouched skip T0 and T1.
+ *
+ * In an execute state (T3 and later) which neither uses the bus nor the memory,
+ * such as T3 of a direct memory-reference instruction, the word at `PC` is
+ * prefetched into `PR`, and `PV` is set. `PV` is cleared at the end of every
+ * instruction (and the interrupt cycle), whenever `PC` changes, and whenever
+ * the memory is written at the prefetched address, such as by `ISZ` or `STA`.
+ *
+ * In the last state of an instruction, unless it changes `PC`, halts the
+ * computer, or is followed by an interrupt, the next instruction is loaded into
+ * `IR`: from `PR` if it is still valid, or straight from the memory if the bus
+ * and the memory are idle. `PC` is incremented, and the sequence counter is
+ * loaded with 2 instead of cleared, so the next instruction starts at T2.
+ * Otherwise, the sequence counter is cleared as usual.
+ *
+ * `ARITHMETIC` is passed to `ControlUnit`.
+ */
+module PrefetchControlUnit #(
+    parameter bit ARITHMETIC = 0
+) (
+    output var logic [7 : 0] bus_selector_out,
+    output var logic e_j_out,
+    output var logic e_k_out,
+    output var logic fgi_j_out,
+    output var logic fgi_k_out,
+    output var logic fgo_j_out,
+    output var logic fgo_k_out,
+    output var logic ien_j_out,
+    output var logic ien_k_out,
+    output var logic pv_j_out,
+    output var logic pv_k_out,
+    output var logic r_j_out,
+    output var logic r_k_out,
+    output var logic s_j_out,
+    output var logic s_k_out,
+    output var logic ac_clear_out,
+    output var logic ac_increment_out,
+    output var logic ac_load_out,
+    output var logic ar_clear_out,
+    output var logic ar_increment_out,
+    output var logic ar_load_out,
+    output var logic dr_clear_out,
+    output var logic dr_increment_out,
+    output var logic dr_load_out,
+    output var logic inpr_clear_out,
+    output var logic inpr_increment_out,
+    output var logic inpr_load_out,
+    output var logic ir_clear_out,
+    output var logic ir_increment_out,
+    output var logic ir_load_out,
+    output var logic ir_prefetch_out,
+    output var logic mem_pc_address_out,
+    output var logic mem_read_enable_out,
+    output var logic mem_write_enable_out,
+    output var logic op_add_out,
+    output var logic op_and_out,
+    output var logic op_complement_out,
+    output var logic op_dr_out,
+    output var logic op_inpr_out,
+    output var logic op_cil_out,
+    output var logic op_cir_out,
+    output var logic op_shl_out,
+    output var logic op_shr_out,
+    output var logic op_asr_out,
+    output var logic op_mul_out,
+    output var logic outr_clear_out,
+    output var logic outr_increment_out,
+    output var logic outr_load_out,
+    output var logic pc_clear_out,
+    output var logic pc_increment_out,
+    output var logic pc_load_out,
+    output var logic pr_clear_out,
+    output var logic pr_increment_out,
+    output var logic pr_load_out,
+    output var logic sc_clear_out,
+    output var logic sc_load_out,
+    output var logic tr_clear_out,
+    output var logic tr_increment_out,
+    output var logic tr_load_out,
+    input var instruction_t instruction_in,
+    input var logic [15:0] ac_in,
+    input var logic [15:0] dr_in,
+    input var logic [11:0] ar_in,
+    input var logic [11:0] pc_in,
+    input var logic boot_in,
+    input var logic carry_in,
+    input var logic e_in,
+    input var logic fgi_in,
+    input var logic fgo_in,
+    input var logic ien_in,
+    input var logic pv_in,
+    input var logic r_in,
+    input var logic s_in,
+    input var logic load_in,
+    input var logic clear_in,
+    input var logic [15:0] timer_in
+);
+  var logic [7:0] bus_selector;
+  var logic ir_load;
+  var logic mem_read_enable;
+  var logic pc_increment;
+  var logic sc_clear;
+
+  ControlUnit #(
+      .ARITHMETIC(ARITHMETIC)
+  ) cu (
+      .bus_selector_out(bus_selector),
+      .ac_clear_out,
+      .ac_increment_out,
+      .ac_load_out,
+      .op_add_out,
+      .op_and_out,
+      .op_complement_out,
+      .op_dr_out,
+      .op_inpr_out,
+      .op_cil_out,
+      .op_cir_out,
+      .op_shl_out,
+      .op_shr_out,
+      .op_asr_out,
+      .op_mul_out,
+      .ar_clear_out,
+      .ar_increment_out,
+      .ar_load_out,
+      .dr_clear_out,
+      .dr_increment_out,
+      .dr_load_out,
+      .e_j_out,
+      .e_k_out,
+      .inpr_load_out,
+      .inpr_increment_out,
+      .inpr_clear_out,
+      .fgi_j_out,
+      .fgi_k_out,
+      .fgo_j_out,
+      .fgo_k_out,
+      .s_j_out,
+      .s_k_out,
+      .ien_j_out,
+      .ien_k_out,
+      .ir_load_out(ir_load),
+      .ir_increment_out,
+      .ir_clear_out,
+      .mem_read_enable_out(mem_read_enable),
+      .mem_write_enable_out,
+      .outr_load_out,
+      .outr_increment_out,
+      .outr_clear_out,
+      .pc_clear_out,
+      .pc_increment_out(pc_increment),
+      .pc_load_out,
+      .r_j_out,
+      .r_k_out,
+      .sc_clear_out(sc_clear),
+      .tr_clear_out,
+      .tr_increment_out,
+      .tr_load_out,
+      .instruction_in,
+      .ac_in,
+      .dr_in,
+      .carry_in,
+      .e_in,
+      .fgi_in,
+      .fgo_in,
+      .ien_in,
+      .r_in,
+      .s_in,
+      .clear_in,
+      .load_in,
+      .boot_in,
+      .timer_in
+  );
+
+  var logic executing;
+  assign executing = s_in && !boot_in && !r_in && !timer_in[0] && !timer_in[1] &&
+      !timer_in[2];
+
+  var logic idle;
+  assign idle = bus_selector == 0 && !mem_read_enable && !mem_write_enable_out;
+
+  var logic pc_changing;
+  assign pc_changing = pc_clear_out || pc_load_out || pc_increment;
+
+  var logic invalidate;
+  assign invalidate = pc_changing || (mem_write_enable_out && ar_in == pc_in);
+
+  var logic last;
+  assign last = executing && sc_clear && !s_k_out && !r_j_out && !pc_changing;
+
+  var logic prefetch;
+  assign prefetch = executing && !sc_clear && idle && !pc_changing && !pv_in;
+
+  var logic from_pr;
+  assign from_pr = last && pv_in && !invalidate;
+
+  var logic from_mem;
+  assign from_mem = last && !from_pr && idle;
+
+  var logic fetch;
+  assign fetch = from_pr || from_mem;
+
+  assign bus_selector_out = bus_selector | {prefetch || from_mem, 7'b0};
+  assign mem_read_enable_out = mem_read_enable || prefetch || from_mem;
+  assign mem_pc_address_out = prefetch || from_mem;
+
+  assign pr_clear_out = boot_in;
+  assign pr_increment_out = '0;
+  assign pr_load_out = prefetch;
+  assign pv_j_out = !boot_in && prefetch;
+  assign pv_k_out = boot_in || sc_clear || invalidate;
+
+  assign ir_load_out = ir_load || fetch;
+  assign ir_prefetch_out = from_pr;
+  assign pc_increment_out = pc_increment || fetch;
+  assign sc_clear_out = sc_clear && !fetch;
+  assign sc_load_out = fetch;
+endmodule
@@ -1,11 +1,14 @@
 `include "preamble.sv"
 `IMPORT(RAM)
+`IMPORT(FIFO)
 `IMPORT(Encoder3)
 `IMPORT(Register)
 `IMPORT(SequenceCounter)
 `IMPORT(JKFlipFlop)
 `IMPORT(ControlUnit)
+`IMPORT(PrefetchControlUnit)
 `IMPORT(ALU)
+`IMPORT(ArithmeticUnit)
 
 /**
  * Define a register along with its pins.
@@ -73,10 +76,106 @@
   `SOC_BUS_INPUT(__SOC_NAME__, __SOC_IDX__)      \
   `SOC_BUS_OUTPUT(__SOC_NAME__)
 
+/**
+ * Connect the pins which `ControlUnit` and `PrefetchControlUnit` share.
+ */
+`define SOC_CONTROL_UNIT_PINS              \
+  .bus_selector_out(bus_selector_in),      \
+  .ac_clear_out(ac_clear),                 \
+  .ac_increment_out(ac_increment),         \
+  .ac_load_out(ac_load),                   \
+  .op_add_out(op_add),                     \
+  .op_and_out(op_and),                     \
+  .op_complement_out(op_complement),       \
+  .op_dr_out(op_dr),                       \
+  .op_inpr_out(op_inpr),                   \
+  .op_cil_out(op_cil),                     \
+  .op_cir_out(op_cir),                     \
+  .op_shl_out(op_shl),                     \
+  .op_shr_out(op_shr),                     \
+  .op_asr_out(op_asr),                     \
+  .op_mul_out(op_mul),                     \
+  .ar_clear_out(ar_clear),                 \
+  .ar_increment_out(ar_increment),         \
+  .ar_load_out(ar_load),                   \
+  .dr_clear_out(dr_clear),                 \
+  .dr_increment_out(dr_increment),         \
+  .dr_load_out(dr_load),                   \
+  .e_j_out(e_j),                           \
+  .e_k_out(e_k),                           \
+  .inpr_load_out(inpr_load),               \
+  .inpr_increment_out(inpr_increment),     \
+  .inpr_clear_out(inpr_clear),             \
+  .fgi_j_out(fgi_j),                       \
+  .fgi_k_out(fgi_k),                       \
+  .fgo_j_out(fgo_j),                       \
+  .fgo_k_out(fgo_k),                       \
+  .s_j_out(s_j),                           \
+  .s_k_out(s_k),                           \
+  .ien_j_out(ien_j),                       \
+  .ien_k_out(ien_k),                       \
+  .ir_load_out(ir_load),                   \
+  .ir_increment_out(ir_increment),         \
+  .ir_clear_out(ir_clear),                 \
+  .mem_read_enable_out(mem_read_enable),   \
+  .mem_write_enable_out(mem_write_enable), \
+  .outr_load_out(outr_load),               \
+  .outr_increment_out(outr_increment),     \
+  .outr_clear_out(outr_clear),             \
+  .pc_clear_out(pc_clear),                 \
+  .pc_increment_out(pc_increment),         \
+  .pc_load_out(pc_load),                   \
+  .r_j_out(r_j),                           \
+  .r_k_out(r_k),                           \
+  .sc_clear_out(sc_clear),                 \
+  .tr_clear_out(tr_clear),                 \
+  .tr_increment_out(tr_increment),         \
+  .tr_load_out(tr_load),                   \
+  .instruction_in(ir_data_out),            \
+  .ac_in(ac_data_out),                     \
+  .dr_in(dr_data_out),                     \
+  .carry_in(carry),                        \
+  .e_in(e_data),                           \
+  .fgi_in(fgi_data),                       \
+  .fgo_in(fgo_data),                       \
+  .ien_in(ien_data),                       \
+  .r_in(r_data),                           \
+  .s_in(s_out),                            \
+  .clear_in(printer_clear),                \
+  .load_in(keyboard_load),                 \
+  .boot_in,                                \
+  .timer_in(timer)
+
 /**
  * The computer minus the I/O. Synthesizable, unlike `VirtualComputer`.
+ *
+ * If `PREFETCH` is set, the control unit is `PrefetchControlUnit`, which
+ * overlaps the fetch of an instruction with the execution of the previous one,
+ * using the prefetch register `PR` and its valid flag `PV`.
+ *
+ * If `IO_FIFO` is set, the keyboard and the printer are connected to `INPR` and
+ * `OUTR` through FIFOs of `2**FIFO_A_WIDTH` characters. Whenever `FGI` is
+ * clear, `INPR` is loaded from the input FIFO, if any, and `FGI` is set, so it
+ * is set while there is input. Whenever `FGO` is clear, `OUTR` is pushed to the
+ * output FIFO, unless it is full, and `FGO` is set, so it is set while there is
+ * room for output. The programs see the same flags and instructions either way.
+ *
+ * The devices then see `fgi_out` set while the input FIFO is full, and
+ * `fgo_out` clear while the output FIFO has a character. Their handshake is the
+ * same, but with the FIFO: the character is taken at the next clock edge, and
+ * the flag is held until the device drops its pin.
+ *
+ * If `ARITHMETIC` is set, the control unit decodes the shift and multiply
+ * instructions of the arithmetic extension, see `ControlUnit`, and
+ * `ArithmeticUnit` is ORed into the ALU. `DR` is loaded from the high word of
+ * the product instead of the bus during `MUL`.
  */
-module SOC (
+module SOC #(
+    parameter bit PREFETCH = 0,
+    parameter bit IO_FIFO = 0,
+    parameter int FIFO_A_WIDTH = 4,
+    parameter bit ARITHMETIC = 0
+) (
     output var logic [7:0] data_out,
     output var logic fgi_out,
     output var logic fgo_out,
@@ -101,13 +200,15 @@ module SOC (
 
   var logic mem_read_enable;
   var logic mem_write_enable;
+  var logic mem_pc_address;
+  var logic [11:0] mem_address;
   RAM #(
       .D_WIDTH(16),
       .A_WIDTH(12)
   ) mem (
       .data_out(bus_in[7]),
       .data_in(bus_out),
-      .address_in(ar_data_out),
+      .address_in(mem_address),
       .read_enable_in(mem_read_enable),
       .write_enable_in(mem_write_enable),
       .clock
@@ -118,31 +219,95 @@ module SOC (
 
   `SOC_REGISTER(pc, 12)
   `SOC_BUS_INOUT(pc, 2)
+  assign mem_address = mem_pc_address ? pc_data_out : ar_data_out;
 
   `SOC_REGISTER(dr, 16)
-  `SOC_BUS_INOUT(dr, 3)
+  `SOC_BUS_INPUT(dr, 3)
 
   `SOC_REGISTER(ac, 16)
   `SOC_BUS_INPUT(ac, 4)
 
+  var logic [7:0] keyboard_data;
+  var logic keyboard_load;
+  var logic printer_clear;
+
   `SOC_REGISTER(inpr, 8)
-  assign inpr_data_in = data_in;
+  assign inpr_data_in = keyboard_data;
 
+  var logic ir_prefetch;
+  var logic [15:0] prefetch_data;
   `SOC_REGISTER(ir, 16)
-  `SOC_BUS_INOUT(ir, 5)
+  `SOC_BUS_INPUT(ir, 5)
+  assign ir_data_in = ir_prefetch ? prefetch_data : bus_out;
 
   `SOC_REGISTER(tr, 16)
   `SOC_BUS_INOUT(tr, 6)
 
   `SOC_REGISTER(outr, 8)
   `SOC_BUS_OUTPUT(outr)
-  assign data_out = outr_data_out;
 
   `SOC_FLAG(fgi)
-  assign fgi_out = fgi_data;
-
   `SOC_FLAG(fgo)
-  assign fgo_out = fgo_data;
+
+  if (IO_FIFO) begin : fifo
+    var logic input_empty;
+    var logic input_full;
+    var logic output_empty;
+    var logic output_full;
+
+    /*
+     * Whether the character of the device has been taken, until it drops its
+     * pin.
+     */
+    `SOC_FLAG(input_taken)
+    `SOC_FLAG(output_taken)
+
+    FIFO #(
+        .D_WIDTH(8),
+        .A_WIDTH(FIFO_A_WIDTH)
+    ) input_fifo (
+        .data_out(keyboard_data),
+        .empty_out(input_empty),
+        .full_out(input_full),
+        .data_in,
+        .push_in(load_in && !input_taken_data),
+        .pop_in(keyboard_load),
+        .clear_in(boot_in),
+        .clock
+    );
+
+    FIFO #(
+        .D_WIDTH(8),
+        .A_WIDTH(FIFO_A_WIDTH)
+    ) output_fifo (
+        .data_out,
+        .empty_out(output_empty),
+        .full_out(output_full),
+        .data_in(outr_data_out),
+        .push_in(printer_clear),
+        .pop_in(clear_in && !output_taken_data),
+        .clear_in(boot_in),
+        .clock
+    );
+
+    assign keyboard_load = !boot_in && !fgi_data && !input_empty;
+    assign printer_clear = !boot_in && !fgo_data && !output_full;
+
+    assign input_taken_j = load_in && !input_full;
+    assign input_taken_k = boot_in || !load_in;
+    assign fgi_out = input_taken_data || input_full;
+
+    assign output_taken_j = clear_in && !output_empty;
+    assign output_taken_k = boot_in || !clear_in;
+    assign fgo_out = output_taken_data || output_empty;
+  end else begin : no_fifo
+    assign keyboard_data = data_in;
+    assign keyboard_load = load_in;
+    assign printer_clear = clear_in;
+    assign data_out = outr_data_out;
+    assign fgi_out = fgi_data;
+    assign fgo_out = fgo_data;
+  end
 
   `SOC_FLAG(s)
   assign s_out = s_data;
@@ -159,9 +324,17 @@ module SOC (
   var logic op_complement;
   var logic op_cir;
   var logic op_cil;
+  /* verilator lint_off UNUSEDSIGNAL */  // Unless `ARITHMETIC` is set.
+  var logic op_shl;
+  var logic op_shr;
+  var logic op_asr;
+  var logic op_mul;
+  /* verilator lint_on UNUSEDSIGNAL */
+  var logic alu_carry;
+  var logic [15:0] alu_ac;
   ALU alu (
-      .c_out(carry),
-      .ac_out(ac_data_in),
+      .c_out(alu_carry),
+      .ac_out(alu_ac),
       .ac_in(ac_data_out),
       .dr_in(dr_data_out),
       .inpr_in(inpr_data_out),
@@ -175,77 +348,78 @@ module SOC (
       .op_cil_in(op_cil)
   );
 
+  if (ARITHMETIC) begin : arithmetic
+    var logic au_carry;
+    var logic [15:0] au_ac;
+    var logic [15:0] au_dr;
+    ArithmeticUnit au (
+        .c_out(au_carry),
+        .ac_out(au_ac),
+        .dr_out(au_dr),
+        .ac_in(ac_data_out),
+        .dr_in(dr_data_out),
+        .amount_in(ir_data_out[3:0]),
+        .op_shl_in(op_shl),
+        .op_shr_in(op_shr),
+        .op_asr_in(op_asr),
+        .op_mul_in(op_mul)
+    );
+
+    assign carry = alu_carry || au_carry;
+    assign ac_data_in = alu_ac | au_ac;
+    assign dr_data_in = op_mul ? au_dr : bus_out;
+  end else begin : no_arithmetic
+    assign carry = alu_carry;
+    assign ac_data_in = alu_ac;
+    `SOC_BUS_OUTPUT(dr)
+  end
+
   var logic [15:0] timer;
   var logic sc_clear;
+  var logic sc_load;
   SequenceCounter #(
       .BITS(4)
   ) sc (
       .timer_out(timer),
-      .clear_in (sc_clear),
+      .data_in(4'd2),
+      .load_in(sc_load),
+      .clear_in(sc_clear),
       .clock
   );
 
-  ControlUnit cu (
-      .bus_selector_out(bus_selector_in),
-      .ac_clear_out(ac_clear),
-      .ac_increment_out(ac_increment),
-      .ac_load_out(ac_load),
-      .op_add_out(op_add),
-      .op_and_out(op_and),
-      .op_complement_out(op_complement),
-      .op_dr_out(op_dr),
-      .op_inpr_out(op_inpr),
-      .op_cil_out(op_cil),
-      .op_cir_out(op_cir),
-      .ar_clear_out(ar_clear),
-      .ar_increment_out(ar_increment),
-      .ar_load_out(ar_load),
-      .dr_clear_out(dr_clear),
-      .dr_increment_out(dr_increment),
-      .dr_load_out(dr_load),
-      .e_j_out(e_j),
-      .e_k_out(e_k),
-      .inpr_load_out(inpr_load),
-      .inpr_increment_out(inpr_increment),
-      .inpr_clear_out(inpr_clear),
-      .fgi_j_out(fgi_j),
-      .fgi_k_out(fgi_k),
-      .fgo_j_out(fgo_j),
-      .fgo_k_out(fgo_k),
-      .s_j_out(s_j),
-      .s_k_out(s_k),
-      .ien_j_out(ien_j),
-      .ien_k_out(ien_k),
-      .ir_load_out(ir_load),
-      .ir_increment_out(ir_increment),
-      .ir_clear_out(ir_clear),
-      .mem_read_enable_out(mem_read_enable),
-      .mem_write_enable_out(mem_write_enable),
-      .outr_load_out(outr_load),
-      .outr_increment_out(outr_increment),
-      .outr_clear_out(outr_clear),
-      .pc_clear_out(pc_clear),
-      .pc_increment_out(pc_increment),
-      .pc_load_out(pc_load),
-      .r_j_out(r_j),
-      .r_k_out(r_k),
-      .sc_clear_out(sc_clear),
-      .tr_clear_out(tr_clear),
-      .tr_increment_out(tr_increment),
-      .tr_load_out(tr_load),
-      .instruction_in(ir_data_out),
-      .ac_in(ac_data_out),
-      .dr_in(dr_data_out),
-      .carry_in(carry),
-      .e_in(e_data),
-      .fgi_in(fgi_out),
-      .fgo_in(fgo_out),
-      .ien_in(ien_data),
-      .r_in(r_data),
-      .s_in(s_out),
-      .clear_in,
-      .load_in,
-      .boot_in,
-      .timer_in(timer)
-  );
+  if (PREFETCH) begin : prefetch
+    `SOC_REGISTER(pr, 16)
+    `SOC_BUS_OUTPUT(pr)
+    assign prefetch_data = pr_data_out;
+
+    `SOC_FLAG(pv)
+
+    PrefetchControlUnit #(
+        .ARITHMETIC(ARITHMETIC)
+    ) cu (
+        `SOC_CONTROL_UNIT_PINS,
+        .pv_j_out(pv_j),
+        .pv_k_out(pv_k),
+        .pr_clear_out(pr_clear),
+        .pr_increment_out(pr_increment),
+        .pr_load_out(pr_load),
+        .ir_prefetch_out(ir_prefetch),
+        .mem_pc_address_out(mem_pc_address),
+        .sc_load_out(sc_load),
+        .ar_in(ar_data_out),
+        .pc_in(pc_data_out),
+        .pv_in(pv_data)
+    );
+  end else begin : no_prefetch
+    assign sc_load = '0;
+    assign ir_prefetch = '0;
+    assign mem_pc_address = '0;
+    assign prefetch_data = 'x;
+
+    ControlUnit #(
+        .ARITHMETIC(ARITHMETIC)
+    ) cu (
+        `SOC_CONTROL_UNIT_PINS
+    );
+  end
 endmodule
@@ -2,13 +2,15 @@
 `IMPORT(Register)
 
 /**
- * Register which is always incrementing. Its output is decoded for use in the
- * control unit.
+ * Register which is always incrementing, unless it is cleared or loaded. Its
+ * output is decoded for use in the control unit.
  */
 module SequenceCounter #(
     parameter int BITS = 4
 ) (
     output var logic [2**BITS-1:0] timer_out,
+    input var logic [BITS-1:0] data_in,
+    input var logic load_in,
     input var logic clear_in,
     input var logic clock
 );
@@ -18,8 +20,8 @@ module SequenceCounter #(
       .BITS(BITS)
   ) sc (
       .data_out(data),
-      .data_in('0),
-      .load_in('0),
+      .data_in,
+      .load_in,
       .increment_in('1),
       .clear_in,
       .clock
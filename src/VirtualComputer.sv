@@ -1,7 +1,11 @@
 `include "preamble.sv"
 `timescale 1s / 1ms
 `IMPORT(assembler)
+`ifdef BEHAVIORAL_SOC
+`IMPORT(BehavioralSOC)
+`else
 `IMPORT(SOC)
+`endif
 `IMPORT(VirtualClock)
 `IMPORT(VirtualKeyboard)
 `IMPORT(VirtualPrinter)
@@ -23,6 +27,40 @@
 /**
  * The computer along with I/O and a preloaded assembly program. Not
  * synthesizable.
+ *
+ * If `RUNTIME_PROGRAM` is defined, the program is not assembled at compile
+ * time. Instead, the memory image given by the `+program=<file>` plusarg is
+ * loaded via `$readmemh`, so one compiled simulation can run any program. The
+ * simulation then also stops after the number of cycles given by the
+ * `+limit=<cycles>` plusarg, if any. With the `+cycles` plusarg, the number of
+ * cycles until the halt (or `limit: <cycles>` on reaching the limit) is written
+ * to stderr. With the `+profile=<file>` plusarg, the number of instructions and
+ * cycles spent at each address is written to the file at the end. If `TRACE`
+ * is defined, then with the `+trace=<file>` plusarg, a binary record of every
+ * instruction is written to the file via the `trace` VPI module (see
+ * `tracer.py`), which the simulation must load.
+ *
+ * With the `+snapshot=<file>` plusarg, the state of the computer is saved to
+ * the file at the first instruction starting at or after the cycle given by
+ * `+snapshot_cycle=<cycle>`, or at the first instruction at the address given
+ * by `+snapshot_pc=<address>`, or else at the halt. With the `+restore=<file>`
+ * plusarg, the simulation continues from such a snapshot instead of the boot
+ * state. The devices are not part of the snapshot.
+ *
+ * With the `+idle_skip` plusarg, a loop of `SKI` and a `BUN` back to it, which
+ * only the keyboard can end, does not cost any simulation. While the terminal
+ * has no input, the simulation sleeps until it does. Once the input has ended,
+ * the cycle counter skips whole rounds of the loop up to the limit, so it ends
+ * at the same cycle as it would have otherwise. The skip is off while tracing.
+ *
+ * If `BEHAVIORAL_SOC` is defined, the computer is `BehavioralSOC` instead of
+ * `SOC`, which is faster to simulate. If `PREFETCH` is defined, the computer is
+ * `SOC` with `PrefetchControlUnit`. Its instructions may start at T2 instead of
+ * T0, which the profile, the trace, the snapshot and the idle skip do not
+ * expect. If `IO_FIFO` is defined, the computer is `SOC` with FIFOs between the
+ * devices and `INPR` and `OUTR`, which the snapshot and the idle skip do not
+ * expect either. If `ARITHMETIC` is defined, either computer has the shift and
+ * multiply instructions of the arithmetic extension.
  */
 module VirtualComputer;
   var logic [7:0] data_out;
@@ -35,7 +73,23 @@ module VirtualComputer;
   var logic boot = 0;
   var logic s;
 
-  SOC soc (
+`ifdef BEHAVIORAL_SOC
+  BehavioralSOC #(
+`else
+  SOC #(
+`ifdef PREFETCH
+      .PREFETCH(1),
+`endif
+`ifdef IO_FIFO
+      .IO_FIFO(1),
+`endif
+`endif
+`ifdef ARITHMETIC
+      .ARITHMETIC(1)
+`else
+      .ARITHMETIC(0)
+`endif
+  ) soc (
       .data_out,
       .fgi_out(fgi),
       .fgo_out(fgo),
@@ -73,7 +127,352 @@ module VirtualComputer;
     else $display("M[%h] = %h", address, data);
   endtask
 
+`ifdef RUNTIME_PROGRAM
+  localparam int STDERR = 32'h8000_0002;
+  var string image;
+  var longint cycle = 0;
+  var longint limit = 0;
+  var bit print_cycles;
+
+  initial begin
+    if ($value$plusargs("program=%s", image)) $readmemh(image, soc.mem.content);
+    else if (!$test$plusargs("restore="))
+      $fatal(1, "Missing +program=<file>");
+
+    if (!$value$plusargs("limit=%d", limit)) limit = 0;
+    print_cycles = $test$plusargs("cycles");
+  end
+
+  initial begin
+    @(negedge s);
+    if (print_cycles) $fdisplay(STDERR, "cycles: %0d", cycle - 2);
+  end
+
+  /**
+   * Cycle 0 is the first T0 after the boot pulse, as in `simulator.py`.
+   */
+  always @(posedge clock) begin
+    cycle += 1;
+
+    if (limit > 0 && cycle - 2 >= limit) begin
+      if (print_cycles) $fdisplay(STDERR, "limit: %0d", limit);
+      $display("");
+      $finish(0);
+    end
+  end
+
+  var string profile_file;
+  var bit profiling;
+  var longint profile_instructions[4096];
+  var longint profile_cycles[4096];
+  var longint profile_interrupts = 0;
+  var longint profile_interrupt_cycles = 0;
+  var logic [11:0] profile_pc = 0;
+
+  initial profiling = $value$plusargs("profile=%s", profile_file);
+
+  /**
+   * Attribute every cycle to the address of the instruction being executed,
+   * or to the interrupt cycle. The state is sampled in the middle of a cycle.
+   */
+  always @(negedge clock)
+    if (profiling && s && cycle >= 2)
+      if (soc.r_data) begin
+        if (soc.timer[0]) profile_interrupts += 1;
+        profile_interrupt_cycles += 1;
+      end else begin
+        if (soc.timer[0]) begin
+          profile_pc = soc.pc_data_out;
+          profile_instructions[profile_pc] += 1;
+        end
+
+        profile_cycles[profile_pc] += 1;
+      end
+
+  final
+    if (profiling) begin
+      automatic int fd = $fopen(profile_file, "w");
+
+      for (int i = 0; i < 4096; i++)
+        if (profile_instructions[i] || profile_cycles[i])
+          $fdisplay(fd, "%03h %0d %0d", i, profile_instructions[i],
+                    profile_cycles[i]);
+
+      $fdisplay(fd, "interrupt %0d %0d", profile_interrupts,
+                profile_interrupt_cycles);
+      $fclose(fd);
+    end
+
+  var bit tracing = 0;
+
+`ifdef TRACE
+  localparam int TRACE_E = 1;
+  localparam int TRACE_WRITE = 2;
+  localparam int TRACE_INTERRUPT = 4;
+
+  var string trace_file;
+  var bit trace_pending = 0;
+  var longint trace_cycle;
+  var logic [11:0] trace_pc;
+  var logic [15:0] trace_ir;
+  var logic [11:0] trace_address;
+  var logic [15:0] trace_data;
+  var logic [7:0] trace_flags;
+
+  initial begin
+    tracing = $value$plusargs("trace=%s", trace_file);
+    if (tracing) $trace_open(trace_file);
+  end
+
+  /**
+   * Write the record of the last instruction, which has completed by now, so
+   * `AC` and `E` hold its results.
+   */
+  task static trace_flush;
+    if (trace_pending)
+      $trace_write(trace_cycle, trace_pc, trace_ir, soc.ac_data_out,
+                   trace_address, trace_data,
+                   trace_flags | (soc.e_data ? TRACE_E : 0));
+
+    trace_pending = 0;
+  endtask
+
+  /**
+   * Start a record at every T0, and fill it in during the rest of the
+   * instruction (or the interrupt cycle). The state is sampled in the middle
+   * of a cycle, so a memory write is seen before the clock edge performs it.
+   */
+  always @(negedge clock)
+    if (tracing && s && cycle >= 2) begin
+      if (soc.timer[0]) begin
+        trace_flush();
+        trace_pending = 1;
+        trace_cycle = cycle - 2;
+        trace_pc = soc.pc_data_out;
+        trace_ir = 0;
+        trace_address = 0;
+        trace_data = 0;
+        trace_flags = soc.r_data ? TRACE_INTERRUPT : 0;
+      end
+
+      if (soc.timer[2] && !soc.r_data) trace_ir = soc.ir_data_out;
+
+      if (soc.mem_write_enable) begin
+        trace_address = soc.ar_data_out;
+        trace_data = soc.bus_out;
+        trace_flags |= TRACE_WRITE;
+      end
+    end
+
+  always @(negedge s) if (tracing) trace_flush();
+`else
+  initial
+    if ($test$plusargs("trace="))
+      $fatal(1, "+trace=<file> requires TRACE to be defined");
+`endif
+
+  var string snapshot_file;
+  var string restore_file;
+  var bit snapshotting;
+  var bit snapshot_saved = 0;
+  var longint snapshot_cycle = -1;
+  var longint snapshot_pc = -1;
+
+  task static save_field(input int fd, input string name,
+                         input logic [63:0] value);
+    if (!$isunknown(value)) $fdisplay(fd, "%s %0h", name, value);
+  endtask
+
+  /**
+   * Write every register, flip-flop, the sequence counter, and the memory to
+   * the file, in the format read by `restore_state` and `simulator.py`. Unknown
+   * values are left out.
+   */
+  task static save_state(input string file);
+    automatic int fd = $fopen(file, "w");
+    if (!fd) $fatal(1, "Cannot open %s", file);
+
+    save_field(fd, "cycle", cycle - 2);
+    save_field(fd, "sc", soc.sc.sc.data_out);
+    save_field(fd, "ar", soc.ar.data_out);
+    save_field(fd, "pc", soc.pc.data_out);
+    save_field(fd, "dr", soc.dr.data_out);
+    save_field(fd, "ac", soc.ac.data_out);
+    save_field(fd, "inpr", soc.inpr.data_out);
+    save_field(fd, "ir", soc.ir.data_out);
+    save_field(fd, "tr", soc.tr.data_out);
+    save_field(fd, "outr", soc.outr.data_out);
+    save_field(fd, "e", soc.e.q_out);
+    save_field(fd, "r", soc.r.q_out);
+    save_field(fd, "ien", soc.ien.q_out);
+    save_field(fd, "fgi", soc.fgi.q_out);
+    save_field(fd, "fgo", soc.fgo.q_out);
+    save_field(fd, "s", soc.s.q_out);
+
+    for (int i = 0; i < 4096; i++)
+      if (!$isunknown(soc.mem.content[i]))
+        $fdisplay(fd, "mem %03h %04h", i, soc.mem.content[i]);
+
+    $fclose(fd);
+  endtask
+
+  /**
+   * Force the value onto the storage, then release it. The storage keeps the
+   * value until its next clock edge, without a second procedural driver.
+   */
+  `define _VC_RESTORE_(__VC_TARGET__) \
+    begin                             \
+      force __VC_TARGET__ = value;    \
+      release __VC_TARGET__;          \
+    end
+
+  /**
+   * Load a snapshot written by `save_state`. The memory words missing from it
+   * become unknown.
+   */
+  task static restore_state(input string file);
+    automatic int fd = $fopen(file, "r");
+    var string name;
+    var logic [63:0] value;
+    var logic [11:0] address;
+    if (!fd) $fatal(1, "Cannot open %s", file);
+
+    for (int i = 0; i < 4096; i++) soc.mem.content[i] = 'x;
+
+    while ($fscanf(fd, "%s", name) == 1) begin
+      if (name == "mem") begin
+        if ($fscanf(fd, "%h %h", address, value) != 2)
+          $fatal(1, "%s: Invalid memory word", file);
+
+        soc.mem.content[address] = value[15:0];
+        continue;
+      end
+
+      if ($fscanf(fd, "%h", value) != 1)
+        $fatal(1, "%s: Missing value of %s", file, name);
+
+      case (name)
+        "cycle": cycle = value + 2;
+        "sc": `_VC_RESTORE_(soc.sc.sc.data_out)
+        "ar": `_VC_RESTORE_(soc.ar.data_out)
+        "pc": `_VC_RESTORE_(soc.pc.data_out)
+        "dr": `_VC_RESTORE_(soc.dr.data_out)
+        "ac": `_VC_RESTORE_(soc.ac.data_out)
+        "inpr": `_VC_RESTORE_(soc.inpr.data_out)
+        "ir": `_VC_RESTORE_(soc.ir.data_out)
+        "tr": `_VC_RESTORE_(soc.tr.data_out)
+        "outr": `_VC_RESTORE_(soc.outr.data_out)
+        "e": `_VC_RESTORE_(soc.e.q_out)
+        "r": `_VC_RESTORE_(soc.r.q_out)
+        "ien": `_VC_RESTORE_(soc.ien.q_out)
+        "fgi": `_VC_RESTORE_(soc.fgi.q_out)
+        "fgo": `_VC_RESTORE_(soc.fgo.q_out)
+        "s": `_VC_RESTORE_(soc.s.q_out)
+        default: $fatal(1, "%s: Unknown field %s", file, name);
+      endcase
+    end
+
+    $fclose(fd);
+  endtask
+
+  `undef _VC_RESTORE_
+
+  initial begin
+    snapshotting = $value$plusargs("snapshot=%s", snapshot_file);
+    if (!$value$plusargs("snapshot_cycle=%d", snapshot_cycle))
+      snapshot_cycle = -1;
+
+    if (!$value$plusargs("snapshot_pc=%h", snapshot_pc)) snapshot_pc = -1;
+
+    /*
+     * Restore after the boot pulse, half way between the clock edges, so no
+     * other process sees a mix of the boot and the restored state.
+     */
+    if ($value$plusargs("restore=%s", restore_file)) begin
+      wait (cycle == 2);
+      #0.5 restore_state(restore_file);
+    end
+  end
+
+  /**
+   * Whether the snapshot is due at the start of the current instruction.
+   */
+  function automatic bit snapshot_due;
+    if (snapshot_cycle >= 0) return cycle - 2 >= snapshot_cycle;
+    return snapshot_pc >= 0 && soc.pc_data_out == snapshot_pc;
+  endfunction
+
+  always @(negedge clock)
+    if (snapshotting && !snapshot_saved && s && cycle >= 2)
+      if (soc.timer[0] && !soc.r_data && snapshot_due()) begin
+        save_state(snapshot_file);
+        snapshot_saved = 1;
+      end
+
+  always @(negedge s)
+    if (snapshotting && !snapshot_saved) begin
+      save_state(snapshot_file);
+      snapshot_saved = 1;
+    end
+
+  localparam int SKI = 16'hF200;
+  localparam int SKI_ROUND = 9;
+
+  var bit idle_skip;
+
+  initial idle_skip = $test$plusargs("idle_skip");
+
+  /**
+   * Whether this is the T0 of `SKI` in a loop of it and a `BUN` back to it,
+   * after the first round, so the state is the same at the start of every
+   * round. `FGI` is clear, the printer is idle, and interrupts are disabled, so
+   * only the keyboard can end the loop.
+   */
+  function automatic bit polling_keyboard;
+    automatic logic [11:0] pc = soc.pc_data_out;
+    automatic logic [15:0] jump = {4'h4, pc};
+
+    return soc.timer[0] && !soc.r_data && !soc.fgi_data && soc.fgo_data &&
+        !soc.ien_data && soc.mem.content[pc] == SKI &&
+        soc.mem.content[pc+12'd1] == jump && soc.ir_data_out == jump &&
+        soc.ar_data_out == pc;
+  endfunction
+
+  /**
+   * Advance the cycle counter by as many rounds of the loop as fit before the
+   * limit (or the cycle of the snapshot), leaving the rest to the simulation.
+   * Without a limit, the loop is left to spin as before.
+   */
+  task static skip_rounds;
+    automatic longint target = limit;
+    automatic longint rounds;
+    automatic logic [11:0] pc = soc.pc_data_out;
+
+    if (snapshotting && !snapshot_saved && snapshot_cycle >= 0 &&
+        (target <= 0 || snapshot_cycle < target))
+      target = snapshot_cycle;
+
+    if (target <= 0) return;
+
+    rounds = (target - (cycle - 2) - 1) / SKI_ROUND;
+    if (rounds <= 0) return;
+
+    cycle += rounds * SKI_ROUND;
+
+    if (profiling) begin
+      profile_instructions[pc] += rounds;
+      profile_cycles[pc] += rounds * 4;
+      profile_instructions[pc+12'd1] += rounds;
+      profile_cycles[pc+12'd1] += rounds * 5;
+    end
+  endtask
+
+  always @(negedge clock)
+    if (idle_skip && !tracing && s && cycle >= 2 && polling_keyboard())
+      if (vk.fd != 0 ? vk.exhausted : !$read_char_wait()) skip_rounds();
+`else
   `ASM_DEFINE_PROGRAM_INCLUDE("program.asm.sv")
+`endif
 
   VirtualClock vc (.clock_out(clock));
 
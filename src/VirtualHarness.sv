@@ -0,0 +1,66 @@
+`include "preamble.sv"
+`ifdef BEHAVIORAL_SOC
+`IMPORT(BehavioralSOC)
+`else
+`IMPORT(SOC)
+`endif
+
+/**
+ * The computer with the memory image given by the `+program=<file>` plusarg,
+ * whose clock and I/O are driven by the native harness in `verilator`. See
+ * `VirtualComputer` for the simulated counterpart. Not synthesizable.
+ *
+ * If `BEHAVIORAL_SOC` is defined, the computer is `BehavioralSOC` instead of
+ * `SOC`. If `PREFETCH` is defined, the computer is `SOC` with
+ * `PrefetchControlUnit`. If `IO_FIFO` is defined, the computer is `SOC` with
+ * FIFOs between the devices and `INPR` and `OUTR`. If `ARITHMETIC` is defined,
+ * either computer has the arithmetic extension.
+ */
+module VirtualHarness (
+    output var logic [7:0] data_out,
+    output var logic fgi_out,
+    output var logic fgo_out,
+    output var logic s_out,
+    input var logic [7:0] data_in,
+    input var logic load_in,
+    input var logic clear_in,
+    input var logic boot_in,
+    input var logic clock
+);
+`ifdef BEHAVIORAL_SOC
+  BehavioralSOC #(
+`else
+  SOC #(
+`ifdef PREFETCH
+      .PREFETCH(1),
+`endif
+`ifdef IO_FIFO
+      .IO_FIFO(1),
+`endif
+`endif
+`ifdef ARITHMETIC
+      .ARITHMETIC(1)
+`else
+      .ARITHMETIC(0)
+`endif
+  ) soc (
+      .data_out,
+      .fgi_out,
+      .fgo_out,
+      .s_out,
+      .data_in,
+      .boot_in,
+      .load_in,
+      .clear_in,
+      .clock
+  );
+
+  var string image;
+
+  initial begin
+    if (!$value$plusargs("program=%s", image))
+      $fatal(1, "Missing +program=<file>");
+
+    $readmemh(image, soc.mem.content);
+  end
+endmodule
@@ -2,6 +2,17 @@
 
 /**
  * Read characters from terminal (stdin). Not synthesizable.
+ *
+ * Characters are read from the file given by the `INPUT` define or the
+ * `+input=<file>` plusarg instead, if any. Otherwise, the terminal is only read
+ * while `fgi_in` is clear, so that keystrokes are not lost while it is set.
+ * `exhausted` is set once the end of the file is reached.
+ *
+ * Every character is held at `data_out` with `load_out` set until `fgi_in`
+ * rises. `fgi_in` is `FGI`, which the program clears once it reads the
+ * character, or with the FIFOs of `SOC`, whether the input FIFO is full or has
+ * just taken the character. A burst then moves into the FIFO at a character
+ * every two cycles, without waiting for the program.
  */
 module VirtualKeyboard (
     output var logic [7:0] data_out = 'x,
@@ -9,8 +20,11 @@ module VirtualKeyboard (
     input var logic fgi_in,
     input var logic clock
 );
+  var bit exhausted = 0;
+
   task static queue(input int char);
-    if (char != -1 && !fgi_in) begin
+    if (char == -1) exhausted = 1;
+    else if (!fgi_in) begin
       data_out = 8'(char & 'hff);
 
       load_out = '1;
@@ -20,13 +34,21 @@ module VirtualKeyboard (
   endtask
 
   var int fd = 0;
+  var string file;
 
   initial begin
 `ifdef INPUT
     fd = $fopen(`INPUT, "r");
     forever @(posedge clock) if (!fgi_in) queue($fgetc(fd));
 `else
-    forever @(posedge clock) queue($read_char());
+    if ($value$plusargs("input=%s", file)) begin
+      fd = $fopen(file, "r");
+      if (fd == 0) $fatal(1, "Cannot open %s", file);
+      forever @(posedge clock) if (!fgi_in) queue($fgetc(fd));
+    end else
+      forever
+        @(posedge clock)
+          if (!fgi_in && $read_char_ready()) queue($read_char());
 `endif
   end
 endmodule
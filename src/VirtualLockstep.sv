@@ -0,0 +1,180 @@
+`include "preamble.sv"
+`timescale 1s / 1ms
+`IMPORT(SOC)
+`IMPORT(BehavioralSOC)
+`IMPORT(VirtualClock)
+`IMPORT(VirtualKeyboard)
+`IMPORT(VirtualPrinter)
+
+/**
+ * Compare a signal of both computers.
+ *
+ * @param __VL_PATH__ - hierarchical name inside the computers.
+ */
+`define _VL_CHECK_(__VL_PATH__)                            \
+  if (structural.__VL_PATH__ !== behavioral.__VL_PATH__)   \
+    mismatch(`"__VL_PATH__`", 64'(structural.__VL_PATH__), \
+             64'(behavioral.__VL_PATH__));
+
+/**
+ * `SOC` and `BehavioralSOC` running side by side on the memory image given by
+ * the `+program=<file>` plusarg. Not synthesizable.
+ *
+ * Both computers share the clock and the inputs, and the devices are driven by
+ * `SOC`. In the middle of every cycle after the boot pulse, every register,
+ * flip-flop, the sequence counter, the bus and the memory pins of both are
+ * compared, and the simulation stops at the first difference with a non-zero
+ * exit code. As both start with the same memory and do the same writes, their
+ * memories stay the same too. Every word is also compared at the end, or in
+ * every cycle with the `+full_memory` plusarg, which is much slower.
+ *
+ * The simulation ends at the halt, or after the number of cycles given by the
+ * `+limit=<cycles>` plusarg, if any. The number of cycles compared is then
+ * written to stderr.
+ *
+ * If `ARITHMETIC` is defined, both computers have the arithmetic extension.
+ */
+module VirtualLockstep;
+  localparam int STDERR = 32'h8000_0002;
+
+  var logic [7:0] data_out;
+  var logic [7:0] data_in;
+  var logic fgi;
+  var logic fgo;
+  var logic clear;
+  var logic load;
+  var logic clock;
+  var logic boot = 0;
+  var logic s;
+
+`ifdef ARITHMETIC
+  localparam bit ARITHMETIC = 1;
+`else
+  localparam bit ARITHMETIC = 0;
+`endif
+
+  SOC #(
+      .ARITHMETIC(ARITHMETIC)
+  ) structural (
+      .data_out,
+      .fgi_out(fgi),
+      .fgo_out(fgo),
+      .s_out(s),
+      .data_in,
+      .boot_in(boot),
+      .load_in(load),
+      .clear_in(clear),
+      .clock
+  );
+
+  BehavioralSOC #(
+      .ARITHMETIC(ARITHMETIC)
+  ) behavioral (
+      .data_out(),
+      .fgi_out(),
+      .fgo_out(),
+      .s_out(),
+      .data_in,
+      .boot_in(boot),
+      .load_in(load),
+      .clear_in(clear),
+      .clock
+  );
+
+  var string image;
+  var longint cycle = 0;
+  var longint limit = 0;
+  var bit full_memory;
+
+  initial begin
+    if (!$value$plusargs("program=%s", image))
+      $fatal(1, "Missing +program=<file>");
+
+    $readmemh(image, structural.mem.content);
+    $readmemh(image, behavioral.mem.content);
+
+    if (!$value$plusargs("limit=%d", limit)) limit = 0;
+    full_memory = $test$plusargs("full_memory");
+  end
+
+  initial begin
+    @(posedge clock);
+    boot = 1;
+    @(posedge clock);
+    boot = 0;
+  end
+
+  task static mismatch(input string name, input logic [63:0] expected,
+                       input logic [63:0] actual);
+    $fatal(1, "cycle %0d: %s differs, %0h in SOC and %0h in BehavioralSOC",
+           cycle - 2, name, expected, actual);
+  endtask
+
+  task static check_memory;
+    for (int i = 0; i < 4096; i++)
+      if (structural.mem.content[i] !== behavioral.mem.content[i])
+        $fatal(1, "cycle %0d: M[%h] differs, %h in SOC and %h in BehavioralSOC",
+               cycle - 2, 12'(i), structural.mem.content[i],
+               behavioral.mem.content[i]);
+  endtask
+
+  task static finish;
+    check_memory();
+    $fdisplay(STDERR, "lockstep: %0d cycles", cycle - 2);
+    $display("");
+    $finish(0);
+  endtask
+
+  /**
+   * Cycle 0 is the first T0 after the boot pulse, as in `VirtualComputer`.
+   */
+  always @(posedge clock) begin
+    cycle += 1;
+    if (limit > 0 && cycle - 2 >= limit) finish();
+  end
+
+  always @(negedge clock)
+    if (cycle >= 2) begin
+      `_VL_CHECK_(sc.sc.data_out)
+      `_VL_CHECK_(ar.data_out)
+      `_VL_CHECK_(pc.data_out)
+      `_VL_CHECK_(dr.data_out)
+      `_VL_CHECK_(ac.data_out)
+      `_VL_CHECK_(inpr.data_out)
+      `_VL_CHECK_(ir.data_out)
+      `_VL_CHECK_(tr.data_out)
+      `_VL_CHECK_(outr.data_out)
+      `_VL_CHECK_(e.q_out)
+      `_VL_CHECK_(r.q_out)
+      `_VL_CHECK_(ien.q_out)
+      `_VL_CHECK_(fgi.q_out)
+      `_VL_CHECK_(fgo.q_out)
+      `_VL_CHECK_(s.q_out)
+      `_VL_CHECK_(bus_out)
+      `_VL_CHECK_(mem_write_enable)
+      `_VL_CHECK_(mem_read_enable)
+      if (full_memory) check_memory();
+    end
+
+  initial begin
+    @(negedge s);
+    @(posedge clock);
+    finish();
+  end
+
+  VirtualClock vc (.clock_out(clock));
+
+  VirtualKeyboard vk (
+      .data_out(data_in),
+      .load_out(load),
+      .fgi_in  (fgi),
+      .clock
+  );
+
+  VirtualPrinter vp (
+      .clear_out(clear),
+      .data_in(data_out),
+      .fgo_in(fgo),
+      .clock
+  );
+endmodule
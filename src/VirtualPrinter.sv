@@ -2,19 +2,52 @@
 
 /**
  * Pass characters to the terminal (stdout). Not synthesizable.
+ *
+ * A character is printed whenever `fgo_in` is clear, and `clear_out` is held
+ * until it rises. `fgo_in` is `FGO`, which the program clears by `OUT`, or with
+ * the FIFOs of `SOC`, whether the output FIFO is empty or has just given the
+ * character. A burst then leaves the FIFO at a character every two cycles.
+ *
+ * By default, every character is flushed as soon as it is printed. If the
+ * `BUFFERED_PRINTER` define or the `+buffered_printer` plusarg is given, the
+ * output is only flushed on a newline, after `BUFFER_SIZE` characters, and at
+ * the end of the simulation.
+ *
+ * @param BUFFER_SIZE number of characters after which buffered output is
+ * flushed.
  */
-module VirtualPrinter (
+module VirtualPrinter #(
+    parameter int BUFFER_SIZE = 4096
+) (
     output var logic clear_out = '0,
     input var logic [7:0] data_in,
     input var logic fgo_in,
     input var logic clock
 );
+  var bit buffered = 0;
+  var int count = 0;
+
+  initial begin
+`ifdef BUFFERED_PRINTER
+    buffered = 1;
+`else
+    buffered = $test$plusargs("buffered_printer");
+`endif
+  end
+
+  final $fflush();
+
   initial
     forever
       @(posedge clock)
         if (!fgo_in) begin
           $write("%c", data_in);
-          $fflush();
+          count += 1;
+
+          if (!buffered || data_in == "\n" || count >= BUFFER_SIZE) begin
+            $fflush();
+            count = 0;
+          end
 
           clear_out = '1;
           @(posedge fgo_in);
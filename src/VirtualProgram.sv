@@ -0,0 +1,17 @@
+`include "preamble.sv"
+`IMPORT(assembler)
+
+`undef _ASM_SET_MEMORY_
+/**
+ * Implement set memory from the assembler.
+ */
+`define _ASM_SET_MEMORY_(__ASM_DATA__, __ASM_ADDR__, __ASM_INST__) \
+  $display("@%h %h", __ASM_ADDR__, 16'(__ASM_DATA__));
+
+/**
+ * Print the assembly program in the file given by the `PROGRAM` define as a
+ * memory image which is compatible with `$readmemh`. Not synthesizable.
+ */
+module VirtualProgram;
+  `ASM_DEFINE_PROGRAM_INCLUDE(`PROGRAM)
+endmodule
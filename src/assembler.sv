@@ -160,12 +160,12 @@
  * @param __ASM_VALUE__ - value. It should be a 16 bit integer expression.
  * @param __ASM_LEN__ - length. It should be an integer expression.
  */
-`define ASM_DATA_FILL(__ASM_VALUE__, __ASM_LEN__)                   \
-  `ifdef _ASM_DATA_                                                 \
-    for (int i = 0; i < __ASM_LEN__; i++)                           \
-    `_ASM_SET_MEMORY_({8'b0, __asm_string__[i]}, __asm_addr__++, 0) \
-  `elsif _ASM_INIT_                                                 \
-    __asm_addr__ += 12'(__ASM_LEN__ & 'hfff);                       \
+`define ASM_DATA_FILL(__ASM_VALUE__, __ASM_LEN__)       \
+  `ifdef _ASM_DATA_                                     \
+    for (int i = 0; i < __ASM_LEN__; i++)               \
+    `_ASM_SET_MEMORY_(__ASM_VALUE__, __asm_addr__++, 0) \
+  `elsif _ASM_INIT_                                     \
+    __asm_addr__ += 12'(__ASM_LEN__ & 'hfff);           \
   `endif
 
 /**
@@ -229,6 +229,19 @@
   `define ASM_``__ASM_NAME__                   \ \
     `ASM_DATA({4'o07, 12'(1 << (__ASM_IDX__))}, 1)
 
+/**
+ * Define a extended register instruction with given name and operand. The
+ * resulting expression would have an opcode of 7, an addressing mode of 0, and
+ * the given operand. The macro `ASM_<name>` would insert this instruction at
+ * the current address.
+ *
+ * @param __ASM_NAME__ - name of instruction. It should be a valid identifier.
+ * @param __ASM_OPR__ - operand. It should be a 12 bit integer expression.
+ */
+`define ASM_REG_EXT_INST(__ASM_NAME__, __ASM_OPR__) \
+  `define ASM_``__ASM_NAME__                      \ \
+    `ASM_DATA({4'o07, 12'(__ASM_OPR__)}, 1)
+
 /**
  * Define a I/O instruction with given name and index. The resulting expression
  * would have an opcode of 7, an addressing mode of 1, and an operand of (1 <<
@@ -356,6 +369,64 @@
  */
 `define ASM_ASR `ASM_CLE `ASM_SPA `ASM_CME `ASM_CIR
 
+/**
+ * Logical left shift by the given amount, with the last bit shifted out in E.
+ * Requires the arithmetic extension (`ARITHMETIC`).
+ *
+ * @param __ASM_AMT__ - amount. It should be an integer expression between 0 and
+ * 15.
+ */
+`define ASM_SHL_BY(__ASM_AMT__) `ASM_DATA({4'o17, 8'h00, 4'(__ASM_AMT__)}, 1)
+
+/**
+ * Logical right shift by the given amount, with the last bit shifted out in E.
+ * Requires the arithmetic extension (`ARITHMETIC`).
+ *
+ * @param __ASM_AMT__ - amount. It should be an integer expression between 0 and
+ * 15.
+ */
+`define ASM_SHR_BY(__ASM_AMT__) `ASM_DATA({4'o17, 8'h01, 4'(__ASM_AMT__)}, 1)
+
+/**
+ * Arithmetic right shift by the given amount, with the last bit shifted out in
+ * E. Requires the arithmetic extension (`ARITHMETIC`).
+ *
+ * @param __ASM_AMT__ - amount. It should be an integer expression between 0 and
+ * 15.
+ */
+`define ASM_ASR_BY(__ASM_AMT__) `ASM_DATA({4'o17, 8'h02, 4'(__ASM_AMT__)}, 1)
+
+/**
+ * Multiply AC by the word at the given address. The low word of the product is
+ * put in AC, and the high word in DR. E is set if the high word is not zero.
+ * The instruction takes two words. Requires the arithmetic extension
+ * (`ARITHMETIC`).
+ *
+ * @param __ASM_OPR__ - address. It should be a 12 bit integer expression.
+ */
+`define ASM_MUL_DA(__ASM_OPR__) \
+  `ASM_DATA(16'hf030, 1)        \
+  `ASM_DATA(16'(12'(__ASM_OPR__)))
+
+/**
+ * Like `ASM_MUL_DA`, with the address of the given label.
+ *
+ * @param [__ASM_NAME__] - name of label. It should be a valid identifier. By
+ * default will use the last defined label.
+ */
+`define ASM_MUL_DL(__ASM_NAME__ = `_ASM_LAST_LABEL_) \
+  `ASM_DATA(16'hf030, 1)                             \
+  `ASM_DATA_LABEL(__ASM_NAME__)
+
+/**
+ * Like `ASM_MUL_DA`, with the address of the given sublabel.
+ *
+ * @param __ASM_NAME__ - name of sublabel. It should be a valid identifier.
+ */
+`define ASM_MUL_DS(__ASM_NAME__) \
+  `ASM_DATA(16'hf030, 1)         \
+  `ASM_DATA_SUBLABEL(__ASM_NAME__)
+
 /**
  * Decode an instruction into readable assembly.
  */
@@ -393,6 +464,10 @@ function static string disassemble(input logic [15:0] data);
     'b1111000100000000: $sformat(i, "SKO      ");
     'b1111000010000000: $sformat(i, "ION      ");
     'b1111000001000000: $sformat(i, "IOF      ");
+    'b111100000000????: $sformat(i, "SHL %h    ", data[3:0]);
+    'b111100000001????: $sformat(i, "SHR %h    ", data[3:0]);
+    'b111100000010????: $sformat(i, "ASR %h    ", data[3:0]);
+    'b1111000000110000: $sformat(i, "MUL      ");
     default: $sformat(i, "UNK %b", data);
   endcase
 
@@ -1,22 +1,64 @@
 #!/usr/bin/env python3.12
 from argparse import ArgumentParser, Namespace
 from bdb import BdbQuit
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
 from glob import glob
+from itertools import islice
 from io import TextIOWrapper
-from json import dump, dumps
-from os import PathLike, chdir, close
+from json import dump, dumps, loads
+from os import PathLike, chdir, cpu_count
 from pathlib import Path
 from re import compile
-from shutil import which
-from subprocess import PIPE, Popen, run
-from sys import stdout
-from tempfile import mkstemp
+from shutil import copy, which
+from subprocess import DEVNULL, PIPE, Popen, run
+from sys import stderr, stdin, stdout
+from tempfile import TemporaryDirectory
+from time import perf_counter
 from traceback import print_exception
 from types import TracebackType
 from typing import Iterable, Optional, Type, cast
 
 import sys
 
+from assembler import assemble_file
+from batch import compile_ckl, read_manifest, run_jobs
+from bench import compare, load_results, run_suites, save_results
+from build import BuildCache, DependencyGraph, mktemp, relative
+from formatter import format
+from golden import MODELS
+from netlist import check, format_result, load_netlist
+from profiler import disassemble, format_profile, load_profile, parse_symbols, report
+from simulator import (
+    Keyboard,
+    Machine,
+    Printer,
+    Profile,
+    NEVER,
+    format_stats,
+    load_image,
+    load_snapshot,
+    parse_image,
+    raw_terminal,
+    save_snapshot,
+)
+from synthesis import (
+    Cost,
+    format_costs,
+    netlist_script,
+    parameter_sets,
+    parse_cost,
+    yosys_script,
+)
+from tracer import (
+    TraceWriter,
+    diff_traces,
+    find_cycle,
+    format_record,
+    load_trace,
+    select_records,
+)
+
 try:
     from argcomplete import autocomplete  # type: ignore
 except:
@@ -26,84 +68,12 @@ except:
 
 
 type StrOrBytesPath = str | bytes | PathLike[str] | PathLike[bytes]
-LINE_RE = compile(r"^(.*?)((?:\s+\\)*)$")
-BACKSLASH_RE = compile(r"\\")
-BACKSLASH_STR = " \\"
-DOUBLE_NEWLINE_RE = compile(r"\n(?:\s*?\n)+")
-DOUBLE_NEWLINE_STR = "\n\n"
 MODULE_PATH_RE = compile(r"(?:/|^)[A-Z][^/]+\.sv$")
+CACHE_DIR = Path(".cache")
+CACHE_MAX_SIZE = 256 * 2**20
 ARG_MAX = 4096
 
 
-class FormatterNode(list["FormatterNode | str"]):
-    @staticmethod
-    def _format(
-        child: "FormatterNode | str", custom_width: Optional[int] = None
-    ) -> list[str]:
-        if type(child) is str:
-            return [child]
-
-        assert type(child) is FormatterNode
-        lines = [j for i in child for j in FormatterNode._format(i, custom_width)]
-
-        if custom_width is None:
-            width = max([len(i) for i in lines])
-            lines = [
-                j
-                for i in child
-                for j in FormatterNode._format(i, width - len(BACKSLASH_STR))
-            ]
-        else:
-            width = custom_width
-
-        return [i + " " * (width - len(i)) + BACKSLASH_STR for i in lines]
-
-    def format(self):
-        return "".join([f"{j}\n" for i in self for j in FormatterNode._format(i)])
-
-
-class FormatterTree:
-    def __init__(self) -> None:
-        self.root = FormatterNode()
-        self.stack = [self.root]
-
-    def descend(self):
-        node = FormatterNode()
-        self.stack[-1].append(node)
-        self.stack.append(node)
-
-    def ascend(self):
-        self.stack.pop()
-
-    def to(self, depth: int):
-        assert depth >= 0
-        old_len = len(self.stack)
-        new_len = depth + 1
-
-        if old_len < new_len:
-            for _ in range(old_len, new_len):
-                self.descend()
-        else:
-            for _ in range(old_len, new_len, -1):
-                self.ascend()
-
-    def insert(self, value: str):
-        self.stack[-1].append(value)
-
-
-def format(source: str):
-    tree = FormatterTree()
-
-    for i in source.splitlines():
-        match = LINE_RE.match(i)
-        assert match is not None
-
-        tree.to(len(BACKSLASH_RE.findall(match.group(2))))
-        tree.insert(match.group(1))
-
-    return DOUBLE_NEWLINE_RE.sub(DOUBLE_NEWLINE_STR, tree.root.format())
-
-
 def run_iverilog(
     file: Path,
     *,
@@ -112,6 +82,9 @@ def run_iverilog(
     target_flags: list[str] = [],
     preprocess_only: bool = False,
     input: Optional[Path] = None,
+    defines: dict[str, str] = {},
+    vpi: bool = True,
+    trace: bool = False,
 ):
     args: list[StrOrBytesPath] = [
         "iverilog",
@@ -123,9 +96,12 @@ def run_iverilog(
         file.name,
     ]
 
+    for k, v in defines.items():
+        args.append(f"-D{k}={v}")
+
     if input:
         args.append(f"-DINPUT={dumps(input.absolute().as_posix())}")
-    else:
+    elif vpi:
         args += [
             "-L",
             Path("vpi").absolute().as_posix(),
@@ -133,8 +109,13 @@ def run_iverilog(
             "io",
         ]
 
-    if output is not None:
-        args += ["-o", output.absolute().as_posix()]
+        if trace:
+            args += ["-m", "trace"]
+
+    output_path = output.absolute().as_posix() if output else None
+
+    if output_path is not None:
+        args += ["-o", output_path]
 
     if output_format:
         args.append(f"-t{output_format}")
@@ -145,12 +126,32 @@ def run_iverilog(
     for i in target_flags:
         args.append(f"-p{i}")
 
-    return run(args, cwd=file.parent, check=True)
+    if build_cache is None or (output is None and output_format != "null"):
+        return run(args, cwd=file.parent, check=True)
+
+    sources = [file]
 
+    for v in defines.values():
+        if v.startswith('"') and Path(loads(v)).is_file():
+            sources.append(Path(loads(v)))
 
-def run_vvp(file: Path):
-    args: list[StrOrBytesPath] = [file]
-    return run(args, cwd=file.parent, check=True)
+    key = build_cache.key(sources, [str(i) for i in args if i != output_path])
+    cached = build_cache.get(key, output)
+
+    if cached is None:
+        proc = run(args, cwd=file.parent, capture_output=True, text=True)
+        print(proc.stdout, end="")
+        print(proc.stderr, end="", file=stderr)
+        proc.check_returncode()
+        build_cache.put(key, output, proc.stdout, proc.stderr)
+    else:
+        print(cached[0], end="")
+        print(cached[1], end="", file=stderr)
+
+
+def run_vvp(file: Path, *plusargs: str, capture: bool = False):
+    args: list[StrOrBytesPath] = [file, *plusargs]
+    return run(args, cwd=file.parent, check=True, capture_output=capture, text=True)
 
 
 def run_vscode(
@@ -219,6 +220,57 @@ def run_verilator(file: Path, *, no_multidriven: bool = False):
     run(args, cwd=file.parent, check=True)
 
 
+def run_verilator_build(
+    file: Path, harness: Path, output: Path, *, defines: dict[str, str] = {}
+):
+    top_module = file.stem.split(".", 1)[0]
+    args = [
+        "verilator",
+        "--cc",
+        "--exe",
+        "--build",
+        "-j",
+        "0",
+        "-O3",
+        "--x-assign",
+        "fast",
+        "--x-initial",
+        "fast",
+        "-Wno-fatal",
+        "-Wno-lint",
+        "-Wno-style",
+        "-Wno-MULTIDRIVEN",
+        "+1800-2012ext+sv",
+        "--top-module",
+        top_module,
+        "-CFLAGS",
+        "-O2",
+        "-o",
+        top_module,
+    ]
+
+    for k, v in defines.items():
+        args.append(f"-D{k}={v}")
+
+    key: Optional[str] = None
+
+    if build_cache is not None:
+        key = build_cache.key([file, harness], args)
+
+        if build_cache.get(key, output) is not None:
+            return
+
+    with TemporaryDirectory() as dir:
+        temp_sv = Path(dir, f"{top_module}.sv")
+        run_iverilog(file, output=temp_sv, preprocess_only=True, defines=defines)
+        args += ["--Mdir", dir, temp_sv.name, harness.absolute().as_posix()]
+        run(args, cwd=dir, check=True)
+        copy(Path(dir, top_module), output)
+
+    if build_cache is not None and key is not None:
+        build_cache.put(key, output, "", "")
+
+
 def run_vvp_streaming(file: Path):
     proc = Popen(file, stdout=PIPE)
     assert proc.stdout
@@ -249,6 +301,10 @@ def run_curl(
     return run(args, input=input, check=True)
 
 
+def run_yosys(script: str):
+    return run(["yosys", "-q", "-p", script], check=True)
+
+
 def run_xdg_open(url_or_path: StrOrBytesPath):
     return run(["xdg-open", url_or_path], check=True)
 
@@ -266,12 +322,9 @@ def run_pnpm(*args: str):
     return run(["corepack", "pnpm", *args], cwd=Path("ckl"), check=True)
 
 
-def run_gcc(*args: str):
-    return run(["gcc", *args], check=True)
-
-
-def run_node(program: StrOrBytesPath, *args: str):
-    return run(["node", program, *args], check=True)
+def run_git(*args: str):
+    proc = run(["git", *args], check=True, capture_output=True, text=True)
+    return proc.stdout.splitlines()
 
 
 def formatFile(file: Path):
@@ -301,35 +354,190 @@ def formatFile(file: Path):
         f.write(content)
 
 
-def mktemp(file: Optional[Path], suffix: str):
-    temp = mkstemp(prefix=f"{file.stem}." if file else "", suffix=suffix)
-    close(temp[0])
-    return Path(temp[1])
+@contextmanager
+def program_image(file: Path):
+    if file.suffix == ".hex":
+        yield file.absolute()
+        return
+
+    temp_hex = mktemp(file, ".hex")
+
+    try:
+        with open(temp_hex, "w") as f:
+            f.writelines(f"{i}\n" for i in assemble_file(file).image())
+
+        yield temp_hex
+    finally:
+        temp_hex.unlink()
+
+
+# Parse `--snapshot-at`, which is `halt`, a cycle, or a label of the program,
+# into the cycle or the address at which the snapshot is taken.
+def snapshot_point(at: str, file: Path) -> tuple[Optional[int], Optional[int]]:
+    if at == "halt":
+        return None, None
+
+    if at.isdigit():
+        return int(at), None
+
+    if file.suffix == ".hex":
+        raise ValueError("A memory image has no labels to take a snapshot at")
+
+    labels = assemble_file(file).labels
+
+    if at not in labels:
+        raise ValueError(f"Undefined label '{at}'")
+
+    return None, labels[at]
+
+
+def soc_defines(
+    *,
+    behavioral: bool = False,
+    prefetch: bool = False,
+    fifo: bool = False,
+    arithmetic: bool = False,
+):
+    if behavioral and prefetch:
+        raise ValueError("The behavioral computer does not prefetch")
+
+    if behavioral and fifo:
+        raise ValueError("The behavioral computer has no FIFOs")
+
+    defines: dict[str, str] = {}
+
+    if behavioral:
+        defines["BEHAVIORAL_SOC"] = "1"
+
+    if prefetch:
+        defines["PREFETCH"] = "1"
+
+    if fifo:
+        defines["IO_FIFO"] = "1"
+
+    if arithmetic:
+        defines["ARITHMETIC"] = "1"
+
+    return defines
+
+
+# Compile the computer which loads its program at runtime, for either engine.
+@contextmanager
+def compiled_computer(
+    engine: str,
+    *,
+    behavioral: bool = False,
+    prefetch: bool = False,
+    fifo: bool = False,
+    arithmetic: bool = False,
+    trace: bool = False,
+):
+    temp = mktemp(None, "")
+    defines = soc_defines(
+        behavioral=behavioral, prefetch=prefetch, fifo=fifo, arithmetic=arithmetic
+    )
+
+    if trace:
+        defines["TRACE"] = "1"
+
+    try:
+        if engine == Engine.VERILATOR:
+            run_verilator_build(
+                Path("src/VirtualHarness.sv"),
+                Path("verilator/harness.cpp"),
+                temp,
+                defines=defines,
+            )
+        else:
+            run_iverilog(
+                Path("src/VirtualComputer.sv"),
+                output=temp,
+                defines={"RUNTIME_PROGRAM": "1", **defines},
+                trace=trace,
+            )
+
+        yield temp
+    finally:
+        temp.unlink()
+
+
+def load_program(file: Path):
+    if file.suffix == ".hex":
+        return load_image(file)
+
+    return assemble_file(file).memory
+
+
+def load_program_iverilog(file: Path):
+    temp_vvp = mktemp(file, ".vvp")
+
+    try:
+        run_iverilog(
+            Path("src/VirtualProgram.sv"),
+            output=temp_vvp,
+            defines={"PROGRAM": dumps(file.absolute().as_posix())},
+            vpi=False,
+        )
+        return parse_image(run_vvp(temp_vvp, capture=True).stdout)
+    finally:
+        temp_vvp.unlink()
+
+
+def changed_files(affected: str):
+    files = affected.split(",")
+
+    if all(Path(i).exists() for i in files):
+        return [Path(i) for i in files]
+
+    diff = run_git("diff", "--name-only", affected, "--")
+    untracked = run_git("ls-files", "--others", "--exclude-standard")
+    return [Path(i) for i in diff + untracked]
+
+
+def select_affected(files: list[str], affected: str):
+    paths = [Path(i) for i in files]
+    selected = DependencyGraph().affected(paths, changed_files(affected))
+    return [i.as_posix() for i in selected]
 
 
 class TestFile:
     def __init__(self, file: Path) -> None:
         self.failed = False
         self.path = file
+        self.future: Optional[Future[list[str]]] = None
 
     def is_failed(self):
         return self.failed
 
-    def run(self, temp_file: Path):
-        run_iverilog(self.path, output=temp_file)
-        generator = run_vvp_streaming(temp_file)
+    def start(self, executor: Executor):
+        self.future = executor.submit(lambda: list(self.run_vvp()))
+
+    def run_vvp(self):
+        temp_file = mktemp(self.path, ".vvp")
+
+        try:
+            run_iverilog(self.path, output=temp_file)
+            generator = run_vvp_streaming(temp_file)
 
-        for line in generator:
-            if line.startswith("not ok"):
-                self.failed = True
+            for line in generator:
+                if line.startswith("not ok"):
+                    self.failed = True
 
-            yield line
+                yield line
+        finally:
+            temp_file.unlink()
+
+    def run(self) -> Iterable[str]:
+        if self.future:
+            return self.future.result()
+
+        return self.run_vvp()
 
 
 class TestDirectory:
     def __init__(self, dir: Path, included_files: list[Path]) -> None:
         self.path = dir
-        self.files = [Path(dir, i) for i in glob("*", root_dir=dir)]
+        self.files = [Path(dir, i) for i in sorted(glob("*", root_dir=dir))]
         self.subtests: list[TestDirectory | TestFile] = []
 
         for i in self.files:
@@ -341,13 +549,17 @@ class TestDirectory:
     def is_failed(self) -> bool:
         return any([i.is_failed() for i in self.subtests])
 
-    def run(self, temp_file: Path) -> Iterable[str]:
+    def start(self, executor: Executor):
+        for i in self.subtests:
+            i.start(executor)
+
+    def run(self) -> Iterable[str]:
         yield "TAP version 14"
 
         for i in self.subtests:
             yield f"# Subtest: {i.path}"
 
-            for j in i.run(temp_file):
+            for j in i.run():
                 if not j.startswith("TAP version "):
                     yield "    " + j
 
@@ -388,71 +600,235 @@ class ExceptionAggregator:
 
 
 class Action:
+    ASSEMBLE = "assemble"
+    BATCH = "batch"
+    BENCH = "bench"
+    CACHE = "cache"
     CKL = "ckl"
     COMPILE = "compile"
+    DEPS = "deps"
     FORMAT = "format"
     LINT = "lint"
+    LOCKSTEP = "lockstep"
     MAKE = "make"
     PREPROCESS = "preprocess"
+    PROFILE = "profile"
     REMAINING_TESTS = "remaining-tests"
     RUN = "run"
     SYNTHESIZE = "synthesize"
     TEST = "test"
+    TRACE = "trace"
+    VERIFY = "verify"
+
+
+class CacheAction:
+    CLEAR = "clear"
+    STATS = "stats"
+
+
+class PrinterMode:
+    BUFFERED = "buffered"
+    FLUSH = "flush"
+
+
+class Engine:
+    IVERILOG = "iverilog"
+    PY = "py"
+    VERILATOR = "verilator"
 
 
 class Args(Namespace):
     target_flags: Optional[list[str]]
     action: Optional[str]
+    affected: Optional[str]
+    arithmetic: Optional[bool]
+    baseline: Optional[str]
+    behavioral: Optional[bool]
+    symbols: Optional[str]
+    top: Optional[int]
+    verify: Optional[bool]
+    count: Optional[int]
+    cycle: Optional[int]
+    cycles: Optional[bool]
+    diff: Optional[str]
+    engine: Optional[str]
+    fifo: Optional[bool]
     file: Optional[str]
     files: Optional[list[str]]
+    from_snapshot: Optional[str]
+    full_memory: Optional[bool]
+    idle: Optional[bool]
     input: Optional[str]
+    interrupts: Optional[bool]
+    json: Optional[bool]
+    jobs: Optional[int]
+    limit: Optional[int]
+    netlist: Optional[str]
+    transitive: Optional[bool]
+    no_cache: Optional[bool]
     no_iverilog: Optional[bool]
     no_verible: Optional[bool]
     no_verilator: Optional[bool]
     online: Optional[str]
     vscode: Optional[bool]
     out: Optional[str]
+    parameters: Optional[list[str]]
+    pc: Optional[str]
+    prefetch: Optional[bool]
+    printer: Optional[str]
+    profile_out: Optional[str]
+    repeat: Optional[int]
+    report: Optional[bool]
     reporter: Optional[str]
+    seed: Optional[int]
+    snapshot: Optional[str]
+    snapshot_at: Optional[str]
     sub_action: Optional[str]
+    suites: Optional[list[str]]
+    threshold: Optional[float]
+    trace: Optional[str]
     type: Optional[str]
+    vectors: Optional[int]
     wait: Optional[bool]
+    warmup: Optional[int]
+    write: Optional[str]
 
 
 def parse_args():
     parser = ArgumentParser()
+    parser.add_argument("--no-cache", action="store_true", dest="no_cache")
+    parser.set_defaults(
+        printer=None,
+        behavioral=False,
+        prefetch=False,
+        fifo=False,
+        arithmetic=False,
+        snapshot=None,
+        from_snapshot=None,
+    )
     subparsers = parser.add_subparsers(dest="action", required=True)
 
+    assemble = subparsers.add_parser(Action.ASSEMBLE)
+    batch = subparsers.add_parser(Action.BATCH)
+    bench = subparsers.add_parser(Action.BENCH)
+    cache = subparsers.add_parser(Action.CACHE)
     ckl = subparsers.add_parser(Action.CKL)
     compile = subparsers.add_parser(Action.COMPILE)
+    deps = subparsers.add_parser(Action.DEPS)
     format = subparsers.add_parser(Action.FORMAT)
     lint = subparsers.add_parser(Action.LINT)
+    lockstep = subparsers.add_parser(Action.LOCKSTEP)
     make = subparsers.add_parser(Action.MAKE)
     preprocess = subparsers.add_parser(Action.PREPROCESS)
+    profile = subparsers.add_parser(Action.PROFILE)
     run = subparsers.add_parser(Action.RUN)
     synthesize = subparsers.add_parser(Action.SYNTHESIZE)
     test = subparsers.add_parser(Action.TEST)
+    trace = subparsers.add_parser(Action.TRACE)
+    verify = subparsers.add_parser(Action.VERIFY)
     subparsers.add_parser(Action.REMAINING_TESTS)
 
-    for i in {test, lint, format}:
+    for i in {test, lint, format, deps}:
         i.add_argument("files", nargs="*")
 
-    for i in {synthesize, run, compile, preprocess, ckl}:
+    for i in {test, lint}:
+        i.add_argument("-a", "--affected", metavar="REV_OR_FILES")
+
+    for i in {
+        run,
+        compile,
+        preprocess,
+        ckl,
+        assemble,
+        batch,
+        profile,
+        trace,
+        verify,
+    }:
         i.add_argument("file")
 
-    for i in {compile, preprocess, ckl}:
+    for i in {compile, preprocess, ckl, assemble, batch}:
         i.add_argument("-o", "--out", required=True)
 
-    run.add_argument("--input")
+    for i in {run, batch}:
+        i.add_argument(
+            "-e",
+            "--engine",
+            choices=[Engine.IVERILOG, Engine.PY, Engine.VERILATOR],
+            default=Engine.IVERILOG if i is run else Engine.PY,
+        )
+
+    for i in {run, batch, profile, lockstep}:
+        i.add_argument(
+            "-l", "--limit", type=int, default=10**7 if i is batch else None
+        )
+
+    for i in {run, profile, lockstep}:
+        i.add_argument("--input")
+
+    for i in {run, profile, batch}:
+        i.add_argument("--idle", action="store_true")
+        i.add_argument("--behavioral", action="store_true")
+
+    for i in {run, lockstep, profile, batch}:
+        i.add_argument("--arithmetic", action="store_true")
+
+    for i in {run, profile, batch}:
+        i.add_argument("--prefetch", action="store_true")
+
+    cache.add_argument("sub_action", choices=[CacheAction.STATS, CacheAction.CLEAR])
+    assemble.add_argument("-s", "--symbols")
+    assemble.add_argument("--verify", action="store_true")
+
+    deps.add_argument("-t", "--transitive", action="store_true")
+    run.add_argument("--printer", choices=[PrinterMode.FLUSH, PrinterMode.BUFFERED])
+    run.add_argument("-c", "--cycles", action="store_true")
+    run.add_argument("--fifo", action="store_true")
+    run.add_argument("-t", "--trace")
+    run.add_argument("--snapshot")
+    run.add_argument("--snapshot-at", default="halt", dest="snapshot_at")
+    run.add_argument("--from-snapshot", dest="from_snapshot")
+    trace.add_argument("--cycle", type=int)
+    trace.add_argument("--pc")
+    trace.add_argument("--write")
+    trace.add_argument("--interrupts", action="store_true")
+    trace.add_argument("--diff")
+    trace.add_argument("-n", "--count", type=int, default=20)
+    profile.add_argument(
+        "-e", "--engine", choices=[Engine.IVERILOG, Engine.PY], default=Engine.PY
+    )
+    profile.add_argument("-s", "--symbols")
+    profile.add_argument("-n", "--top", type=int, default=20)
+    profile.add_argument("-o", "--out", dest="profile_out")
     compile.add_argument("-t", "--type")
     compile.add_argument("-p", "--target-flag", nargs="*", dest="target_flags")
     test.add_argument("-r", "--reporter")
+    test.add_argument("-j", "--jobs", type=int, default=1)
+    batch.add_argument("-j", "--jobs", type=int, default=0)
     lint.add_argument("--no-verilator", action="store_true", dest="no_verilator")
     lint.add_argument("--no-iverilog", action="store_true", dest="no_iverilog")
     lint.add_argument("--no-verible", action="store_true", dest="no_verible")
     make.add_argument("files", metavar="targets", nargs="*")
+    lockstep.add_argument("files", nargs="+")
+    lockstep.add_argument("--full-memory", action="store_true", dest="full_memory")
+    bench.add_argument("suites", nargs="*")
+    bench.add_argument("-o", "--out")
+    bench.add_argument("--baseline")
+    bench.add_argument("--threshold", type=float, default=0.25)
+    bench.add_argument("--warmup", type=int, default=1)
+    bench.add_argument("--repeat", type=int, default=5)
+    synthesize.add_argument("files", nargs="+")
     synthesize.add_argument("-o", "--online")
     synthesize.add_argument("-v", "--vscode", action="store_true")
     synthesize.add_argument("-w", "--wait", action="store_true")
+    synthesize.add_argument("-r", "--report", action="store_true")
+    for i in {synthesize, verify}:
+        i.add_argument("-P", "--parameter", action="append", dest="parameters")
+
+    synthesize.add_argument("--json", action="store_true")
+    verify.add_argument("-n", "--vectors", type=int)
+    verify.add_argument("--seed", type=int, default=0)
+    verify.add_argument("--netlist")
 
     autocomplete(parser)
     return cast(Args, parser.parse_args())
@@ -465,7 +841,7 @@ def with_suffix(path: str, ext: str):
 def fix_args(args: Args):
     while True:
         match args.action:
-            case Action.FORMAT | Action.LINT if not args.files:
+            case Action.FORMAT | Action.LINT | Action.DEPS if not args.files:
                 args.files = glob("**/*.sv", recursive=True)
 
             case Action.TEST if not args.files:
@@ -480,11 +856,111 @@ chdir(Path(__file__).parent)
 
 args = parse_args()
 fix_args(args)
+buffered_printer = (
+    args.printer == PrinterMode.BUFFERED if args.printer else not stdout.isatty()
+)
+build_cache = (
+    None
+    if args.no_cache
+    else BuildCache(Path(CACHE_DIR, "build"), max_size=CACHE_MAX_SIZE)
+)
+
+if args.prefetch and (args.snapshot or args.from_snapshot):
+    raise ValueError("Snapshots do not support --prefetch")
+
+if args.fifo and (args.snapshot or args.from_snapshot):
+    raise ValueError("Snapshots do not support --fifo")
+
+if args.behavioral and args.engine == Engine.PY:
+    raise ValueError(
+        "The behavioral computer requires the iverilog or verilator engine"
+    )
 
 match args.action:
-    case Action.SYNTHESIZE:
+    case Action.SYNTHESIZE if args.report:
+        assert args.files
+        costs: list[Cost] = []
+
+        for name in args.files:
+            file = Path(name)
+            top = file.stem.split(".", 1)[0]
+            temp_sv = mktemp(file, ".sv")
+            temp_stat = mktemp(file, ".json")
+            temp_ltp = mktemp(file, ".ltp")
+
+            try:
+                run_iverilog(file, output=temp_sv, preprocess_only=True)
+
+                for parameters in parameter_sets(args.parameters or []):
+                    run_yosys(
+                        yosys_script(
+                            temp_sv.as_posix(),
+                            top,
+                            parameters,
+                            temp_stat.as_posix(),
+                            temp_ltp.as_posix(),
+                        )
+                    )
+                    costs.append(
+                        parse_cost(
+                            top, parameters, temp_stat.read_text(), temp_ltp.read_text()
+                        )
+                    )
+            finally:
+                temp_sv.unlink()
+                temp_stat.unlink()
+                temp_ltp.unlink()
+
+        if args.json:
+            print(dumps([i.as_json() for i in costs], indent=2))
+        else:
+            print(*format_costs(costs), sep="\n")
+
+    case Action.VERIFY:
         assert args.file
+        assert args.seed is not None
         file = Path(args.file)
+        top = file.stem.split(".", 1)[0]
+        differs = False
+
+        if top not in MODELS:
+            raise ValueError(f"No golden model for {top}")
+
+        for parameters in parameter_sets(args.parameters or []):
+            if args.netlist:
+                netlist = load_netlist(Path(args.netlist))
+            else:
+                temp_sv = mktemp(file, ".sv")
+                temp_json = mktemp(file, ".json")
+
+                try:
+                    run_iverilog(file, output=temp_sv, preprocess_only=True)
+                    run_yosys(
+                        netlist_script(
+                            temp_sv.as_posix(), top, parameters, temp_json.as_posix()
+                        )
+                    )
+                    netlist = load_netlist(temp_json)
+                finally:
+                    temp_sv.unlink()
+                    temp_json.unlink()
+
+            result = check(
+                netlist,
+                MODELS[top],
+                {k: int(v) for k, v in parameters.items()},
+                vectors=args.vectors,
+                seed=args.seed,
+            )
+            print(*format_result(netlist, result), sep="\n")
+            differs = differs or bool(result.failures)
+
+        assert not differs, "The netlist differs from the golden model"
+
+    case Action.SYNTHESIZE:
+        assert args.files
+        assert len(args.files) == 1, "Only a report can synthesize several files"
+        file = Path(args.files[0])
 
         temp_sv = mktemp(file, ".sv")
         run_iverilog(file, output=temp_sv, preprocess_only=True)
@@ -536,15 +1012,164 @@ match args.action:
         else:
             print("Synthesized at:", temp_sv)
 
+    case Action.RUN if args.engine == Engine.PY:
+        assert args.file
+        image = load_program(Path(args.file))
+        interactive = not args.input and stdin.isatty()
+
+        with (
+            open(args.input, "rb") if args.input else nullcontext(stdin.buffer) as f,
+            raw_terminal(f) if interactive else nullcontext(),
+            open(args.trace, "wb") if args.trace else nullcontext(None) as t,
+        ):
+            machine = Machine(
+                image,
+                keyboard=Keyboard(f, interactive=interactive),
+                printer=Printer(stdout.buffer, interactive=not buffered_printer),
+                prefetch=bool(args.prefetch),
+                fifo=bool(args.fifo),
+                arithmetic=bool(args.arithmetic),
+            )
+            trace = TraceWriter(t) if t else None
+
+            if args.from_snapshot:
+                machine.restore(load_snapshot(Path(args.from_snapshot)))
+
+            start = perf_counter()
+            snapshot = Path(args.snapshot) if args.snapshot else None
+
+            if snapshot:
+                assert args.snapshot_at
+                cycle, pc = snapshot_point(args.snapshot_at, Path(args.file))
+
+                if cycle is not None or pc is not None:
+                    limit = NEVER if cycle is None else cycle
+                    machine.run(
+                        min(limit, args.limit or NEVER),
+                        stop=pc,
+                        idle=bool(args.idle),
+                        trace=trace,
+                    )
+
+                    if machine.s and (
+                        machine.pc == pc if cycle is None else machine.cycles >= cycle
+                    ):
+                        save_snapshot(snapshot, machine.snapshot())
+                        snapshot = None
+
+            machine.run(args.limit, idle=bool(args.idle), trace=trace)
+            seconds = perf_counter() - start
+
+            if snapshot and not machine.s:
+                save_snapshot(snapshot, machine.snapshot())
+
+        print("")
+
+        if args.cycles:
+            print(*format_stats(machine, seconds=seconds), sep="\n", file=stderr)
+
+    case Action.RUN if args.engine == Engine.VERILATOR or (
+        args.file and not MODULE_PATH_RE.search(args.file)
+    ):
+        assert args.file
+        assert args.engine
+        file = Path(args.file)
+        plusargs: list[str] = []
+
+        if args.input:
+            plusargs.append(f"+input={Path(args.input).absolute().as_posix()}")
+
+        if args.cycles:
+            plusargs.append("+cycles")
+
+        if buffered_printer:
+            plusargs.append("+buffered_printer")
+
+        if args.limit:
+            plusargs.append(f"+limit={args.limit}")
+
+        if args.trace:
+            if args.engine == Engine.VERILATOR:
+                raise ValueError("Tracing requires the iverilog or py engine")
+
+            plusargs.append(f"+trace={Path(args.trace).absolute().as_posix()}")
+
+        if args.snapshot or args.from_snapshot:
+            if args.engine == Engine.VERILATOR:
+                raise ValueError("Snapshots require the iverilog or py engine")
+
+        if args.prefetch and (args.trace or args.idle):
+            raise ValueError(
+                "Tracing and idle skipping with --prefetch require the py engine"
+            )
+
+        if args.fifo and args.idle:
+            raise ValueError("Idle skipping with --fifo requires the py engine")
+
+        if args.idle:
+            if args.engine == Engine.VERILATOR:
+                raise ValueError("Idle skipping requires the iverilog or py engine")
+
+            plusargs.append("+idle_skip")
+
+        if args.snapshot:
+            assert args.snapshot_at
+            cycle, pc = snapshot_point(args.snapshot_at, file)
+            plusargs.append(f"+snapshot={Path(args.snapshot).absolute().as_posix()}")
+
+            if cycle is not None:
+                plusargs.append(f"+snapshot_cycle={cycle}")
+
+            if pc is not None:
+                plusargs.append(f"+snapshot_pc={pc:03x}")
+
+        if args.from_snapshot:
+            restore = Path(args.from_snapshot).absolute().as_posix()
+            plusargs.append(f"+restore={restore}")
+
+        with (
+            compiled_computer(
+                args.engine,
+                behavioral=bool(args.behavioral),
+                prefetch=bool(args.prefetch),
+                fifo=bool(args.fifo),
+                arithmetic=bool(args.arithmetic),
+                trace=bool(args.trace),
+            ) as computer,
+            program_image(file) as image,
+        ):
+            run([computer, f"+program={image.as_posix()}", *plusargs], check=True)
+
     case Action.RUN:
         assert args.file
         file = Path(args.file)
 
+        for option, value in (
+            ("--cycles", args.cycles),
+            ("--limit", args.limit),
+            ("--trace", args.trace),
+            ("--snapshot", args.snapshot),
+            ("--from-snapshot", args.from_snapshot),
+            ("--idle", args.idle),
+        ):
+            if value:
+                raise ValueError(f"Running a module does not support {option}")
+
         temp_sv = mktemp(file, "")
         input = Path(args.input) if args.input else None
-        run_iverilog(file, output=temp_sv, input=input)
+        run_iverilog(
+            file,
+            output=temp_sv,
+            input=input,
+            defines=soc_defines(
+                behavioral=bool(args.behavioral),
+                prefetch=bool(args.prefetch),
+                fifo=bool(args.fifo),
+                arithmetic=bool(args.arithmetic),
+            ),
+        )
 
-        run_vvp(temp_sv)
+        run_vvp(temp_sv, *(["+buffered_printer"] if buffered_printer else []))
         temp_sv.unlink()
 
     case Action.COMPILE:
@@ -583,6 +1208,10 @@ match args.action:
 
     case Action.LINT:
         assert args.files
+
+        if args.affected is not None:
+            args.files = select_affected(args.files, args.affected)
+
         files = [Path(i) for i in args.files if MODULE_PATH_RE.search(i)]
 
         exc_aggregator = ExceptionAggregator()
@@ -605,6 +1234,7 @@ match args.action:
                             content = f.read()
 
                         has_wor = " wor " in content
+                        content = content.replace("$read_char_ready(", "(0")
                         content = content.replace("$read_char(", "(0")
                         content = content.replace(" wor ", " tri ")
 
@@ -625,6 +1255,10 @@ match args.action:
 
     case Action.TEST:
         assert args.files
+
+        if args.affected is not None:
+            args.files = select_affected(args.files, args.affected)
+
         tests = TestDirectory(Path("test"), [Path(i).absolute() for i in args.files])
 
         process = None
@@ -638,8 +1272,14 @@ match args.action:
                 process = Popen(["tap-mocha-reporter", "dot"], stdin=PIPE, text=True)
                 out = process.stdin
 
-        for file in tests.run(mktemp(None, ".vvp")):
-            print(file, file=out, flush=True)
+        jobs = args.jobs or cpu_count() or 1
+
+        with ThreadPoolExecutor(jobs) as executor:
+            if jobs > 1:
+                tests.start(executor)
+
+            for file in tests.run():
+                print(file, file=out, flush=True)
 
         if out:
             out.close()
@@ -666,11 +1306,248 @@ match args.action:
         if not args.files:
             run_pnpm("install")
 
+    case Action.ASSEMBLE:
+        assert args.file
+        assert args.out
+        file = Path(args.file)
+        program = assemble_file(file)
+
+        with open(args.out, "w") as f:
+            f.writelines(f"{i}\n" for i in program.image())
+
+        if args.symbols:
+            with open(args.symbols, "w") as f:
+                f.writelines(f"{i}\n" for i in program.symbols())
+
+        if args.verify:
+            expected = load_program_iverilog(file)
+            assert program.memory == expected, "Output differs from iverilog"
+
+    case Action.DEPS:
+        assert args.files
+        graph = DependencyGraph()
+
+        for file in sorted(relative(Path(i)) for i in args.files):
+            if args.transitive:
+                dependencies = [i for i in graph.closure(file) if i != file]
+            else:
+                dependencies = graph.direct(file, file.parent)
+
+            print(f"{file}:", *dependencies)
+
+    case Action.CACHE:
+        cache = BuildCache(Path(CACHE_DIR, "build"), max_size=CACHE_MAX_SIZE)
+
+        match args.sub_action:
+            case CacheAction.STATS:
+                print(*cache.stats(), sep="\n")
+
+            case CacheAction.CLEAR:
+                cache.clear()
+
+            case _:
+                raise ValueError(f"Unknown cache action: {args.sub_action}")
+
+    case Action.BATCH:
+        assert args.file
+        assert args.out
+        assert args.engine
+        jobs = read_manifest(Path(args.file), limit=args.limit)
+        workers = args.jobs or cpu_count() or 1
+
+        if args.prefetch and args.idle and args.engine != Engine.PY:
+            raise ValueError("Idle skipping with --prefetch requires the py engine")
+
+        with (
+            nullcontext(None)
+            if args.engine == Engine.PY
+            else compiled_computer(
+                args.engine,
+                behavioral=bool(args.behavioral),
+                prefetch=bool(args.prefetch),
+                arithmetic=bool(args.arithmetic),
+            )
+        ) as computer:
+            skipped, counts = run_jobs(
+                jobs,
+                Path(args.out),
+                command=[computer.as_posix()] if computer else None,
+                workers=workers,
+                idle=bool(args.idle),
+                prefetch=bool(args.prefetch),
+                arithmetic=bool(args.arithmetic),
+                progress=stderr,
+            )
+
+        print(
+            f"skipped: {skipped}",
+            *[f"{k}: {v}" for k, v in sorted(counts.items())],
+            sep="\n",
+        )
+        assert not counts.get("fail") and not counts.get("error")
+
+    case Action.LOCKSTEP:
+        assert args.files
+        temp_vvp = mktemp(None, "")
+        plusargs: list[str] = []
+        failed: list[str] = []
+
+        if args.input:
+            plusargs.append(f"+input={Path(args.input).absolute().as_posix()}")
+
+        if args.limit:
+            plusargs.append(f"+limit={args.limit}")
+
+        if args.full_memory:
+            plusargs.append("+full_memory")
+
+        try:
+            run_iverilog(
+                Path("src/VirtualLockstep.sv"),
+                output=temp_vvp,
+                defines=soc_defines(arithmetic=bool(args.arithmetic)),
+            )
+
+            for name in args.files:
+                print(">", name)
+
+                with program_image(Path(name)) as image:
+                    result = run(
+                        [temp_vvp, f"+program={image.as_posix()}", *plusargs],
+                        stdin=DEVNULL,
+                    )
+
+                if result.returncode:
+                    failed.append(name)
+        finally:
+            temp_vvp.unlink()
+
+        assert not failed, f"SOC and BehavioralSOC differ on: {', '.join(failed)}"
+
+    case Action.BENCH:
+        assert args.warmup is not None
+        assert args.repeat
+        assert args.threshold is not None
+        results = run_suites(
+            args.suites or [],
+            warmup=args.warmup,
+            repeat=args.repeat,
+            progress=print,
+        )
+
+        if args.out:
+            save_results(Path(args.out), results)
+
+        if args.baseline:
+            lines, regressed = compare(
+                results, load_results(Path(args.baseline)), threshold=args.threshold
+            )
+            print("", f"Compared with {args.baseline}:", *lines, sep="\n")
+            assert not regressed, f"Regressed: {', '.join(regressed)}"
+
+    case Action.PROFILE:
+        assert args.file
+        assert args.engine
+        file = Path(args.file)
+        image = load_program(file)
+
+        if args.symbols:
+            with open(args.symbols, "r") as f:
+                labels = parse_symbols(f.read())
+        elif file.suffix == ".hex":
+            labels = {}
+        else:
+            labels = assemble_file(file).labels
+
+        if args.engine == Engine.PY:
+            profile_data = Profile()
+
+            with open(args.input, "rb") if args.input else nullcontext(None) as f:
+                machine = Machine(
+                    image,
+                    keyboard=Keyboard(f),
+                    printer=Printer(None),
+                    prefetch=bool(args.prefetch),
+                    arithmetic=bool(args.arithmetic),
+                )
+                machine.run(args.limit, idle=bool(args.idle), profile=profile_data)
+        elif args.prefetch:
+            raise ValueError("Profiling with --prefetch requires the py engine")
+        else:
+            temp_profile = mktemp(file, ".profile")
+            plusargs = [f"+profile={temp_profile.as_posix()}"]
+
+            if args.input:
+                plusargs.append(f"+input={Path(args.input).absolute().as_posix()}")
+
+            if args.limit:
+                plusargs.append(f"+limit={args.limit}")
+
+            if args.idle:
+                plusargs.append("+idle_skip")
+
+            try:
+                with (
+                    compiled_computer(
+                        args.engine,
+                        behavioral=bool(args.behavioral),
+                        arithmetic=bool(args.arithmetic),
+                    ) as computer,
+                    program_image(file) as program,
+                ):
+                    run(
+                        [computer, f"+program={program.as_posix()}"] + plusargs,
+                        stdin=DEVNULL,
+                        stdout=DEVNULL,
+                        check=True,
+                    )
+
+                profile_data = load_profile(temp_profile)
+            finally:
+                temp_profile.unlink()
+
+        if args.profile_out:
+            with open(args.profile_out, "w") as f:
+                f.writelines(f"{i}\n" for i in format_profile(profile_data))
+
+        print(*report(profile_data, image, labels, top=args.top), sep="\n")
+
+    case Action.TRACE:
+        assert args.file
+        assert args.count is not None
+        trace_data = load_trace(Path(args.file))
+        print(f"records: {len(trace_data)}")
+
+        if args.diff:
+            other = load_trace(Path(args.diff))
+            index = diff_traces(trace_data, other)
+
+            if index is not None:
+                print(f"first difference: record {index}")
+
+                for name, i in ((args.file, trace_data), (args.diff, other)):
+                    print(f"{name}:")
+
+                    for j in range(max(index - 2, 0), min(index + 1, len(i))):
+                        print(format_record(i[j], disassemble=disassemble))
+
+            assert index is None, "The traces differ"
+        else:
+            start = 0 if args.cycle is None else find_cycle(trace_data, args.cycle)
+            indices = select_records(
+                trace_data[start:],
+                pc=int(args.pc, 16) if args.pc else None,
+                write=int(args.write, 16) if args.write else None,
+                interrupt=bool(args.interrupts),
+            )
+
+            for i in islice(indices, args.count):
+                print(format_record(trace_data[start + i], disassemble=disassemble))
+
     case Action.CKL:
         assert args.file
         assert args.out
-        run_gcc("-E", "-ffreestanding", "-o", args.out, "-x", "c", args.file)
-        run_node("ckl/index.js", args.out, args.out)
+        compile_ckl(Path(args.file), Path(args.out))
 
     case _:
         raise ValueError(f"Unknown action: {args.action}")
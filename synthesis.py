@@ -0,0 +1,134 @@
+from itertools import product
+from json import loads
+from re import compile
+from typing import Iterable
+
+LTP_RE = compile(r"Longest topological path in \S+ \(length=(\d+)\)")
+FLIP_FLOP_CELLS = ("DFF", "SDFF", "ALDFF", "DLATCH", "SR_")
+
+
+class Cost:
+    def __init__(
+        self,
+        module: str,
+        parameters: dict[str, str],
+        cells: dict[str, int],
+        depth: int,
+    ) -> None:
+        self.module = module
+        self.parameters = parameters
+        self.cells = cells
+        self.depth = depth
+
+    @property
+    def total(self):
+        return sum(self.cells.values())
+
+    @property
+    def flip_flops(self):
+        return sum(
+            count
+            for name, count in self.cells.items()
+            if name.startswith(FLIP_FLOP_CELLS)
+        )
+
+    def as_json(self):
+        return {
+            "module": self.module,
+            "parameters": self.parameters,
+            "cells": self.total,
+            "flip_flops": self.flip_flops,
+            "depth": self.depth,
+            "cells_by_type": self.cells,
+        }
+
+
+# Parse `NAME=VALUE,VALUE,...` options into every combination of the values.
+def parameter_sets(options: Iterable[str]) -> list[dict[str, str]]:
+    names: list[str] = []
+    values: list[list[str]] = []
+
+    for option in options:
+        name, _, value = option.partition("=")
+
+        if not name or not value:
+            raise ValueError(f"Invalid parameter '{option}', expected NAME=VALUE")
+
+        names.append(name)
+        values.append(value.split(","))
+
+    return [dict(zip(names, i)) for i in product(*values)]
+
+
+# Flatten the design into the internal gate library, so that the cells are
+# comparable across modules.
+def synth_commands(source: str, top: str, parameters: dict[str, str]):
+    commands = [f"read_verilog -sv {source}"]
+
+    for name, value in parameters.items():
+        commands.append(f"chparam -set {name} {value} {top}")
+
+    commands.append(f"synth -flatten -top {top}")
+    return commands
+
+
+# `ltp -noff` stops at flip-flops, which leaves the longest combinational path.
+def yosys_script(
+    source: str, top: str, parameters: dict[str, str], stat: str, ltp: str
+):
+    commands = synth_commands(source, top, parameters) + [
+        f"tee -q -o {stat} stat -json",
+        f"tee -q -o {ltp} ltp -noff",
+    ]
+
+    return "; ".join(commands)
+
+
+def netlist_script(source: str, top: str, parameters: dict[str, str], output: str):
+    commands = synth_commands(source, top, parameters) + [f"write_json {output}"]
+    return "; ".join(commands)
+
+
+def parse_cost(module: str, parameters: dict[str, str], stat: str, ltp: str) -> Cost:
+    # The log of `tee` may start with the header of the command.
+    data = loads(stat[stat.index("{") :])
+    design = data.get("design") or next(iter(data["modules"].values()))
+    cells = {
+        name.removeprefix("$_").removesuffix("_"): count
+        for name, count in design.get("num_cells_by_type", {}).items()
+    }
+
+    match = LTP_RE.search(ltp)
+    return Cost(module, parameters, cells, int(match[1]) if match else 0)
+
+
+def format_costs(costs: list[Cost]) -> Iterable[str]:
+    rows = [("module", "parameters", "cells", "flip-flops", "depth", "by type")]
+
+    for cost in costs:
+        rows.append(
+            (
+                cost.module,
+                ",".join(f"{k}={v}" for k, v in cost.parameters.items()) or "-",
+                str(cost.total),
+                str(cost.flip_flops),
+                str(cost.depth),
+                " ".join(
+                    f"{name}:{count}"
+                    for name, count in sorted(
+                        cost.cells.items(), key=lambda i: (-i[1], i[0])
+                    )
+                ),
+            )
+        )
+
+    widths = [max(len(row[i]) for row in rows) for i in range(5)]
+
+    for row in rows:
+        yield "  ".join(
+            [
+                row[i].ljust(widths[i]) if i < 2 else row[i].rjust(widths[i])
+                for i in range(5)
+            ]
+            + [row[5]]
+        )
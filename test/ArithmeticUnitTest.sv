@@ -0,0 +1,53 @@
+`include "preamble.sv"
+`IMPORT(ArithmeticUnit)
+
+module ArithmeticUnitTest;
+  `TAP_IO(40, 33)
+
+  ArithmeticUnit dut (
+      .c_out(tap_out[32]),
+      .dr_out(tap_out[31:16]),
+      .ac_out(tap_out[15:0]),
+      .ac_in(tap_in[15:0]),
+      .dr_in(tap_in[31:16]),
+      .amount_in(tap_in[35:32]),
+      .op_shl_in(tap_in[36]),
+      .op_shr_in(tap_in[37]),
+      .op_asr_in(tap_in[38]),
+      .op_mul_in(tap_in[39])
+  );
+
+  `TAP_BEGIN
+  `TAP_CASE({4'b0000, 4'hx, 16'hxxxx, 16'hxxxx}, {1'b0, 16'h0000, 16'h0000},
+              "Zero output if no operator")
+
+  // shl
+  `TAP_CASE({4'b0001, 4'h4, 16'hxxxx, 16'h1234}, {1'b1, 16'h0000, 16'h2340},
+              "SHL operator")
+  `TAP_CASE({4'b0001, 4'h3, 16'hxxxx, 16'h1234}, {1'b0, 16'h0000, 16'h91a0},
+              "SHL operator without carry out")
+  `TAP_CASE({4'b0001, 4'h0, 16'hxxxx, 16'h9234}, {1'b0, 16'h0000, 16'h9234},
+              "SHL operator by 0")
+
+  // shr
+  `TAP_CASE({4'b0010, 4'h4, 16'hxxxx, 16'h9238}, {1'b1, 16'h0000, 16'h0923},
+              "SHR operator")
+  `TAP_CASE({4'b0010, 4'hf, 16'hxxxx, 16'h8000}, {1'b0, 16'h0000, 16'h0001},
+              "SHR operator by 15")
+
+  // asr
+  `TAP_CASE({4'b0100, 4'h4, 16'hxxxx, 16'h9238}, {1'b1, 16'h0000, 16'hf923},
+              "ASR operator")
+  `TAP_CASE({4'b0100, 4'h4, 16'hxxxx, 16'h1230}, {1'b0, 16'h0000, 16'h0123},
+              "ASR operator on a positive value")
+
+  // mul
+  `TAP_CASE({4'b1000, 4'hx, 16'h0012, 16'h0034}, {1'b0, 16'h0000, 16'h03a8},
+              "MUL operator")
+  `TAP_CASE({4'b1000, 4'hx, 16'h1234, 16'h5678}, {1'b1, 16'h0626, 16'h0060},
+              "MUL operator with a high word")
+  `TAP_CASE({4'b1000, 4'hx, 16'hffff, 16'hffff}, {1'b1, 16'hfffe, 16'h0001},
+              "MUL operator on the largest words")
+
+  `TAP_END
+endmodule
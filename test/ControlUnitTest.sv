@@ -39,6 +39,10 @@ module ControlUnitTest;
   var logic op_inpr_out;
   var logic op_cil_out;
   var logic op_cir_out;
+  var logic op_shl_out;
+  var logic op_shr_out;
+  var logic op_asr_out;
+  var logic op_mul_out;
   var logic outr_clear_out;
   var logic outr_increment_out;
   var logic outr_load_out;
@@ -64,7 +68,7 @@ module ControlUnitTest;
   var logic clear_in;
   var logic [15:0] timer_in;
 
-  var logic [53:0] outputs;
+  var logic [57:0] outputs;
 
   assign outputs = {
     bus_selector_out,
@@ -104,6 +108,10 @@ module ControlUnitTest;
     op_inpr_out,
     op_cil_out,
     op_cir_out,
+    op_shl_out,
+    op_shr_out,
+    op_asr_out,
+    op_mul_out,
     outr_clear_out,
     outr_increment_out,
     outr_load_out,
@@ -116,6 +124,15 @@ module ControlUnitTest;
     tr_load_out
   };
 
+  var logic [7 : 0] arithmetic_bus_selector_out;
+  var logic arithmetic_ac_load_out;
+  var logic arithmetic_ar_load_out;
+  var logic arithmetic_dr_load_out;
+  var logic arithmetic_pc_increment_out;
+  var logic arithmetic_sc_clear_out;
+  var logic arithmetic_op_shr_out;
+  var logic arithmetic_op_mul_out;
+
   var logic [73:0] inputs;
 
   assign inputs = {
@@ -190,6 +207,10 @@ module ControlUnitTest;
       .op_inpr_out,
       .op_cil_out,
       .op_cir_out,
+      .op_shl_out,
+      .op_shr_out,
+      .op_asr_out,
+      .op_mul_out,
       .outr_clear_out,
       .outr_increment_out,
       .outr_load_out,
@@ -216,6 +237,76 @@ module ControlUnitTest;
       .clear_in
   );
 
+  ControlUnit #(
+      .ARITHMETIC(1)
+  ) arithmetic_dut (
+      .bus_selector_out(arithmetic_bus_selector_out),
+      .e_j_out(),
+      .e_k_out(),
+      .fgi_j_out(),
+      .fgi_k_out(),
+      .fgo_j_out(),
+      .fgo_k_out(),
+      .ien_j_out(),
+      .ien_k_out(),
+      .r_j_out(),
+      .r_k_out(),
+      .s_j_out(),
+      .s_k_out(),
+      .ac_clear_out(),
+      .ac_increment_out(),
+      .ac_load_out(arithmetic_ac_load_out),
+      .ar_clear_out(),
+      .ar_increment_out(),
+      .ar_load_out(arithmetic_ar_load_out),
+      .dr_clear_out(),
+      .dr_increment_out(),
+      .dr_load_out(arithmetic_dr_load_out),
+      .inpr_clear_out(),
+      .inpr_increment_out(),
+      .inpr_load_out(),
+      .ir_clear_out(),
+      .ir_increment_out(),
+      .ir_load_out(),
+      .mem_read_enable_out(),
+      .mem_write_enable_out(),
+      .op_add_out(),
+      .op_and_out(),
+      .op_complement_out(),
+      .op_dr_out(),
+      .op_inpr_out(),
+      .op_cil_out(),
+      .op_cir_out(),
+      .op_shl_out(),
+      .op_shr_out(arithmetic_op_shr_out),
+      .op_asr_out(),
+      .op_mul_out(arithmetic_op_mul_out),
+      .outr_clear_out(),
+      .outr_increment_out(),
+      .outr_load_out(),
+      .pc_clear_out(),
+      .pc_increment_out(arithmetic_pc_increment_out),
+      .pc_load_out(),
+      .sc_clear_out(arithmetic_sc_clear_out),
+      .tr_clear_out(),
+      .tr_increment_out(),
+      .tr_load_out(),
+      .instruction_in,
+      .ac_in,
+      .dr_in,
+      .timer_in,
+      .boot_in,
+      .carry_in,
+      .e_in,
+      .fgi_in,
+      .fgo_in,
+      .ien_in,
+      .r_in,
+      .s_in,
+      .load_in,
+      .clear_in
+  );
+
   localparam int NULL = 0;
   localparam int AR = 1;
   localparam int PC = 2;
@@ -251,6 +342,41 @@ module ControlUnitTest;
   `TAP_TEST(r_j_out,
             "!timer_in[0] && !timer_in[1] && !timer_in[2] && ien_in && fgo_in")
 
+  // Input-output without any I/O bit, a no-op without the arithmetic extension
+  `TAP_INIT(clear_inputs(); instruction_in = 16'hf000; timer_in = 1 << 3; #1;)
+  `TAP_TEST(sc_clear_out && !ac_load_out && !ar_load_out && !pc_increment_out,
+            "F000")
+  `TAP_INIT(clear_inputs(); instruction_in = 16'hf013; timer_in = 1 << 3; #1;)
+  `TAP_TEST(sc_clear_out && !op_shr_out && !ac_load_out, "F013")
+  `TAP_INIT(clear_inputs(); instruction_in = 16'hf030; timer_in = 1 << 3; #1;)
+  `TAP_TEST(sc_clear_out && !op_mul_out && !ar_load_out && !pc_increment_out,
+            "F030")
+  `TAP_INIT(clear_inputs(); instruction_in = 16'hf03f; timer_in = 1 << 3; #1;)
+  `TAP_TEST(sc_clear_out && !ac_load_out && !ar_load_out && !pc_increment_out,
+            "F03F")
+
+  // Arithmetic extension
+  `TAP_INIT(clear_inputs(); instruction_in = 16'hf013; timer_in = 1 << 3; #1;)
+  `TAP_TEST(arithmetic_op_shr_out && arithmetic_ac_load_out
+            && arithmetic_sc_clear_out, "SHR n")
+  `TAP_INIT(clear_inputs(); instruction_in = 16'hf010; timer_in = 1 << 3; #1;)
+  `TAP_TEST(!arithmetic_op_shr_out && !arithmetic_ac_load_out
+            && arithmetic_sc_clear_out, "SHR 0")
+  `TAP_INIT(clear_inputs(); instruction_in = 16'hf030; timer_in = 1 << 3; #1;)
+  `TAP_TEST(arithmetic_bus_selector_out[PC] && arithmetic_ar_load_out
+            && arithmetic_pc_increment_out && !arithmetic_sc_clear_out,
+            "MUL && timer_in[3]")
+  `TAP_INIT(clear_inputs(); instruction_in = 16'hf030; timer_in = 1 << 4; #1;)
+  `TAP_TEST(arithmetic_bus_selector_out[MEM] && arithmetic_ar_load_out,
+            "MUL && timer_in[4]")
+  `TAP_INIT(clear_inputs(); instruction_in = 16'hf030; timer_in = 1 << 5; #1;)
+  `TAP_TEST(arithmetic_bus_selector_out[MEM] && arithmetic_dr_load_out,
+            "MUL && timer_in[5]")
+  `TAP_INIT(clear_inputs(); instruction_in = 16'hf030; timer_in = 1 << 6; #1;)
+  `TAP_TEST(arithmetic_op_mul_out && arithmetic_ac_load_out
+            && arithmetic_dr_load_out && arithmetic_sc_clear_out,
+            "MUL && timer_in[6]")
+
   // TODO: Add more tests
   `TAP_END
 endmodule
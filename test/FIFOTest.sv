@@ -0,0 +1,37 @@
+`include "preamble.sv"
+`IMPORT(FIFO)
+`IMPORT(VirtualClock)
+
+module FIFOTest;
+  `TAP_IO(11, 10)
+  `TAP_CLOCK(VirtualClock)
+
+  FIFO #(
+      .D_WIDTH(8),
+      .A_WIDTH(1)
+  ) dut (
+      .data_out(tap_out[7 : 0]),
+      .empty_out(tap_out[8]),
+      .full_out(tap_out[9]),
+      .data_in(tap_in[7 : 0]),
+      .push_in(tap_in[8]),
+      .pop_in(tap_in[9]),
+      .clear_in(tap_in[10]),
+      .clock(tap_clock)
+  );
+
+  `TAP_BEGIN
+  `TAP_CASE_AT_NEGEDGE({3'b100, 8'h00}, {2'b01, 8'hxx}, "clear state")
+  `TAP_CASE_AT_NEGEDGE({3'b001, 8'h41}, {2'b00, 8'h41}, "push")
+  `TAP_CASE_AT_NEGEDGE({3'b001, 8'h42}, {2'b10, 8'h41}, "push until full")
+  `TAP_CASE_AT_NEGEDGE({3'b001, 8'h43}, {2'b10, 8'h41}, "push while full")
+  `TAP_CASE_AT_NEGEDGE({3'b011, 8'h43}, {2'b00, 8'h42},
+                         "push and pop while full")
+  `TAP_CASE_AT_NEGEDGE({3'b010, 8'h00}, {2'b01, 8'h41}, "pop until empty")
+  `TAP_CASE_AT_NEGEDGE({3'b010, 8'h00}, {2'b01, 8'h41}, "pop while empty")
+  `TAP_CASE_AT_NEGEDGE({3'b011, 8'h44}, {2'b00, 8'h44},
+                         "push and pop while empty")
+  `TAP_CASE_AT_NEGEDGE({3'b011, 8'h45}, {2'b00, 8'h45}, "push and pop")
+  `TAP_CASE_AT_NEGEDGE({3'b000, 8'h46}, {2'b00, 8'h45}, "hold state")
+  `TAP_END
+endmodule
@@ -0,0 +1,359 @@
+`include "preamble.sv"
+`IMPORT(PrefetchControlUnit)
+
+module PrefetchControlUnitTest;
+  var logic [7 : 0] bus_selector_out;
+  var logic e_j_out;
+  var logic e_k_out;
+  var logic fgi_j_out;
+  var logic fgi_k_out;
+  var logic fgo_j_out;
+  var logic fgo_k_out;
+  var logic ien_j_out;
+  var logic ien_k_out;
+  var logic pv_j_out;
+  var logic pv_k_out;
+  var logic r_j_out;
+  var logic r_k_out;
+  var logic s_j_out;
+  var logic s_k_out;
+  var logic ac_clear_out;
+  var logic ac_increment_out;
+  var logic ac_load_out;
+  var logic ar_clear_out;
+  var logic ar_increment_out;
+  var logic ar_load_out;
+  var logic dr_clear_out;
+  var logic dr_increment_out;
+  var logic dr_load_out;
+  var logic inpr_clear_out;
+  var logic inpr_increment_out;
+  var logic inpr_load_out;
+  var logic ir_clear_out;
+  var logic ir_increment_out;
+  var logic ir_load_out;
+  var logic ir_prefetch_out;
+  var logic mem_pc_address_out;
+  var logic mem_read_enable_out;
+  var logic mem_write_enable_out;
+  var logic op_add_out;
+  var logic op_and_out;
+  var logic op_complement_out;
+  var logic op_dr_out;
+  var logic op_inpr_out;
+  var logic op_cil_out;
+  var logic op_cir_out;
+  var logic op_shl_out;
+  var logic op_shr_out;
+  var logic op_asr_out;
+  var logic op_mul_out;
+  var logic outr_clear_out;
+  var logic outr_increment_out;
+  var logic outr_load_out;
+  var logic pc_clear_out;
+  var logic pc_increment_out;
+  var logic pc_load_out;
+  var logic pr_clear_out;
+  var logic pr_increment_out;
+  var logic pr_load_out;
+  var logic sc_clear_out;
+  var logic sc_load_out;
+  var logic tr_clear_out;
+  var logic tr_increment_out;
+  var logic tr_load_out;
+  var instruction_t instruction_in;
+  var logic [15:0] ac_in;
+  var logic [15:0] dr_in;
+  var logic [11:0] ar_in;
+  var logic [11:0] pc_in;
+  var logic boot_in;
+  var logic carry_in;
+  var logic e_in;
+  var logic fgi_in;
+  var logic fgo_in;
+  var logic ien_in;
+  var logic pv_in;
+  var logic r_in;
+  var logic s_in;
+  var logic load_in;
+  var logic clear_in;
+  var logic [15:0] timer_in;
+
+  var logic [65:0] outputs;
+
+  assign outputs = {
+    bus_selector_out,
+    e_j_out,
+    e_k_out,
+    fgi_j_out,
+    fgi_k_out,
+    fgo_j_out,
+    fgo_k_out,
+    ien_j_out,
+    ien_k_out,
+    pv_j_out,
+    pv_k_out,
+    r_j_out,
+    r_k_out,
+    s_j_out,
+    s_k_out,
+    ac_clear_out,
+    ac_increment_out,
+    ac_load_out,
+    ar_clear_out,
+    ar_increment_out,
+    ar_load_out,
+    dr_clear_out,
+    dr_increment_out,
+    dr_load_out,
+    inpr_clear_out,
+    inpr_increment_out,
+    inpr_load_out,
+    ir_clear_out,
+    ir_increment_out,
+    ir_load_out,
+    ir_prefetch_out,
+    mem_pc_address_out,
+    mem_read_enable_out,
+    mem_write_enable_out,
+    op_add_out,
+    op_and_out,
+    op_complement_out,
+    op_dr_out,
+    op_inpr_out,
+    op_cil_out,
+    op_cir_out,
+    op_shl_out,
+    op_shr_out,
+    op_asr_out,
+    op_mul_out,
+    outr_clear_out,
+    outr_increment_out,
+    outr_load_out,
+    pc_clear_out,
+    pc_increment_out,
+    pc_load_out,
+    pr_clear_out,
+    pr_increment_out,
+    pr_load_out,
+    sc_clear_out,
+    sc_load_out,
+    tr_clear_out,
+    tr_increment_out,
+    tr_load_out
+  };
+
+  var logic [98:0] inputs;
+
+  assign inputs = {
+    instruction_in,
+    ac_in,
+    dr_in,
+    ar_in,
+    pc_in,
+    boot_in,
+    carry_in,
+    e_in,
+    fgi_in,
+    fgo_in,
+    ien_in,
+    pv_in,
+    r_in,
+    s_in,
+    load_in,
+    clear_in,
+    timer_in
+  };
+
+  task static clear_inputs();
+    instruction_in = 'x;
+    ac_in = 'x;
+    dr_in = 'x;
+    ar_in = 'x;
+    pc_in = 'x;
+    boot_in = '0;
+    carry_in = 'x;
+    e_in = 'x;
+    fgi_in = 'x;
+    fgo_in = 'x;
+    ien_in = 'x;
+    pv_in = 'x;
+    r_in = 'x;
+    s_in = '1;
+    load_in = 'x;
+    clear_in = 'x;
+    timer_in = 'x;
+  endtask
+
+  PrefetchControlUnit dut (
+      .bus_selector_out,
+      .e_j_out,
+      .e_k_out,
+      .fgi_j_out,
+      .fgi_k_out,
+      .fgo_j_out,
+      .fgo_k_out,
+      .ien_j_out,
+      .ien_k_out,
+      .pv_j_out,
+      .pv_k_out,
+      .r_j_out,
+      .r_k_out,
+      .s_j_out,
+      .s_k_out,
+      .ac_clear_out,
+      .ac_increment_out,
+      .ac_load_out,
+      .ar_clear_out,
+      .ar_increment_out,
+      .ar_load_out,
+      .dr_clear_out,
+      .dr_increment_out,
+      .dr_load_out,
+      .inpr_clear_out,
+      .inpr_increment_out,
+      .inpr_load_out,
+      .ir_clear_out,
+      .ir_increment_out,
+      .ir_load_out,
+      .ir_prefetch_out,
+      .mem_pc_address_out,
+      .mem_read_enable_out,
+      .mem_write_enable_out,
+      .op_add_out,
+      .op_and_out,
+      .op_complement_out,
+      .op_dr_out,
+      .op_inpr_out,
+      .op_cil_out,
+      .op_cir_out,
+      .op_shl_out,
+      .op_shr_out,
+      .op_asr_out,
+      .op_mul_out,
+      .outr_clear_out,
+      .outr_increment_out,
+      .outr_load_out,
+      .pc_clear_out,
+      .pc_increment_out,
+      .pc_load_out,
+      .pr_clear_out,
+      .pr_increment_out,
+      .pr_load_out,
+      .sc_clear_out,
+      .sc_load_out,
+      .tr_clear_out,
+      .tr_increment_out,
+      .tr_load_out,
+      .instruction_in,
+      .ac_in,
+      .dr_in,
+      .ar_in,
+      .pc_in,
+      .timer_in,
+      .boot_in,
+      .carry_in,
+      .e_in,
+      .fgi_in,
+      .fgo_in,
+      .ien_in,
+      .pv_in,
+      .r_in,
+      .s_in,
+      .load_in,
+      .clear_in
+  );
+
+  /**
+   * Clear the inputs, then set those of a state of an instruction which is
+   * running without a pending interrupt.
+   */
+  task static execute(input logic [15:0] instruction, input int state);
+    clear_inputs();
+    instruction_in = instruction;
+    timer_in = 1 << state;
+    ac_in = 1;
+    dr_in = 1;
+    e_in = 1;
+    r_in = 0;
+    ien_in = 0;
+    pv_in = 0;
+    ar_in = 1;
+    pc_in = 2;
+  endtask
+
+  localparam int NULL = 0;
+  localparam int AR = 1;
+  localparam int PC = 2;
+  localparam int DR = 3;
+  localparam int AC = 4;
+  localparam int IR = 5;
+  localparam int TR = 6;
+  localparam int MEM = 7;
+
+  `TAP_BEGIN
+  // Fetch
+  `TAP_INIT(execute(16'h0000, 0); #1;)
+  `TAP_TEST(bus_selector_out[PC] && ar_load_out && !sc_load_out,
+            "!r_in && timer_in[0]")
+  `TAP_INIT(execute(16'h0000, 1); #1;)
+  `TAP_TEST(bus_selector_out[MEM] && ir_load_out && !ir_prefetch_out &&
+                pc_increment_out && !mem_pc_address_out,
+            "!r_in && timer_in[1]")
+
+  // Decode
+  `TAP_INIT(execute(16'h0000, 2); #1;)
+  `TAP_TEST(bus_selector_out[IR] && ar_load_out && !pr_load_out,
+            "!r_in && timer_in[2]")
+
+  // Prefetch
+  `TAP_INIT(execute(16'h0000, 3); #1;)
+  `TAP_TEST(bus_selector_out[MEM] && mem_read_enable_out && mem_pc_address_out &&
+                pr_load_out && pv_j_out && !ar_load_out,
+            "prefetch at T3 of a direct instruction")
+  `TAP_INIT(execute(16'h8000, 3); #1;)
+  `TAP_TEST(ar_load_out && !mem_pc_address_out && !pr_load_out,
+            "no prefetch at T3 of an indirect instruction")
+  `TAP_INIT(execute(16'h0000, 3); pv_in = 1; #1;)
+  `TAP_TEST(!mem_read_enable_out && !pr_load_out, "no prefetch when valid")
+
+  // Overlapped fetch
+  `TAP_INIT(execute(16'h0000, 5); pv_in = 1; #1;)
+  `TAP_TEST(ir_load_out && ir_prefetch_out && pc_increment_out && sc_load_out &&
+                !sc_clear_out && !mem_read_enable_out,
+            "AND at T5 loads IR from PR")
+  `TAP_INIT(execute(16'h0000, 5); #1;)
+  `TAP_TEST(bus_selector_out[MEM] && mem_pc_address_out && ir_load_out &&
+                !ir_prefetch_out && sc_load_out && !sc_clear_out,
+            "AND at T5 loads IR from the memory")
+  `TAP_INIT(execute(16'h3000, 4); pv_in = 1; #1;)
+  `TAP_TEST(mem_write_enable_out && ir_prefetch_out && sc_load_out,
+            "STA at T4 loads IR from PR")
+  `TAP_INIT(execute(16'h3000, 4); pv_in = 1; ar_in = 2; #1;)
+  `TAP_TEST(mem_write_enable_out && !ir_load_out && sc_clear_out &&
+                !sc_load_out && pv_k_out,
+            "STA at T4 over the prefetched word")
+  `TAP_INIT(execute(16'h7800, 3); #1;)
+  `TAP_TEST(ac_clear_out && ir_load_out && mem_pc_address_out && sc_load_out,
+            "CLA at T3 loads IR from the memory")
+
+  // No overlapped fetch
+  `TAP_INIT(execute(16'h4000, 4); pv_in = 1; #1;)
+  `TAP_TEST(pc_load_out && !ir_load_out && sc_clear_out && !sc_load_out &&
+                pv_k_out,
+            "BUN at T4")
+  `TAP_INIT(execute(16'h7004, 3); ac_in = 0; #1;)
+  `TAP_TEST(pc_increment_out && !ir_load_out && sc_clear_out && !sc_load_out,
+            "SZA at T3 with a skip")
+  `TAP_INIT(execute(16'h7001, 3); #1;)
+  `TAP_TEST(s_k_out && !ir_load_out && sc_clear_out && !sc_load_out,
+            "HLT at T3")
+  `TAP_INIT(execute(16'h0000, 5); pv_in = 1; ien_in = 1; fgi_in = 1; #1;)
+  `TAP_TEST(r_j_out && !ir_load_out && sc_clear_out && !sc_load_out,
+            "AND at T5 with a pending interrupt")
+
+  // Boot
+  `TAP_INIT(execute(16'h0000, 3); boot_in = 1; #1;)
+  `TAP_TEST(pr_clear_out && pv_k_out && !pv_j_out, "boot_in")
+  `TAP_END
+endmodule
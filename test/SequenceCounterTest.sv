@@ -3,14 +3,16 @@
 `IMPORT(VirtualClock)
 
 module SequenceCounterTest;
-  `TAP_IO(1, 16)
+  `TAP_IO(6, 16)
   `TAP_CLOCK(VirtualClock)
 
   SequenceCounter #(
       .BITS(4)
   ) dut (
       .timer_out(tap_out),
-      .clear_in(tap_in),
+      .data_in(tap_in[4:1]),
+      .load_in(tap_in[5]),
+      .clear_in(tap_in[0]),
       .clock(tap_clock)
   );
 
@@ -38,5 +40,8 @@ module SequenceCounterTest;
   `TAP_CASE_AT_NEGEDGE('0, 1 << 'h1, "reset 1");
   `TAP_CASE_AT_NEGEDGE('1, 1 << 'h0, "reset part 1");
   `TAP_CASE_AT_NEGEDGE('1, 1 << 'h0, "reset part 2");
+  `TAP_CASE_AT_NEGEDGE({1'b1, 4'h2, 1'b0}, 1 << 'h2, "load 2");
+  `TAP_CASE_AT_NEGEDGE('0, 1 << 'h3, "load 3");
+  `TAP_CASE_AT_NEGEDGE({1'b1, 4'h9, 1'b1}, 1 << 'h0, "clear over load");
   `TAP_END
 endmodule
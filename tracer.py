@@ -0,0 +1,170 @@
+from bisect import bisect_right
+from pathlib import Path
+from struct import Struct
+from typing import TYPE_CHECKING, BinaryIO, Callable, Iterable, Optional
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+if TYPE_CHECKING:
+    import numpy
+    import numpy.typing as npt
+
+# The format written by `vpi/trace.c`, which documents the fields.
+MAGIC = b"MANOTRC\0"
+VERSION = 1
+HEADER = Struct("<8sII")
+RECORD = Struct("<QHHHHHBx")
+
+E = 1
+WRITE = 2
+INTERRUPT = 4
+
+# Number of records which are buffered before they are written, or compared at
+# once, so that a trace never has to fit in memory.
+CHUNK_SIZE = 1 << 16
+
+
+class TraceWriter:
+    def __init__(self, stream: BinaryIO) -> None:
+        self.stream = stream
+        self.buffer = bytearray(RECORD.size * CHUNK_SIZE)
+        self.offset = 0
+        stream.write(HEADER.pack(MAGIC, VERSION, RECORD.size))
+
+    def write(
+        self, cycle: int, pc: int, ir: int, ac: int, address: int, data: int, flags: int
+    ):
+        RECORD.pack_into(
+            self.buffer, self.offset, cycle, pc, ir, ac, address, data, flags
+        )
+        self.offset += RECORD.size
+
+        if self.offset == len(self.buffer):
+            self.flush()
+
+    def flush(self):
+        self.stream.write(memoryview(self.buffer)[: self.offset])
+        self.offset = 0
+
+
+def require_numpy():
+    assert np is not None, "numpy is required to read traces"
+    return np
+
+
+def record_dtype():
+    np = require_numpy()
+    return np.dtype(
+        [
+            ("cycle", "<u8"),
+            ("pc", "<u2"),
+            ("ir", "<u2"),
+            ("ac", "<u2"),
+            ("address", "<u2"),
+            ("data", "<u2"),
+            ("flags", "u1"),
+            ("reserved", "u1"),
+        ]
+    )
+
+
+# Map the trace as a structured array. Nothing is read until it is accessed.
+def load_trace(file: Path) -> "npt.NDArray[numpy.void]":
+    np = require_numpy()
+
+    with open(file, "rb") as f:
+        magic, version, size = HEADER.unpack(f.read(HEADER.size))
+
+    if magic != MAGIC or version != VERSION or size != RECORD.size:
+        raise ValueError(f"{file}: Not a version {VERSION} trace")
+
+    dtype = record_dtype()
+    count = (file.stat().st_size - HEADER.size) // size
+
+    if not count:
+        return np.zeros(0, dtype)
+
+    return np.memmap(file, dtype, "r", offset=HEADER.size, shape=(count,))
+
+
+# Index of the record of the instruction executing at the given cycle, found by
+# bisecting the cycles in place.
+def find_cycle(trace: "npt.NDArray[numpy.void]", cycle: int):
+    return max(bisect_right(trace["cycle"], cycle) - 1, 0)
+
+
+# Indices of the records matching every given condition, in chunks.
+def select_records(
+    trace: "npt.NDArray[numpy.void]",
+    *,
+    pc: Optional[int] = None,
+    write: Optional[int] = None,
+    opcode: Optional[int] = None,
+    interrupt: bool = False,
+) -> Iterable[int]:
+    np = require_numpy()
+
+    for start in range(0, len(trace), CHUNK_SIZE):
+        chunk = trace[start : start + CHUNK_SIZE]
+        mask = np.ones(len(chunk), bool)
+
+        if pc is not None:
+            mask &= chunk["pc"] == pc
+
+        if write is not None:
+            mask &= (chunk["flags"] & WRITE != 0) & (chunk["address"] == write)
+
+        if opcode is not None:
+            mask &= (chunk["ir"] >> 12) & 7 == opcode
+
+        if interrupt:
+            mask &= chunk["flags"] & INTERRUPT != 0
+
+        for i in np.flatnonzero(mask):
+            yield start + int(i)
+
+
+# Index of the first record which differs between the traces (or at which one
+# of them ends), or None if they are identical.
+def diff_traces(a: "npt.NDArray[numpy.void]", b: "npt.NDArray[numpy.void]"):
+    np = require_numpy()
+    length = min(len(a), len(b))
+
+    for start in range(0, length, CHUNK_SIZE):
+        end = min(start + CHUNK_SIZE, length)
+        differs = np.flatnonzero(a[start:end] != b[start:end])
+
+        if len(differs):
+            return start + int(differs[0])
+
+    return None if len(a) == len(b) else length
+
+
+def format_record(
+    record: "numpy.void", *, disassemble: Optional[Callable[[int], str]] = None
+):
+    flags = int(record["flags"])
+    text = (
+        f"{int(record['cycle']):>10}  {int(record['pc']):03x}"
+        f"  {int(record['ir']):04x}  AC={int(record['ac']):04x}"
+        f"  E={flags & E}"
+    )
+
+    if flags & WRITE:
+        text += f"  M[{int(record['address']):03x}]={int(record['data']):04x}"
+
+    if flags & INTERRUPT:
+        text += "  interrupt"
+    elif disassemble:
+        ir = int(record["ir"])
+
+        if (ir >> 12) & 7 == 7:
+            text += f"  ; {disassemble(ir)}"
+        else:
+            indirect = " I" if ir & 0x8000 else ""
+            text += f"  ; {disassemble(ir & 0x7FFF)} {ir & 0xFFF:03x}{indirect}"
+
+    return text
@@ -0,0 +1,165 @@
+#include <poll.h>
+#include <stdint.h>
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <termios.h>
+#include <unistd.h>
+
+#include <memory>
+#include <string>
+
+#include "VVirtualHarness.h"
+#include "verilated.h"
+
+// Native replacement of `VirtualClock`, `VirtualKeyboard` and `VirtualPrinter`
+// around `VirtualHarness`. Every iteration of the main loop is one clock cycle.
+// The inputs are changed right after the positive edge, like the blocking
+// assignments in `VirtualComputer`.
+
+static FILE *input = stdin;
+static bool interactive = false;
+static struct termios old_io;
+
+static int read_char(void) {
+  if (!interactive) return fgetc(input);
+
+  struct pollfd fd = {STDIN_FILENO, POLLIN, 0};
+  unsigned char c;
+
+  if (poll(&fd, 1, 0) <= 0 || read(STDIN_FILENO, &c, 1) != 1) return -1;
+
+  return c;
+}
+
+static void on_start(void) {
+  struct termios io;
+  tcgetattr(STDIN_FILENO, &old_io);
+  io = old_io;
+  io.c_lflag &= ~(ICANON | ECHO);
+
+  tcsetattr(STDIN_FILENO, TCSANOW, &io);
+}
+
+static void on_end(void) { tcsetattr(STDIN_FILENO, TCSANOW, &old_io); }
+
+int main(int argc, char **argv) {
+  auto context = std::make_unique<VerilatedContext>();
+  context->commandArgs(argc, argv);
+  auto top = std::make_unique<VVirtualHarness>(context.get());
+
+  // `commandArgsPlusMatch` reuses one buffer, so every match is copied.
+  std::string input_arg = context->commandArgsPlusMatch("input=");
+  bool print_cycles = *context->commandArgsPlusMatch("cycles");
+  std::string limit_arg = context->commandArgsPlusMatch("limit=");
+  uint64_t limit = 0;
+
+  if (!limit_arg.empty())
+    limit = strtoull(limit_arg.c_str() + strlen("+limit="), NULL, 10);
+
+  if (!input_arg.empty()) {
+    const char *file = input_arg.c_str() + strlen("+input=");
+    input = fopen(file, "rb");
+
+    if (!input) {
+      fprintf(stderr, "Cannot open %s\n", file);
+      return 1;
+    }
+  } else {
+    interactive = isatty(STDIN_FILENO);
+  }
+
+  static char buffer[1 << 16];
+
+  if (isatty(STDOUT_FILENO))
+    setvbuf(stdout, NULL, _IONBF, 0);
+  else
+    setvbuf(stdout, buffer, _IOFBF, sizeof(buffer));
+
+  if (interactive) on_start();
+
+  top->clock = 0;
+  top->boot_in = 0;
+  top->load_in = 0;
+  top->clear_in = 0;
+  top->data_in = 0;
+  top->eval();
+
+  uint64_t cycle = 0;
+  uint64_t halted_at = 0;
+  bool loading = false;
+  bool clearing = false;
+  bool fgi = top->fgi_out;
+  bool fgo = top->fgo_out;
+  bool s = top->s_out;
+
+  while (!context->gotFinish()) {
+    top->clock = 1;
+    top->eval();
+    cycle++;
+
+    // `VirtualComputer` stops at the first positive edge after `s` is cleared.
+    if (halted_at) break;
+
+    if (limit && cycle >= limit + 2) break;
+
+    if (s && !top->s_out) halted_at = cycle;
+
+    // The boot pulse covers the second positive edge.
+    if (cycle == 1)
+      top->boot_in = 1;
+    else if (cycle == 2)
+      top->boot_in = 0;
+
+    // `FGI` and `FGO` are unknown until the boot pulse, which `VirtualKeyboard`
+    // and `VirtualPrinter` do not act upon, but they start at 0 here.
+    bool booted = cycle >= 2;
+
+    if (loading) {
+      if (!fgi && top->fgi_out) {
+        top->load_in = 0;
+        loading = false;
+      }
+    } else if (booted && !top->fgi_out) {
+      int c = read_char();
+
+      if (c != EOF) {
+        top->data_in = c & 0xff;
+        top->load_in = 1;
+        loading = true;
+      }
+    }
+
+    if (clearing) {
+      if (!fgo && top->fgo_out) {
+        top->clear_in = 0;
+        clearing = false;
+      }
+    } else if (booted && !top->fgo_out) {
+      putchar(top->data_out);
+      top->clear_in = 1;
+      clearing = true;
+    }
+
+    fgi = top->fgi_out;
+    fgo = top->fgo_out;
+    s = top->s_out;
+
+    top->clock = 0;
+    top->eval();
+  }
+
+  putchar('\n');
+  fflush(stdout);
+  top->final();
+
+  if (interactive) on_end();
+
+  // Cycle 0 is the first T0 after the boot pulse, as in `simulator.py`.
+  if (print_cycles && halted_at)
+    fprintf(stderr, "cycles: %llu\n", (unsigned long long)(halted_at - 2));
+  else if (print_cycles)
+    fprintf(stderr, "limit: %llu\n", (unsigned long long)limit);
+
+  return 0;
+}
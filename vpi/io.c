@@ -7,7 +7,7 @@
 #include <conio.h>
 #include <windows.h>
 #else
-#include <sys/ioctl.h>
+#include <poll.h>
 #include <termios.h>
 #include <unistd.h>
 #endif
@@ -16,21 +16,100 @@
 #include "sv_vpi_user.h"
 #include "vpi_user.h"
 
-static int read_char(void) {
-  int c;
+#define BUFFER_SIZE 4096
+#define DEFAULT_INTERVAL 64
+
+/*
+ * Keyboard input is read in bulk into a ring buffer, and `$read_char` is served
+ * from it. While the buffer is empty, stdin is only checked on every
+ * `interval`-th call, so an idle keyboard does not cost a syscall every cycle.
+ * The interval can be changed via the `+read_char_interval=<calls>` plusarg.
+ */
+static unsigned char buffer[BUFFER_SIZE];
+static size_t head = 0;
+static size_t tail = 0;
+static unsigned interval = DEFAULT_INTERVAL;
+static unsigned countdown = 0;
+static int eof = 0;
+
+static size_t buffered(void) { return (tail - head) % BUFFER_SIZE; }
+
+static void fill(void) {
+  if (eof || buffered() || countdown--) return;
+
+  countdown = interval - 1;
+
+#ifdef _WIN32
+  while (_kbhit() && buffered() < BUFFER_SIZE - 1) {
+    buffer[tail] = _getch();
+    tail = (tail + 1) % BUFFER_SIZE;
+  }
+#else
+  struct pollfd fd = {STDIN_FILENO, POLLIN, 0};
+
+  if (poll(&fd, 1, 0) <= 0) return;
+
+  /* The buffer is empty here, so it can be filled from the start. */
+  ssize_t n = read(STDIN_FILENO, buffer, BUFFER_SIZE - 1);
+  head = 0;
+  tail = n > 0 ? n : 0;
+
+  /* A pipe or a file has ended. A TTY never ends in non-canonical mode. */
+  if (n == 0) eof = 1;
+#endif
+}
+
+static int read_char_ready(void) {
+  fill();
+  return buffered() > 0;
+}
 
+/*
+ * Block until a character is available, and return whether there is one. It
+ * only returns 0 once the input has ended.
+ */
+static int read_char_wait(void) {
+  while (!eof && !buffered()) {
 #ifdef _WIN32
-  c = _kbhit() ? _getch() : -1;
+    if (!_kbhit()) Sleep(10);
 #else
-  int bytesWaiting;
-  ioctl(0, FIONREAD, &bytesWaiting);
-  c = bytesWaiting > 0 ? getchar() : -1;
+    struct pollfd fd = {STDIN_FILENO, POLLIN, 0};
+    poll(&fd, 1, -1);
 #endif
 
+    countdown = 0;
+    fill();
+  }
+
+  return buffered() > 0;
+}
+
+static int read_char(void) {
+  if (!read_char_ready()) return -1;
+
+  int c = buffer[head];
+  head = (head + 1) % BUFFER_SIZE;
   return c;
 }
 
+static void read_interval(void) {
+  s_vpi_vlog_info info;
+
+  if (!vpi_get_vlog_info(&info)) return;
+
+  for (int i = 0; i < info.argc; i++) {
+    const char *prefix = "+read_char_interval=";
+
+    if (!strncmp(info.argv[i], prefix, strlen(prefix))) {
+      int value = atoi(info.argv[i] + strlen(prefix));
+      interval = value > 0 ? value : 1;
+    }
+  }
+}
+
 void on_start(void) {
+  read_interval();
+
 #ifdef _WIN32
   HANDLE hStdin = GetStdHandle(STD_INPUT_HANDLE);
   DWORD mode = 0;
@@ -60,20 +139,28 @@ void on_end(void) {
 #endif
 }
 
-static int read_char_calltf(char *user_data) {
+static int put_int(int value) {
   vpiHandle callh = vpi_handle(vpiSysTfCall, NULL);
 
-  int c = read_char();
-
   s_vpi_value val;
   val.format = vpiIntVal;
-  val.value.integer = c;
+  val.value.integer = value;
 
   vpi_put_value(callh, &val, NULL, vpiNoDelay);
 
   return 0;
 }
 
+static int read_char_calltf(char *user_data) { return put_int(read_char()); }
+
+static int read_char_ready_calltf(char *user_data) {
+  return put_int(read_char_ready());
+}
+
+static int read_char_wait_calltf(char *user_data) {
+  return put_int(read_char_wait());
+}
+
 static int on_start_calltf(struct t_cb_data *user_data) {
   on_start();
   return 0;
@@ -93,6 +180,24 @@ void register_read_char(void) {
   vpi_register_systf(&data);
 }
 
+void register_read_char_ready(void) {
+  s_vpi_systf_data data = {
+      vpiSysFunc, vpiIntFunc, "$read_char_ready", read_char_ready_calltf,
+      NULL,       NULL,       "$read_char_ready",
+  };
+
+  vpi_register_systf(&data);
+}
+
+void register_read_char_wait(void) {
+  s_vpi_systf_data data = {
+      vpiSysFunc, vpiIntFunc, "$read_char_wait", read_char_wait_calltf,
+      NULL,       NULL,       "$read_char_wait",
+  };
+
+  vpi_register_systf(&data);
+}
+
 void register_on_start(void) {
   s_cb_data cb = {
       cbStartOfSimulation, on_start_calltf, NULL, NULL, NULL, 0, NULL,
@@ -111,6 +216,8 @@ void register_on_end(void) {
 
 void (*vlog_startup_routines[])(void) = {
     register_read_char,
+    register_read_char_ready,
+    register_read_char_wait,
     register_on_start,
     register_on_end,
     NULL,
@@ -0,0 +1,171 @@
+#include <stdint.h>
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+
+#define VPI_COMPATIBILITY_VERSION_1800v2012 1
+#include "sv_vpi_user.h"
+#include "vpi_user.h"
+
+#define BUFFER_SIZE (1 << 20)
+#define VERSION 1
+
+/*
+ * Every record is little-endian and `RECORD_SIZE` bytes long:
+ *
+ * | offset | size | field                                 |
+ * |--------|------|---------------------------------------|
+ * | 0      | 8    | cycle at which the instruction starts |
+ * | 8      | 2    | PC of the instruction                 |
+ * | 10     | 2    | IR                                    |
+ * | 12     | 2    | AC after the instruction              |
+ * | 14     | 2    | address of the memory write           |
+ * | 16     | 2    | data of the memory write              |
+ * | 18     | 1    | flags (E, memory write, interrupt)    |
+ * | 19     | 1    | reserved                              |
+ *
+ * The file starts with a header of the magic, the version and the record size.
+ * `tracer.py` reads it back.
+ */
+#define RECORD_SIZE 20
+#define HEADER_SIZE 16
+static const char magic[8] = "MANOTRC";
+
+static FILE *file = NULL;
+static unsigned char buffer[BUFFER_SIZE];
+static size_t length = 0;
+
+static void put(unsigned char *p, uint64_t value, int bytes) {
+  for (int i = 0; i < bytes; i++) p[i] = (value >> (8 * i)) & 0xFF;
+}
+
+static void flush(void) {
+  if (file && length) fwrite(buffer, 1, length, file);
+  length = 0;
+}
+
+static void close_trace(void) {
+  flush();
+  if (file) fclose(file);
+  file = NULL;
+}
+
+static uint64_t get_value(vpiHandle arg) {
+  s_vpi_value val;
+  val.format = vpiVectorVal;
+  vpi_get_value(arg, &val);
+
+  uint64_t value = (uint32_t)val.value.vector[0].aval;
+
+  if (vpi_get(vpiSize, arg) > 32)
+    value |= (uint64_t)(uint32_t)val.value.vector[1].aval << 32;
+
+  return value;
+}
+
+static int trace_open_calltf(char *user_data) {
+  vpiHandle callh = vpi_handle(vpiSysTfCall, NULL);
+  vpiHandle args = vpi_iterate(vpiArgument, callh);
+  vpiHandle arg = args ? vpi_scan(args) : NULL;
+
+  if (!arg) {
+    vpi_printf("$trace_open: Missing file name\n");
+    vpi_control(vpiFinish, 1);
+    return 0;
+  }
+
+  s_vpi_value val;
+  val.format = vpiStringVal;
+  vpi_get_value(arg, &val);
+  vpi_free_object(args);
+
+  close_trace();
+  file = fopen(val.value.str, "wb");
+
+  if (!file) {
+    vpi_printf("$trace_open: Cannot open %s\n", val.value.str);
+    vpi_control(vpiFinish, 1);
+    return 0;
+  }
+
+  unsigned char header[HEADER_SIZE];
+  memcpy(header, magic, sizeof(magic));
+  put(header + 8, VERSION, 4);
+  put(header + 12, RECORD_SIZE, 4);
+  fwrite(header, 1, HEADER_SIZE, file);
+  return 0;
+}
+
+/*
+ * `$trace_write(cycle, pc, ir, ac, address, data, flags)` appends a record to
+ * the buffer, which is only written to the file once it is full.
+ */
+static int trace_write_calltf(char *user_data) {
+  if (!file) return 0;
+
+  vpiHandle callh = vpi_handle(vpiSysTfCall, NULL);
+  vpiHandle args = vpi_iterate(vpiArgument, callh);
+
+  if (!args) return 0;
+
+  uint64_t values[7] = {0};
+  vpiHandle arg = NULL;
+
+  for (int i = 0; i < 7 && (arg = vpi_scan(args)); i++)
+    values[i] = get_value(arg);
+
+  /* The iterator is only freed by `vpi_scan` once it is exhausted. */
+  if (arg) vpi_free_object(args);
+
+  if (length + RECORD_SIZE > BUFFER_SIZE) flush();
+
+  unsigned char *p = buffer + length;
+  put(p, values[0], 8);
+  put(p + 8, values[1], 2);
+  put(p + 10, values[2], 2);
+  put(p + 12, values[3], 2);
+  put(p + 14, values[4], 2);
+  put(p + 16, values[5], 2);
+  put(p + 18, values[6], 1);
+  p[19] = 0;
+  length += RECORD_SIZE;
+  return 0;
+}
+
+static int on_end_calltf(struct t_cb_data *user_data) {
+  close_trace();
+  return 0;
+}
+
+void register_trace_open(void) {
+  s_vpi_systf_data data = {
+      vpiSysTask, 0,    "$trace_open", trace_open_calltf,
+      NULL,       NULL, "$trace_open",
+  };
+
+  vpi_register_systf(&data);
+}
+
+void register_trace_write(void) {
+  s_vpi_systf_data data = {
+      vpiSysTask, 0,    "$trace_write", trace_write_calltf,
+      NULL,       NULL, "$trace_write",
+  };
+
+  vpi_register_systf(&data);
+}
+
+void register_on_end(void) {
+  s_cb_data cb = {
+      cbEndOfSimulation, on_end_calltf, NULL, NULL, NULL, 0, NULL,
+  };
+
+  vpi_register_cb(&cb);
+}
+
+void (*vlog_startup_routines[])(void) = {
+    register_trace_open,
+    register_trace_write,
+    register_on_end,
+    NULL,
+};